@@ -0,0 +1,68 @@
+"""
+Compare `tn search` against a linear scan of every note.
+
+    python benchmarks/search.py --notes 50000
+"""
+
+import argparse
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from takenote.vault import SearchIndex, VaultIndex, search_notes  # noqa: E402
+from vault import generate_vault  # noqa: E402
+
+QUERIES = ['"project meeting"', "rele*", "kitchen AND budget"]
+
+
+def linear_scan(root: Path, query: str) -> int:
+    """Count notes matching the query by reading every file, approximating FTS semantics."""
+    if query.startswith('"'):
+        pattern = re.compile(re.escape(query.strip('"')), re.IGNORECASE)
+        check = pattern.search
+    elif query.endswith("*"):
+        pattern = re.compile(r"\b" + re.escape(query[:-1]), re.IGNORECASE)
+        check = pattern.search
+    else:
+        terms = [re.compile(r"\b" + re.escape(term) + r"\b", re.IGNORECASE) for term in query.split(" AND ")]
+        check = lambda text: all(term.search(text) for term in terms)  # noqa: E731
+    return sum(1 for path in root.rglob("*.md") if check(path.read_text()))
+
+
+def main() -> None:
+    """Generate a vault, index it and time each query against a linear scan."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=50000, help="Number of synthetic notes.")
+    parser.add_argument("--vault", type=Path, default=None, help="Directory to generate the vault in.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.vault or Path(tmp) / "vault"
+        start = time.perf_counter()
+        generate_vault(root, args.notes)
+        sys.stdout.write(f"Generated {args.notes} notes in {time.perf_counter() - start:.1f}s\n")
+
+        with VaultIndex(root, Path(tmp) / "index.sqlite", extensions=[SearchIndex()]) as index:
+            start = time.perf_counter()
+            index.update()
+            sys.stdout.write(f"Built index in {time.perf_counter() - start:.1f}s\n")
+
+            sys.stdout.write(f"{'query':<24}{'index (ms)':>12}{'scan (ms)':>12}{'matches':>10}\n")
+            for query in QUERIES:
+                start = time.perf_counter()
+                results = search_notes(index.db, query, limit=20)
+                indexed = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                matches = linear_scan(root, query)
+                scanned = (time.perf_counter() - start) * 1000
+                sys.stdout.write(f"{query:<24}{indexed:>12.1f}{scanned:>12.1f}{matches:>10} ({len(results)} shown)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Benchmark suite, times parsing, rendering, writing and config loading against synthetic vaults.
+
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --compare baseline.json
+
+Results are seconds per operation, compare mode exits non-zero if any benchmark is slower than the
+baseline by more than the threshold. Baselines are only comparable on the same machine, raise the
+threshold above the run to run noise of the machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from vault import generate_vault  # noqa: E402
+
+SIZES = [1000, 10000, 100000]
+# Notes read one at a time by the per note benchmarks, the rest of the vault is only scanned.
+SAMPLE = 500
+CONFIG = """
+SAVE_PATH_NOTES = "{save_path}"
+VERBOSITY_LEVEL = -1
+FSYNC = "never"
+
+[LOGGING]
+log_file = "{log_file}"
+write_to_stderr = false
+"""
+
+
+def measure(func: Callable[[], object], number: int = 1, repeat: int = 5) -> float:
+    """Seconds per call of `func`, the fastest of `repeat` rounds of `number` calls, as timeit reports."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+
+def label(name: str, size: int) -> str:
+    """Name of a benchmark run against a vault of `size` notes."""
+    return f"{name}@{size // 1000}k"
+
+
+def bench_vault(root: Path, size: int, work: Path) -> Dict[str, float]:
+    """Benchmarks whose cost depends on the size of the vault."""
+    from takenote.note import read_markdown, read_markdown_many
+    from takenote.vault import VaultIndex
+
+    paths = sorted(root.rglob("*.md"))
+    sample = paths[:: max(1, len(paths) // SAMPLE)][:SAMPLE]
+    results = {}
+    for mode in ("full", "header", "lazy"):
+        results[label(f"read_markdown[{mode}]", size)] = measure(
+            lambda: [read_markdown(path, mode=mode).content for path in sample], repeat=3
+        ) / len(sample)
+
+    results[label("read_markdown_many[header]", size)] = measure(
+        lambda: sum(1 for _ in read_markdown_many(paths, mode="header")), repeat=1
+    )
+
+    database = work / f"index-{size}.sqlite"
+    database.unlink(missing_ok=True)
+    with VaultIndex(root, database) as index:
+        start = time.perf_counter()
+        index.update()
+        results[label("index.update[cold]", size)] = time.perf_counter() - start
+        results[label("index.update[warm]", size)] = measure(index.update, repeat=3)
+    return results
+
+
+def bench_render(work: Path) -> Dict[str, float]:
+    """Benchmarks independent of the vault."""
+    from takenote.note import Note, NoteWriter
+    from takenote.note.template import FilenameGenerator, apply_template, filename_from_format
+    from takenote.note.io import write_note_with_template
+
+    note = Note(front_matter={"tags": ["work"], "project": "alpha"}, title="Benchmark", content="Body. " * 200)
+    template = work / "templates" / "bench.md"
+    template.parent.mkdir(parents=True, exist_ok=True)
+    template.write_text("---\n{{ note.yaml }}---\n# {{ note.title }}\n\n{{ datetime.now() }}\n\n{{ note.content }}\n")
+    formats = {"long": "{{ datetime.now().strftime('%y%m_%d%H%M') }} - {{ title }}", "short": "{{ datetime.now() }}"}
+
+    out = work / "written"
+    out.mkdir(exist_ok=True)
+    counter = iter(range(10**9))
+    writers = {policy: NoteWriter(policy) for policy in ("always", "never")}
+
+    return {
+        "apply_template[default]": measure(lambda: apply_template(None, note, {}), number=200),
+        "apply_template[file]": measure(lambda: apply_template(template, note, {}), number=200),
+        "filename_from_format": measure(lambda: filename_from_format(formats["long"], "A title"), number=1000),
+        "FilenameGenerator[1k titles]": measure(
+            lambda: FilenameGenerator(formats, out).filenames(f"Title {i}" for i in range(1000)), repeat=3
+        ),
+        **{
+            f"write_note[fsync={policy}]": measure(
+                lambda: write_note_with_template(out / f"{next(counter)}.md", note, exclusive=True, writer=writer),
+                number=50,
+            )
+            for policy, writer in writers.items()
+        },
+    }
+
+
+def bench_config(env: Path) -> Dict[str, float]:
+    """Time loading settings, compiled by Dynaconf and from the settings cache."""
+    from takenote.config import GLOBAL_CONFIG, fetch_settings
+
+    local = env / "missing.toml"
+    # Dynaconf loads on first access.
+    return {
+        "fetch_settings[dynaconf]": measure(lambda: fetch_settings(GLOBAL_CONFIG, local)["EDITOR"], number=5),
+        "fetch_settings[cached]": measure(
+            lambda: fetch_settings(GLOBAL_CONFIG, local, env / "cache")["EDITOR"], number=50
+        ),
+    }
+
+
+def bench_cli(work: Path) -> Dict[str, float]:
+    """End to end `tn -t TITLE`, with the editor replaced by a stub returning fixed text."""
+    from click.testing import CliRunner
+    from takenote.cli.main import cli
+    from takenote.log import logger
+
+    runner = CliRunner()
+    counter = iter(range(10**9))
+    captured = work / "captured"
+    captured.mkdir(exist_ok=True)
+
+    def capture() -> None:
+        result = runner.invoke(cli, ["-t", f"Captured {next(counter)}"])
+        # Each run of `tn` is a new process, drop the log sinks it added.
+        logger.remove()
+        if result.exit_code != 0:
+            raise RuntimeError(result.output) from result.exception
+
+    with mock.patch("click.edit", return_value="Captured by the benchmark.\n"):
+        seconds = measure(capture, number=20)
+    written = len(list(captured.iterdir()))
+    if written != next(counter):
+        raise RuntimeError(f"Only {written} notes were captured, refer to {work / 'tn.log'}")
+    return {"cli[capture]": seconds}
+
+
+def compare(baseline: Dict, results: Dict[str, float], threshold: float) -> bool:
+    """Print results against a baseline, returns False if any benchmark regressed."""
+    ok = True
+    sys.stdout.write(f"{'benchmark':<36}{'baseline':>14}{'current':>14}{'ratio':>8}\n")
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            sys.stdout.write(f"{name:<36}{'-':>14}{current * 1e6:>12.1f}us\n")
+            continue
+        ratio = current / previous if previous else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            ok = False
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        sys.stdout.write(f"{name:<36}{previous * 1e6:>12.1f}us{current * 1e6:>12.1f}us{ratio:>8.2f}{flag}\n")
+    return ok
+
+
+def main() -> None:
+    """Run every benchmark, print the results and optionally save them or compare them to a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Vault sizes to generate.")
+    parser.add_argument("--vaults", type=Path, default=None, help="Directory to keep generated vaults in.")
+    parser.add_argument("--save", type=Path, default=None, help="Write results to a JSON baseline.")
+    parser.add_argument("--compare", type=Path, default=None, help="Compare results to a JSON baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, as a fraction.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        # Settings are found from TN_ENV when takenote is imported, so takenote is imported after this.
+        env = work / "env"
+        env.mkdir()
+        (env / "takenote-config.toml").write_text(CONFIG.format(save_path=work / "captured", log_file=work / "tn.log"))
+        os.environ["TN_ENV"] = str(env)
+        os.chdir(work)
+
+        results: Dict[str, float] = {}
+        for size in args.sizes:
+            root = (args.vaults or work) / f"vault-{size}"
+            start = time.perf_counter()
+            generate_vault(root, size)
+            sys.stderr.write(f"Vault of {size} notes ready in {time.perf_counter() - start:.1f}s\n")
+            results.update(bench_vault(root, size, work))
+        results.update(bench_render(work))
+        results.update(bench_config(env))
+        results.update(bench_cli(work))
+
+    from takenote.__version__ import __version__
+
+    report = {
+        "meta": {
+            "version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+    ok = True
+    if args.compare is not None:
+        ok = compare(json.loads(args.compare.read_text()), results, args.threshold)
+    else:
+        for name, seconds in results.items():
+            sys.stdout.write(f"{name:<36}{seconds * 1e6:>12.1f}us\n")
+    if args.save is not None:
+        args.save.write_text(json.dumps(report, indent=2) + "\n")
+        sys.stderr.write(f"Saved baseline to {args.save}\n")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
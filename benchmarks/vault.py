@@ -0,0 +1,64 @@
+"""Synthetic vault generation shared by the benchmarks."""
+
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november oscar papa quebec "
+    "romeo sierra tango uniform victor whiskey xray yankee zulu project meeting idea draft review release "
+    "python rust vault index search template note journal garden kitchen travel budget reading music"
+).split()
+TAGS = ["work", "home", "ideas", "reading", "journal", "todo", "archive"]
+
+
+def sentence(rng: random.Random, length: int = 12) -> str:
+    """Random sentence from the vocabulary."""
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + "."
+
+
+def note_text(rng: random.Random, index: int, paragraphs: int = 6) -> str:
+    """Markdown note with front matter, a title, links, a table and a footnote."""
+    created = date(2024, 1, 1) + timedelta(days=index % 900)
+    tags = ", ".join(rng.sample(TAGS, 2))
+    lines = [
+        "---",
+        f"creation_date: {created.isoformat()}",
+        f"tags: [{tags}]",
+        f"project: {rng.choice(WORDS)}",
+        "---",
+        f"# Note {index} {rng.choice(WORDS)} {rng.choice(WORDS)}",
+        "",
+    ]
+    for _ in range(paragraphs):
+        lines.append(f"{sentence(rng)} {sentence(rng)} See [[note-{rng.randrange(max(index, 1))}]].")
+        lines.append("")
+    lines += [
+        "| item | value |",
+        "| ---- | ----- |",
+        f"| {rng.choice(WORDS)} | {rng.randrange(1000)} |",
+        f"| {rng.choice(WORDS)} | {rng.randrange(1000)} |",
+        "",
+        f"A claim that needs a source.[^1] Linked to [another](note-{rng.randrange(max(index, 1))}.md).",
+        "",
+        f"[^1]: {sentence(rng, 6)}",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def generate_vault(root: Path, count: int, seed: int = 0) -> Path:
+    """
+    Write `count` synthetic notes under `root`, spread over a few sub directories.
+    Existing notes are kept, so a vault can be reused across runs.
+    """
+    rng = random.Random(seed)
+    for index in range(count):
+        directory = root / f"folder-{index % 16}"
+        path = directory / f"note-{index}.md"
+        text = note_text(rng, index)
+        if path.exists():
+            continue
+        directory.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return root
@@ -1,11 +1,23 @@
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional
 import click
-from loguru import logger
 
+from ..config import CACHE_DIR_NAME
+from ..log import logger
 from ..note.note import Note
-from ..note.io import write_note_with_template
+from ..note.io import NoteWriter, append_to_note, render_note_with_template, stream_note_with_template
 from ..note.template import filename_from_format, apply_template
+from ..trace import span
+
+if TYPE_CHECKING:
+    from ..vault import VaultIndex
+
+# Streamed notes larger than this, in bytes, are not added to the index when written.
+STREAM_INDEX_LIMIT = 16 << 20
+
+
+class DuplicateNoteError(Exception):
+    """Note not written, an indexed note has the same body, refer to the DEDUPE setting."""
 
 
 class App:
@@ -30,8 +42,13 @@ class App:
         self.editor = True
         self.template_path = settings["DEFAULT_TEMPLATE"]
         self.level = settings["VERBOSITY_LEVEL"]
-        self._filename = ""
+        self._filename: Optional[str] = None
         self.debug = debug if debug else settings["DEBUG"]
+        # Open index kept by a long running process, refer to `update_index`.
+        self.index: Optional["VaultIndex"] = None
+        self.writer = NoteWriter(settings["FSYNC"])
+        # Text of the note once rendered by `write_to_file`.
+        self.rendered: Optional[str] = None
 
     def echo(self, string: str, level: int = 0, **kwargs) -> None:
         """
@@ -47,7 +64,7 @@ class App:
         **kwargs
             Arguments passed to secho function.
         """
-        if level <= self.level or self._debug:
+        if level <= self.level or self.debug:
             click.secho(string, **kwargs)
 
     def open_editor(self, force_open: bool = False, text: str = "") -> None:
@@ -55,24 +72,61 @@ class App:
         # Skip editor
         if not self.editor and not force_open:
             return
+        # Edits would be lost if the template failed once the editor closes.
+        if not self.check_template():
+            return
 
-        self.note.content = click.edit(text=text, editor=self.settings["EDITOR"], extension=self.settings["EXTENSION"])
+        with span("editor", editor=self.settings["EDITOR"]):
+            self.note.content = click.edit(
+                text=text, editor=self.settings["EDITOR"], extension=self.settings["EXTENSION"]
+            )
 
     @property
     def filename(self) -> str:
-        """Return formated filename as a str."""
+        """Return formated filename as a str, rendered from the format on first access."""
+        if self._filename is None:
+            title = self.note.title
+            filename_format = "short" if title is None else "long"
+            try:
+                self._filename = filename_from_format(self.settings["FORMAT"]["filename"][filename_format], title)
+            except Exception as e:
+                logger.error("Error occured with setting file name, double check config.")
+                logger.debug(e)
+                self._filename = ""
         return self._filename
 
     @filename.setter
     def filename(self, title: Optional[str] = None) -> None:
-        """Set filename."""
-        filename_format = "short" if title is None else "long"
-        try:
-            self._filename = filename_from_format(self.settings["FORMAT"]["filename"][filename_format], title)
-        except Exception as e:
-            logger.error("Error occured with setting file name, double check config.")
-            logger.debug(e)
+        """Set filename, by setting the title it is formatted from."""
         self.note.title = title
+        self._filename = None
+
+    def check_template(self) -> bool:
+        """
+        Check the note template renders, templates are only checked again once changed, refer to `tn templates check`.
+
+        Returns
+        ----------
+        bool
+            False if the template has errors, they are printed.
+        """
+        if self.template_path is None:
+            return True
+        from ..note.template.check import CHECKED_TEMPLATES_NAME, CheckedTemplates, check_template
+
+        template_path = Path(self.template_path)
+        checked = CheckedTemplates(self.settings["APP_DIR"] / CACHE_DIR_NAME / CHECKED_TEMPLATES_NAME)
+        if checked.is_checked(template_path):
+            return True
+        with span("check_template", template=template_path):
+            # Only text data, e.g. the clipboard, other data such as the notes of a rollup is stubbed.
+            error = check_template(template_path, {k: v for k, v in self.data.items() if isinstance(v, str)})
+        if error is not None:
+            self.echo(f"Template error, fix it and try again: {error}", level=0, fg="red")
+            return False
+        checked.mark(template_path)
+        checked.save()
+        return True
 
     def set_template(self, template_key: str) -> None:
         """Set the template by referencing key to relavent template path as defined in the config file"""
@@ -85,10 +139,209 @@ class App:
 
     def write_to_file(self) -> None:
         """Write note to file."""
-        save_dir = Path(self.settings["SAVE_PATH_NOTES"]).expanduser()
-        path = save_dir / f"{self.filename}.{self.settings['EXTENSION']}"
+        path = self.save_dir / f"{self.filename}.{self.settings['EXTENSION']}"
+        self.echo(f"Writing note to: {path}", level=1, fg="green")
+        with span("write", path=path):
+            self.rendered = render_note_with_template(self.note, self.template_path, self.data)
+            if self.dedupe:
+                from ..vault.dedupe import body_hash
+
+                self.check_duplicate(body_hash(self.rendered))
+            self.writer.write(path, self.rendered, exclusive=True)
+        with span("index"):
+            self.update_index(path)
+
+    def stream_to_file(self, payload: Iterable[str], data_keys: Iterable[str] = ()) -> None:
+        """
+        Write note to file with its content streamed from payload, refer to `stream_note_with_template`.
+
+        Parameters
+        ----------
+        payload: Iterable[str]
+            Content of the note in chunks.
+        data_keys: Iterable[str]
+            Keys of data the payload is also passed to the template as, e.g. "clipboard".
+        """
+        path = self.save_dir / f"{self.filename}.{self.settings['EXTENSION']}"
         self.echo(f"Writing note to: {path}", level=1, fg="green")
-        write_note_with_template(path, self.note, self.template_path, self.data)
+        with span("write", path=path):
+            stream_note_with_template(
+                path,
+                self.note,
+                payload,
+                self.template_path,
+                self.data,
+                data_keys,
+                exclusive=True,
+                writer=self.writer,
+                pipe=self._hash_chunks if self.dedupe else None,
+            )
+        if path.stat().st_size > STREAM_INDEX_LIMIT:
+            # The index reads the whole note, which would undo streaming it.
+            logger.info(f"Note is too large to index when written: {path}")
+            return
+        with span("index"):
+            self.update_index(path)
+
+    @property
+    def dedupe(self) -> bool:
+        """True if notes are checked for duplicates when written, there must be an index to check against."""
+        return self.settings["DEDUPE"] != "off" and (self.index is not None or self.index_database.exists())
+
+    def _hash_chunks(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Pass chunks of a streamed note through, checking its body once the last chunk is read."""
+        from ..vault.dedupe import BodyHash
+
+        hasher = BodyHash()
+        for chunk in chunks:
+            hasher.update(chunk)
+            yield chunk
+        self.check_duplicate(hasher.hexdigest())
+
+    def check_duplicate(self, digest: str) -> None:
+        """
+        Look up a body hash in the index, a duplicate is printed or, if DEDUPE is "skip", raised.
+
+        Raises
+        ----------
+        DuplicateNoteError
+            If an indexed note has the same body and DEDUPE is "skip".
+        """
+        from ..vault import OutdatedIndexError
+        from ..vault.dedupe import find_duplicate
+
+        try:
+            if self.index is not None:
+                duplicate = find_duplicate(self.index.db, digest)
+            else:
+                with self.open_index(create=False) as vault:
+                    duplicate = find_duplicate(vault.db, digest)
+        except OutdatedIndexError as e:
+            logger.info(f"Not checked for duplicate notes: {e}")
+            return
+        except Exception as e:
+            logger.warning(f"Failed to check for duplicate notes: {e}")
+            return
+
+        if duplicate is None:
+            return
+        if self.settings["DEDUPE"] == "skip":
+            raise DuplicateNoteError(self.save_dir / duplicate)
+        self.echo(f"Note has the same body as: {self.save_dir / duplicate}", level=0, fg="yellow")
+
+    def open_index(self, create: bool = True) -> "VaultIndex":
+        """
+        Open the index of notes saved under SAVE_PATH_NOTES.
+
+        Parameters
+        ----------
+        create: bool
+            Create the index, or rebuild it if outdated e.g. once QUERY_KEYS changed, refer to `VaultIndex`.
+            Commands that write notes don't, a rebuilt index would only hold the notes they wrote.
+        """
+        from ..vault import DedupeIndex, LinkIndex, QueryIndex, SearchIndex, VaultIndex
+
+        extensions = [
+            SearchIndex(),
+            LinkIndex(self.settings["EXTENSION"]),
+            QueryIndex(self.settings["QUERY_KEYS"]),
+            DedupeIndex(),
+        ]
+        return VaultIndex(self.save_dir, self.index_database, self.settings["EXTENSION"], extensions, create=create)
+
+    @property
+    def save_dir(self) -> Path:
+        """Directory notes are saved to."""
+        return Path(self.settings["SAVE_PATH_NOTES"]).expanduser()
+
+    @property
+    def index_database(self) -> Path:
+        """Path to the index database of the save directory."""
+        from ..vault import index_path
+
+        return index_path(self.settings["APP_DIR"] / CACHE_DIR_NAME, self.save_dir)
+
+    def update_index(self, *paths: Path) -> None:
+        """Add written notes to the index, only if the index has been created with `tn index` and is up to date."""
+        if self.index is None and not self.index_database.exists():
+            # No index to keep up to date, quietly, so the logger isn't loaded on the capture path.
+            return
+
+        from ..vault import OutdatedIndexError
+
+        try:
+            if self.index is not None:
+                self.index.update_paths(paths)
+                return
+            with self.open_index(create=False) as vault:
+                vault.update_paths(paths)
+        except OutdatedIndexError as e:
+            logger.debug(f"Index not updated: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to update index with {', '.join(str(path) for path in paths)}: {e}")
+
+    def find_note(self, note: str) -> Path:
+        """
+        Path of a note, by path relative to SAVE_PATH_NOTES or the working directory, with or without
+        extension, else by name from the index.
+
+        Raises
+        ----------
+        FileNotFoundError
+            If no note matches.
+        """
+        path = Path(note).expanduser()
+        candidates = [path] if path.is_absolute() else [self.save_dir / path, Path.cwd() / path]
+        for candidate in list(candidates):
+            candidates.append(candidate.with_name(f"{candidate.name}.{self.settings['EXTENSION']}"))
+        for candidate in candidates:
+            if candidate.is_file():
+                return candidate
+
+        from ..vault import OutdatedIndexError, resolve
+
+        try:
+            with self.open_index(create=False) as vault:
+                matches = resolve(vault.db, note, vault.extension)
+        except OutdatedIndexError:
+            matches = []
+        if matches:
+            return self.save_dir / matches[0]
+        raise FileNotFoundError(f"Note not found: {note}")
+
+    def append_path(self, append_key: str) -> Path:
+        """Path of note to append to, by referencing key to the path defined in the config file."""
+        notes = self.settings.get("APPEND") or {}
+        relative_path = notes.get(append_key)
+
+        if relative_path is None:
+            raise KeyError(f"Append key {append_key} doesn't exist, please check config.")
+        return self.save_dir / Path(relative_path).expanduser()
+
+    def append_to_file(self, append_key: str, heading: Optional[str] = None) -> None:
+        """Append note content to the note referenced by key, optionally under a heading."""
+        from ..note.sections import HeadingIndex
+
+        if self.note.content is None:
+            raise ValueError("No note content to append.")
+        path = self.append_path(append_key)
+        self.echo(f"Appending note to: {path}", level=1, fg="green")
+
+        heading_index = HeadingIndex(self.settings["APP_DIR"] / CACHE_DIR_NAME / "headings.json")
+        append_to_note(path, self.note.content, heading, heading_index, self.writer)
+        heading_index.save()
+        self.update_index(path)
+
+    def print_append_keys(self) -> None:
+        """Print append keys, as KEY:PATH."""
+        self.echo("Printing append keys (KEY : PATH):")
+
+        if not isinstance(self.settings.get("APPEND"), dict):
+            self.echo("No notes to append to found...", fg="red")
+            return
+
+        for key, value in self.settings["APPEND"].items():
+            self.echo(f"\t- {key} : {value}", fg="yellow")
 
     def print_template_keys(self) -> None:
         """Print template keys, as KEY:FILENAME."""
@@ -102,9 +355,11 @@ class App:
             self.echo(f"\t- {key} : {value}", fg="yellow")
 
     def print_contents(self) -> None:
-        """Print contents of note, attempts to apply template."""
+        """Print contents of note, as rendered when written else attempts to apply template."""
         try:
-            msg = apply_template(self.template_path, self.note, self.data)
+            msg = (
+                self.rendered if self.rendered is not None else apply_template(self.template_path, self.note, self.data)
+            )
         except Exception as e:
             msg = self.note.content
             self.echo("Error occurred when applying template, refer to log.")
@@ -0,0 +1,298 @@
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import click
+
+from ..config import (
+    APP_DIR_NAME,
+    CACHE_DIR_NAME,
+    CONFIG_FILE_NAME,
+    DAEMON_SOCKET,
+    GLOBAL_CONFIG,
+    GLOBAL_DIR,
+    Settings,
+    config_stamp,
+    fetch_settings,
+)
+from ..log import logger
+from ..trace import TRACE_ENV
+from ..note.template import compile_string, set_bytecode_cache, template_environment
+from .app import App
+
+# Seconds between checks of the config files.
+WATCH_INTERVAL: float = 1.0
+# Seconds the client waits for the daemon to write a note.
+CLIENT_TIMEOUT: float = 30.0
+
+
+def tn_environment() -> Dict[str, str]:
+    """`TN_*` environment variables, these change settings so client and daemon must agree."""
+    return {key: value for key, value in os.environ.items() if key.startswith("TN_") and key != TRACE_ENV}
+
+
+def send(request: Dict[str, Any], path: Path = DAEMON_SOCKET, timeout: float = CLIENT_TIMEOUT) -> Optional[Dict]:
+    """
+    Send a request to the daemon.
+
+    Parameters
+    ----------
+    request: Dict[str, Any]
+        JSON serialisable request.
+    path: Path
+        Daemon socket.
+    timeout: float
+        Seconds to wait for a response.
+
+    Returns
+    ----------
+    Optional[Dict]
+        Response, None if no daemon is listening. Status is "unknown" if the request was sent but no
+        response was received, e.g. on timeout, the daemon may still have handled it.
+    """
+    if not hasattr(socket, "AF_UNIX") or not path.exists():
+        return None
+    sent = False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall(json.dumps(request).encode())
+            sock.shutdown(socket.SHUT_WR)
+            sent = True
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError as e:
+        if sent:
+            logger.warning(f"No response from daemon: {e}")
+            return {"status": "unknown"}
+        logger.debug(f"Daemon unavailable: {e}")
+        return None
+    return json.loads(b"".join(chunks)) if chunks else None
+
+
+def submit(app: App, path: Path = DAEMON_SOCKET) -> Optional[bool]:
+    """
+    Hand a note to the daemon to render and write, the editor has already been opened by this process.
+
+    Parameters
+    ----------
+    app: App
+        App with note content set.
+    path: Path
+        Daemon socket.
+
+    Returns
+    ----------
+    Optional[bool]
+        True if the daemon wrote the note, False if it didn't or may have, e.g. no response was received
+        once the note was sent. None if the daemon didn't take the note, it should be written by this process.
+    """
+    request = {
+        "command": "capture",
+        "cwd": str(Path.cwd()),
+        "env": tn_environment(),
+        "debug": app.debug,
+        "title": app.note.title,
+        "content": app.note.content,
+        "data": app.data,
+        "save_path": str(app.settings["SAVE_PATH_NOTES"]),
+        "template_path": str(app.template_path) if app.template_path is not None else None,
+    }
+    try:
+        response = send(request, path)
+    except (TypeError, ValueError) as e:
+        # Data that can't be sent as JSON, write locally.
+        logger.debug(f"Note not sent to daemon: {e}")
+        return None
+
+    if response is not None and response.get("status") == "unknown":
+        # Writing locally as well could save the note twice.
+        app.echo(f"Note sent to daemon, no response, check if it was saved in: {app.save_dir}", level=0, fg="red")
+        return False
+    if response is None or response.get("status") != "ok":
+        return None
+    if response["output"]:
+        click.echo(response["output"], nl=False)
+    return bool(response.get("written"))
+
+
+class Daemon:
+    """
+    Long running state, settings, compiled templates and open vault indexes are kept warm between notes.
+
+    Config files are polled by a background thread, changes drop the cached settings and templates.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty daemon, settings and indexes are loaded on first use."""
+        self.env = tn_environment()
+        self._lock = threading.Lock()
+        # Settings as fetched, keyed by config files, with the stamp of the files when fetched.
+        self._settings: Dict[Tuple[str, ...], Tuple[Tuple, Dict[str, Any]]] = {}
+        self._indexes: Dict[Path, Any] = {}
+        self._stop = threading.Event()
+
+    def settings(self, local: Path, app_dir: Path) -> Settings:
+        """Return settings for a working directory, a copy as apps modify their settings."""
+        local_config = local / CONFIG_FILE_NAME
+        files = [GLOBAL_CONFIG, local_config] if local_config.exists() else [GLOBAL_CONFIG]
+        key = tuple(str(path) for path in files)
+        with self._lock:
+            cached = self._settings.get(key)
+            if cached is None:
+                settings = fetch_settings(GLOBAL_CONFIG, local_config, app_dir / CACHE_DIR_NAME)
+                cached = (config_stamp(files), settings)
+                self._settings[key] = cached
+        return Settings(cached[1])
+
+    def index(self, app: App) -> Optional[Any]:
+        """Open vault index of the app's save directory, if the index exists and is up to date."""
+        from ..vault import OutdatedIndexError
+
+        database = app.index_database
+        if database not in self._indexes:
+            try:
+                # Never rebuilt here, a rebuilt index would only hold the notes written since.
+                self._indexes[database] = app.open_index(create=False)
+            except OutdatedIndexError:
+                return None
+        return self._indexes[database]
+
+    def watch(self) -> None:
+        """Poll config files, invalidating cached settings and templates when they change."""
+        while not self._stop.wait(WATCH_INTERVAL):
+            with self._lock:
+                changed = [
+                    key for key, (stamp, _) in self._settings.items() if config_stamp(Path(p) for p in key) != stamp
+                ]
+                for key in changed:
+                    del self._settings[key]
+            if changed:
+                logger.info(f"Config changed, reloading: {', '.join(changed[0])}")
+                template_environment.cache_clear()
+                compile_string.cache_clear()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle a client request."""
+        command = request.get("command")
+        if command == "ping":
+            return {"status": "ok", "pid": os.getpid()}
+        if command == "stop":
+            self._stop.set()
+            return {"status": "ok"}
+        if command != "capture":
+            return {"status": "error", "output": f"Unknown command: {command}"}
+        if request.get("env") != self.env:
+            # Environment changes settings, the client writes the note itself.
+            return {"status": "refused"}
+        return self.capture(request)
+
+    def capture(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Render and write a note, output and whether the note was written are returned to the client."""
+        from .main import write_note_file
+
+        cwd = Path(request["cwd"])
+        local = cwd / APP_DIR_NAME
+        app_dir = local if local.exists() else GLOBAL_DIR
+
+        app = App(self.settings(local, app_dir), request["debug"])
+        app.settings["APP_DIR"] = app_dir
+        set_bytecode_cache(app_dir / CACHE_DIR_NAME / "templates")
+        # Relative save paths are relative to the client's working directory.
+        save_path = Path(request["save_path"]).expanduser()
+        app.settings["SAVE_PATH_NOTES"] = save_path if save_path.is_absolute() else cwd / save_path
+        app.filename = request["title"]
+        app.note.content = request["content"]
+        app.data = request["data"]
+        if request["template_path"] is not None:
+            app.template_path = Path(request["template_path"])
+        app.index = self.index(app)
+
+        output = io.StringIO()
+        with redirect_stdout(output), redirect_stderr(output):
+            written = write_note_file(app)
+        return {"status": "ok", "written": written, "output": output.getvalue()}
+
+    def close(self) -> None:
+        """Close open indexes."""
+        self._stop.set()
+        for index in self._indexes.values():
+            index.close()
+        self._indexes.clear()
+
+    @property
+    def stopped(self) -> bool:
+        """True once a stop request has been received."""
+        return self._stop.is_set()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        daemon: Daemon = self.server.daemon  # type: ignore
+        try:
+            response = daemon.handle(json.loads(self.rfile.read()))
+        except Exception as e:
+            logger.exception(e)
+            response = {"status": "error", "output": str(e)}
+        self.wfile.write(json.dumps(response).encode())
+
+
+def serve(path: Path = DAEMON_SOCKET) -> None:
+    """
+    Run the daemon in the foreground until a stop request is received.
+
+    Parameters
+    ----------
+    path: Path
+        Socket to listen on, a stale socket left by a crashed daemon is replaced.
+    """
+    if send({"command": "ping"}, path, timeout=1.0) is not None:
+        raise RuntimeError(f"Daemon already running on {path}")
+    path.unlink(missing_ok=True)
+
+    # Socket is created private to the user, never briefly open to others.
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(str(path), _Handler)
+    finally:
+        os.umask(umask)
+
+    daemon = Daemon()
+    watcher = threading.Thread(target=daemon.watch, daemon=True)
+    watcher.start()
+
+    with server:
+        server.daemon = daemon  # type: ignore
+        logger.info(f"Daemon listening on {path}")
+        try:
+            while not daemon.stopped:
+                server.handle_request()
+        finally:
+            daemon.close()
+            path.unlink(missing_ok=True)
+
+
+def status() -> Optional[Dict]:
+    """Ping the daemon, None if it is not running."""
+    return send({"command": "ping"}, timeout=1.0)
+
+
+def stop() -> bool:
+    """Ask the daemon to stop, False if it is not running."""
+    return send({"command": "stop"}, timeout=5.0) is not None
+
+
+def start_command() -> List[str]:
+    """Command line to start the daemon in a background process."""
+    return [sys.executable, "-m", "takenote", "daemon", "start"]
@@ -1,4 +1,9 @@
+import re
+import subprocess
+import sys
+from datetime import date, timedelta
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 
 from ..__version__ import __version__
@@ -73,3 +78,72 @@ def generate_config_file(template_file: Path, filepath: Path, version: str) -> N
     """
     with open(filepath, "w") as file:
         file.write(template_file.read_text())
+
+
+def profile_startup(module: str = "takenote") -> Tuple[List[Tuple[str, int, int]], int]:
+    """
+    Measure import time of a module in a fresh interpreter, using `python -X importtime`.
+
+    Parameters
+    ----------
+    module: str
+        Module to import, defaults to the package imported by the `tn` entry point.
+
+    Returns
+    ----------
+    Tuple[List[Tuple[str, int, int]], int]
+        Rows of (top level package, self time in microseconds, number of modules) sorted slowest first,
+        and the total import time in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    packages: Dict[str, List[int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Header line
+            continue
+        package = fields[2].strip().split(".")[0]
+        entry = packages.setdefault(package, [0, 0])
+        entry[0] += int(fields[0])
+        entry[1] += 1
+
+    rows = sorted(((name, t, count) for name, (t, count) in packages.items()), key=lambda row: row[1], reverse=True)
+    return rows, sum(row[1] for row in rows)
+
+
+# Relative period, e.g. `7d` or `2w`.
+PERIOD = re.compile(r"(\d+)\s*([dwmy])")
+PERIOD_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+
+def parse_since(value: str, today: Optional[date] = None) -> date:
+    """
+    Start date of a period, as days, weeks, months or years before today, or an ISO date.
+
+    Parameters
+    ----------
+    value: str
+        e.g. `7d`, `2w`, `1m`, `1y` or `2026-01-31`, a month is 30 days and a year 365.
+    today: Optional[date]
+        Date periods end on, defaults to today.
+
+    Raises
+    ----------
+    ValueError
+        If the value is neither a period nor a date.
+    """
+    match = PERIOD.fullmatch(value.strip().lower())
+    if match is not None:
+        return (today or date.today()) - timedelta(days=int(match.group(1)) * PERIOD_DAYS[match.group(2)])
+    try:
+        return date.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"Expected a period such as 7d, 2w, 1m or a date such as 2026-01-31, not {value!r}")
@@ -1,33 +1,52 @@
+import itertools
+import time
 from pathlib import Path
-from typing import Union
-import sys
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 import click
-from loguru import logger
-import pyperclip
 
-from .functions import initialise_app_dir
+from .functions import initialise_app_dir, parse_since, profile_startup
+from ..log import initialise_logging, logger
+from ..trace import span, start_tracing, stop_tracing, trace_settings
+from ..note.template import set_bytecode_cache
 from ..config import (
     fetch_settings,
     APP_DIR_NAME,
+    CACHE_DIR_NAME,
     CONFIG_FILE_NAME,
     GLOBAL_CONFIG,
     DEFAULT_TEMPLATES_FOLDER,
     CONFIG_TEMPLATE,
+    DAEMON_SOCKET,
     GLOBAL_DIR,
     TN_ENV,
 )
-from .app import App
+from .app import App, DuplicateNoteError
 
 
-def write_and_close(app: App) -> None:
-    """Write note to file, method will raise exceptions these are handled below."""
+def write_and_close(app: App, use_daemon: bool = True) -> None:
+    """
+    Write note to file, errors are reported, refer to `write_note_file`.
+    If `tn daemon` is running the note is handed to it to write.
+    """
+    written = None
+    if use_daemon and app.note.content is not None and DAEMON_SOCKET.exists():
+        written = _submit_to_daemon(app)
+    if written is None:
+        written = write_note_file(app)
+    if written:
+        app.echo("Success!", level=1)
+
+
+def write_note_file(app: App) -> bool:
+    """Write note to file in this process, errors are reported. True if the note was written."""
     try:
         if app.note.content is None:
             app.echo("No note saved!", level=0, fg="red")
-        else:
-            app.write_to_file()
-            app.echo("Success!", level=1)
+            return False
+        app.write_to_file()
+        return True
+    except DuplicateNoteError as e:
+        app.echo(f"No note saved, same body as: {e}", level=0, fg="red")
     except FileExistsError as e:
         app.echo(f"File already exists: {e}", level=0, fg="red")
         app.print_contents()
@@ -35,34 +54,48 @@ def write_and_close(app: App) -> None:
         logger.exception(e)
         app.echo(f"Error occured:\n{e}", level=0, fg="red")
         app.print_contents()
+    return False
 
 
-def initialise_logging(
-    log_file: Union[str, Path],
-    level: str = "INFO",
-    write_to_stderr: bool = True,
-    write_to_stdout: bool = False,
-    debug: bool = False,
-):
+def stream_and_close(app: App, payload: Iterable[str], data_keys: Iterable[str] = ()) -> None:
     """
-    Initialise loguru logger with file and stderr and stdout as per their respective flags
+    Write note to file with its content streamed from payload, refer to `write_and_close`.
+    The content is never held as a whole, so it isn't handed to `tn daemon` or printed on errors.
     """
-    settings = {
-        "colorize": True,
-        "level": level,
-    }
-    if debug:
-        settings["backtrace"] = True
-        settings["diagnose"] = True
+    chunks = iter(payload)
+    first = next(chunks, "")
+    try:
+        if not first:
+            app.echo("No note saved!", level=0, fg="red")
+        else:
+            app.stream_to_file(itertools.chain([first], chunks), data_keys)
+            app.echo("Success!", level=1)
+    except DuplicateNoteError as e:
+        app.echo(f"No note saved, same body as: {e}", level=0, fg="red")
+    except FileExistsError as e:
+        app.echo(f"File already exists: {e}", level=0, fg="red")
+    except Exception as e:
+        logger.exception(e)
+        app.echo(f"Error occured:\n{e}", level=0, fg="red")
+
 
-    if write_to_stderr:
-        logger.add(sys.stderr, **settings)
-    if write_to_stdout:
-        logger.add(sys.stdout, **settings)
+def _submit_to_daemon(app: App) -> Optional[bool]:
+    from .daemon import submit
 
-    # write because no point keeping old file, personal preferance.
-    # String from config
-    logger.add(Path(log_file).expanduser(), mode="w")
+    with span("daemon.submit"):
+        return submit(app)
+
+
+def print_startup_profile(ctx: click.Context, param: click.Parameter, value: bool) -> None:
+    """Eager option callback, prints import time of the capture path per module and exits."""
+    if not value or ctx.resilient_parsing:
+        return
+
+    packages, total = profile_startup()
+    click.echo(f"Import time of `tn`: {total / 1000:.1f} ms (PACKAGE : SELF TIME, MODULES)")
+    for name, self_time, count in packages:
+        click.echo(f"\t- {name} : {self_time / 1000:.1f} ms, {count}")
+    ctx.exit()
 
 
 CONTEXT_SETTINGS: Dict[str, Any] = {"help_option_names": ["-h", "--help"]}
@@ -114,6 +147,29 @@ CONTEXT_SETTINGS: Dict[str, Any] = {"help_option_names": ["-h", "--help"]}
     help="Opens editor.",
 )
 @click.option("-l", "--link", "link_name", default=None, type=str, help="An arg to use in templating.")
+@click.option(
+    "--profile-startup",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=print_startup_profile,
+    help="Print a breakdown of startup import time per module and exit.",
+)
+@click.option(
+    "--trace",
+    "trace_flag",
+    is_flag=True,
+    type=bool,
+    default=False,
+    help="Log the duration of each phase as JSON, also enabled by TN_TRACE=1.",
+)
+@click.option(
+    "--trace-file",
+    "trace_file",
+    type=Path,
+    default=None,
+    help="Write a Chrome trace event file of each phase, also enabled by TN_TRACE=PATH.",
+)
 @click.pass_context
 def cli(
     ctx: click.Context,
@@ -124,6 +180,8 @@ def cli(
     no_edit: bool = False,
     force_editor: bool = False,
     link_name: Optional[str] = None,
+    trace_flag: bool = False,
+    trace_file: Optional[Path] = None,
 ) -> int:
     """
     Take note CLI, quick depositing of notes for those that prefer using the terminal.
@@ -147,6 +205,11 @@ def cli(
         Setting the title of a note that uses the `new` template, refer to config.
 
     """
+    tracing, trace_file = trace_settings(trace_flag, trace_file)
+    if tracing:
+        start_tracing(trace_file)
+        ctx.call_on_close(stop_tracing)
+
     # Check for local config
     local = Path.cwd() / APP_DIR_NAME
     app_dir = local if local.exists() else GLOBAL_DIR
@@ -156,10 +219,13 @@ def cli(
         initialise_app_dir(app_dir, CONFIG_FILE_NAME, CONFIG_TEMPLATE, DEFAULT_TEMPLATES_FOLDER, False)
         return  # Don't continue after generating config
 
-    settings = fetch_settings(GLOBAL_CONFIG, local / CONFIG_FILE_NAME)
+    with span("settings"):
+        settings = fetch_settings(GLOBAL_CONFIG, local / CONFIG_FILE_NAME, app_dir / CACHE_DIR_NAME)
     settings["APP_DIR"] = app_dir
+    set_bytecode_cache(app_dir / CACHE_DIR_NAME / "templates")
 
-    initialise_logging(**settings["LOGGING"])
+    with span("logging"):
+        initialise_logging(**settings["LOGGING"])
 
     app = App(settings, debug)
     app.filename = title
@@ -179,7 +245,10 @@ def cli(
 
     if clipboard_flag:
         # Grab clipboard data
-        app.data["clipboard"] = pyperclip.paste()
+        with span("clipboard"):
+            import pyperclip
+
+            app.data["clipboard"] = pyperclip.paste()
 
     if link_name is not None:
         app.data["link"] = link_name
@@ -187,6 +256,11 @@ def cli(
     if ctx.invoked_subcommand is not None:
         # Pass settings into context object for other commands
         ctx.obj = app
+    elif clipboard_flag and not app.editor and not force_editor:
+        from ..note.io import chunk_text
+
+        # Written through in chunks, rather than rendered into a second copy of the clipboard.
+        stream_and_close(app, chunk_text(app.data["clipboard"]), ["clipboard"])
     else:
         app.open_editor(force_editor)
 
@@ -239,6 +313,250 @@ def template(ctx: click.Context, template_key: Optional[str] = None, print_keys:
     write_and_close(app)
 
 
+@cli.command("-", short_help="Write a note from standard input.")
+@click.pass_context
+@click.option("-t", "--template", "template_key", type=str, default=None, help="Template key, refer to config.")
+def stdin(ctx: click.Context, template_key: Optional[str] = None) -> None:
+    """
+    Stdin command, the content of the note is read from standard input and written through to the note
+    in chunks, so output of any size can be piped into a note. Standard input isn't a terminal, so the
+    editor isn't opened.
+
+    Example
+    ----------
+    `make 2>&1 | tn -n -t "Build log" -`
+        Pipe the output of a command into a note.
+    `git log | tn -n - -t log`
+        Use the `log` template, the output is placed where `{{ note.content }}` is.
+    """
+    from functools import partial
+
+    from ..note.io import STREAM_CHUNK_SIZE
+
+    app: App = ctx.obj
+    if template_key is not None:
+        try:
+            app.set_template(template_key)
+        except FileNotFoundError as e:
+            app.echo(f"Error: {e}", level=0, fg="red")
+            return
+
+    stream = click.get_text_stream("stdin", errors="replace")
+    stream_and_close(app, iter(partial(stream.read, STREAM_CHUNK_SIZE), ""))
+
+
+@cli.group("templates", short_help="Manage templates.")
+def templates() -> None:
+    """Templates command, refer to `tn t` to write a note with a template."""
+
+
+@templates.command("check", short_help="Check every template and filename format.")
+@click.pass_context
+def templates_check(ctx: click.Context) -> None:
+    """
+    Check command, renders every template in TEMPLATES, the default template and the FORMAT.filename
+    formats against a stub note. Undefined names are errors, so mistakes are found before a note is
+    written rather than after it has been edited.
+
+    Templates that pass are compiled into the cache used when writing notes, and are not checked
+    again before the editor opens until they change.
+    """
+    from ..note.template.check import CHECKED_TEMPLATES_NAME, CheckedTemplates, check_templates
+
+    app: App = ctx.obj
+    template_dir = app.settings["APP_DIR"] / app.settings["TEMPLATES_DIR"]
+    paths = {"default": Path(app.template_path) if app.template_path is not None else None}
+    if isinstance(app.settings.get("TEMPLATES"), dict):
+        paths.update({key: template_dir / value for key, value in app.settings["TEMPLATES"].items()})
+
+    checked = CheckedTemplates(app.settings["APP_DIR"] / CACHE_DIR_NAME / CHECKED_TEMPLATES_NAME)
+    results = check_templates(paths, app.settings["FORMAT"]["filename"], checked)
+    checked.save()
+
+    failed = [result for result in results if result.error is not None]
+    for result in results:
+        if result.error is None:
+            app.echo(f"\t- {result.name} : ok", level=1, fg="green")
+        else:
+            app.echo(f"\t- {result.name} : {result.error}", level=0, fg="red")
+    app.echo(
+        f"{len(results) - len(failed)} of {len(results)} templates passed.", level=0, fg="red" if failed else "green"
+    )
+    if failed:
+        ctx.exit(1)
+
+
+@cli.command("a", short_help="Append to notes using keys.")
+@click.pass_context
+@click.argument("append_key", type=str, default=None, required=False)
+@click.option(
+    "-k",
+    "--keys",
+    "print_keys",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Prints append keys availible, refer to config file to modify keys.",
+)
+@click.option(
+    "-H",
+    "--heading",
+    "heading",
+    type=str,
+    default=None,
+    help="Insert at the end of the section under this heading, rather than the end of the note.",
+)
+def append(
+    ctx: click.Context, append_key: Optional[str] = None, print_keys: bool = False, heading: Optional[str] = None
+) -> None:
+    """
+    Append command, appends the edited or clipboard content to a note defined in the [APPEND] section
+    of the config file. The existing note is not read, so appending stays fast as the note grows.
+
+    Example
+    ----------
+    `tn a -k`
+        Will print keys set in config file
+    `tn -cb -n a log`
+        Append the clipboard to the note under the `log` key.
+    `tn a log -H Tasks`
+        Append edited text to the end of the `Tasks` section.
+    """
+    app: App = ctx.obj
+    if print_keys:
+        app.print_append_keys()
+        return
+
+    if append_key is None:
+        app.echo("Error: No append key provided!", fg="")
+        return
+
+    try:
+        app.append_path(append_key)
+    except KeyError as e:
+        app.echo(f"Error: {e.args[0]}", level=0, fg="red")
+        return
+
+    clipboard = app.data.get("clipboard", "")
+    if app.editor:
+        app.open_editor(text=clipboard)
+    else:
+        app.note.content = clipboard or None
+
+    if not app.note.content:
+        app.echo("Nothing to append!", level=0, fg="red")
+        return
+
+    try:
+        app.append_to_file(append_key, heading)
+        app.echo("Success!", level=1)
+    except KeyError as e:
+        app.echo(f"Error: {e.args[0]}", level=0, fg="red")
+        app.echo(app.note.content)
+    except Exception as e:
+        logger.exception(e)
+        app.echo(f"Error occured:\n{e}", level=0, fg="red")
+        app.echo(app.note.content)
+
+
+@cli.command("import", short_help="Import notes from a CSV, JSONL or directory.")
+@click.pass_context
+@click.argument("source", type=click.Path(exists=True, path_type=Path))
+@click.option("-t", "--template", "template_key", type=str, default=None, help="Template key, refer to config.")
+@click.option(
+    "-f",
+    "--format",
+    "source_format",
+    type=click.Choice(["csv", "jsonl", "dir"]),
+    default=None,
+    help="Format of source, found from the suffix by default.",
+)
+@click.option("-j", "--jobs", "jobs", type=int, default=4, help="Number of notes written at once.")
+@click.option(
+    "--restart",
+    "restart",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Ignore the checkpoint of an interrupted import and start from the first record.",
+)
+def import_notes(
+    ctx: click.Context,
+    source: Path,
+    template_key: Optional[str] = None,
+    source_format: Optional[str] = None,
+    jobs: int = 4,
+    restart: bool = False,
+) -> None:
+    """
+    Import command, renders every record of a source through one template and writes each as a note.
+
+    Records are CSV rows or JSON objects, `title` and `content` fields fill the note, all fields are
+    available in the template as `record`, e.g. `{{ record.url }}`. Files of a directory are imported
+    with the file name as title.
+    Filenames follow FORMAT.filename, rendered with the time the import started, names that collide
+    with an existing note get a counter suffix.
+
+    An interrupted import resumes where it stopped when run again.
+
+    \b
+    Example
+    ----------
+    `tn import clippings.jsonl -t link`
+        Import each line of clippings.jsonl using the `link` template.
+    """
+    from ..note.importer import Importer, checkpoint_path, read_records
+
+    app: App = ctx.obj
+    if template_key is not None:
+        try:
+            app.set_template(template_key)
+        except FileNotFoundError as e:
+            app.echo(f"Error: {e}", level=0, fg="red")
+            return
+
+    checkpoint_file = checkpoint_path(app.settings["APP_DIR"] / CACHE_DIR_NAME, source, app.template_path, app.save_dir)
+    try:
+        importer = Importer(
+            app.template_path,
+            app.settings["FORMAT"]["filename"],
+            app.save_dir,
+            app.settings["EXTENSION"],
+            app.data,
+            app.writer,
+            jobs,
+            checkpoint_file,
+        )
+    except FileNotFoundError as e:
+        app.echo(f"Error: {e}", level=0, fg="red")
+        return
+
+    if not restart and importer.resume_position():
+        app.echo(f"Resuming import after record {importer.resume_position()}.", level=0, fg="yellow")
+
+    def progress(stats) -> None:
+        app.echo(f"\t{stats.written} notes, {stats.rate:.0f} notes/s", level=1)
+
+    try:
+        stats, written = importer.run(read_records(source, source_format), not restart, progress)
+    except (OSError, ValueError) as e:
+        logger.exception(e)
+        app.echo(f"Error reading {source}: {e}", level=0, fg="red")
+        app.echo("Fix the source and run the command again to resume.", level=0)
+        return
+
+    app.echo(
+        f"Imported {stats.written} notes in {stats.seconds:.2f}s ({stats.rate:.0f} notes/s), "
+        f"{stats.skipped} skipped, {stats.failed} failed.",
+        level=0,
+        fg="green",
+    )
+    if stats.skipped or stats.failed:
+        app.echo("Refer to log for skipped and failed records.", level=0, fg="red")
+    if written:
+        app.update_index(*written)
+
+
 @cli.command("config", short_help="Command to open config files.")
 @click.pass_context
 @click.option(
@@ -259,9 +577,21 @@ def template(ctx: click.Context, template_key: Optional[str] = None, print_keys:
     default=False,
     help="Open global config file.",
 )
-def config(ctx: click.Context, open_local: bool = False, open_global: bool = False):
+@click.option(
+    "-r",
+    "--rebuild-cache",
+    "rebuild_cache",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Rebuild the compiled settings cache from the config files.",
+)
+def config(ctx: click.Context, open_local: bool = False, open_global: bool = False, rebuild_cache: bool = False):
     """
     Config command, used to generate and edit local and global config files.
+
+    Settings are compiled into a cache under the app directory, the cache is rebuilt whenever a
+    config file or `TN_*` environment variable changes.
     """
     app: App = ctx.obj
 
@@ -269,6 +599,12 @@ def config(ctx: click.Context, open_local: bool = False, open_global: bool = Fal
     local = Path.cwd() / APP_DIR_NAME
     local_config = local / CONFIG_FILE_NAME
 
+    if rebuild_cache:
+        cache_dir = app.settings["APP_DIR"] / CACHE_DIR_NAME
+        fetch_settings(GLOBAL_CONFIG, local_config, cache_dir, rebuild=True)
+        app.echo(f"Rebuilt settings cache: {cache_dir}")
+        return
+
     if open_local:
         app_dir = local if not local.exists() else GLOBAL_DIR
         initialise_app_dir(app_dir, CONFIG_FILE_NAME, CONFIG_TEMPLATE, DEFAULT_TEMPLATES_FOLDER, True)
@@ -281,3 +617,556 @@ def config(ctx: click.Context, open_local: bool = False, open_global: bool = Fal
     elif open_global or not local_config:
         app.echo(f"Global: {GLOBAL_CONFIG}")
         click.edit(filename=GLOBAL_CONFIG)
+
+
+@cli.command("index", short_help="Update the index of notes.")
+@click.pass_context
+@click.option(
+    "-r",
+    "--rebuild",
+    "rebuild",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Discard the index and read every note again.",
+)
+@click.option(
+    "-l",
+    "--list",
+    "list_notes",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Print indexed notes, as PATH : TITLE.",
+)
+def index(ctx: click.Context, rebuild: bool = False, list_notes: bool = False) -> None:
+    """
+    Index command, keeps a database of the metadata of every note under SAVE_PATH_NOTES.
+    Only notes that changed since the last update are read.
+
+    Example
+    ----------
+    `tn index -l`
+        Update the index and print the notes in it.
+    """
+    app: App = ctx.obj
+
+    start = time.perf_counter()
+    with app.open_index() as vault:
+        if rebuild:
+            vault.reset()
+        stats = vault.update()
+        app.echo(
+            f"Indexed {stats.scanned} notes in {time.perf_counter() - start:.2f}s, "
+            f"{stats.updated} updated, {stats.removed} removed.",
+            level=0,
+            fg="green",
+        )
+        if stats.failed:
+            app.echo(f"{stats.failed} notes could not be read, refer to log.", level=0, fg="red")
+
+        if list_notes:
+            for record in vault.records():
+                app.echo(f"\t- {record.path} : {record.title}", level=0, fg="yellow")
+
+
+@cli.command("search", short_help="Full text search of notes.")
+@click.pass_context
+@click.argument("query", type=str)
+@click.option("-n", "--limit", "limit", type=int, default=20, help="Maximum number of results.")
+@click.option(
+    "-u",
+    "--update",
+    "update",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Update the index before searching.",
+)
+def search(ctx: click.Context, query: str, limit: int = 20, update: bool = False) -> None:
+    """
+    Search command, ranked full text search of note titles, front matter and content.
+    Notes written by `tn` are indexed as they are saved, run `tn index` after editing notes elsewhere.
+
+    \b
+    Example
+    ----------
+    `tn search "exact phrase"`
+        Match a phrase.
+    `tn search "proj* AND NOT draft"`
+        Match a prefix, excluding notes containing draft.
+    """
+    from ..vault import search_notes
+
+    app: App = ctx.obj
+    with app.open_index() as vault:
+        if update or not vault.complete:
+            vault.update()
+        results = search_notes(vault.db, query, limit)
+
+    if not results:
+        app.echo("No matches found.", level=0, fg="red")
+    for result in results:
+        app.echo(f"{result.path} : {result.title}", level=0, fg="yellow")
+        app.echo(f"\t{result.snippet}", level=0)
+
+
+@cli.command("query", short_help="Filter notes by front matter.")
+@click.pass_context
+@click.argument("query", type=str)
+@click.option(
+    "-f",
+    "--format",
+    "row_format",
+    type=str,
+    default=None,
+    help="Jinja format of each result, e.g. '{{ path }} {{ tags|join(\",\") }}', defaults to the path.",
+)
+@click.option("-n", "--limit", "limit", type=int, default=None, help="Maximum number of results.")
+@click.option(
+    "-u",
+    "--update",
+    "update",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Update the index before querying.",
+)
+def query(
+    ctx: click.Context, query: str, row_format: Optional[str] = None, limit: Optional[int] = None, update: bool = False
+) -> None:
+    """
+    Query command, filters notes by front matter using the index, no note is read.
+
+    Comparisons `FIELD OP VALUE` with OP one of =, !=, <, <=, >, >= and contains, or `FIELD exists`,
+    are combined with and, or, not and brackets. Values are quoted strings, numbers, dates as
+    YYYY-MM-DD or words. List fields match if any item matches. Keys listed in QUERY_KEYS, tags and
+    dates are compared by type, refer to config.
+
+    \b
+    Example
+    ----------
+    `tn query 'tags contains "work" and creation_date > 2026-01-01'`
+        Paths of work notes created this year.
+    `tn query 'priority >= 2' -f '{{ priority }} {{ title }}'`
+        Title and priority of each match.
+    """
+    from ..note.template import compile_string
+    from ..vault import QueryError, query_notes, record_fields
+
+    app: App = ctx.obj
+    with app.open_index() as vault:
+        if update or not vault.complete:
+            vault.update()
+        try:
+            records = query_notes(vault, query, limit)
+        except QueryError as e:
+            app.echo(f"Invalid query: {e}", level=0, fg="red")
+            return
+
+    template = compile_string(row_format) if row_format is not None else None
+    for record in records:
+        click.echo(template.render(**record_fields(record)) if template is not None else record.path)
+
+
+@cli.command("dedupe", short_help="Find notes with the same body.")
+@click.pass_context
+@click.option(
+    "-n",
+    "--near",
+    "near",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Also find notes with similar bodies.",
+)
+@click.option(
+    "-t",
+    "--threshold",
+    "threshold",
+    type=click.FloatRange(0, 1),
+    default=0.8,
+    help="Similarity of near duplicates, the share of runs of five words two notes have in common.",
+)
+def dedupe(ctx: click.Context, near: bool = False, threshold: float = 0.8) -> None:
+    """
+    Dedupe command, prints groups of notes with the same body. Front matter, the title, blank lines and
+    lines holding only a date are ignored, so repeated captures of the same text are found.
+
+    Bodies are hashed when notes are indexed, the index is updated first and only notes that changed
+    are read. Set DEDUPE in the config to warn or skip when a duplicate is written.
+
+    \b
+    Example
+    ----------
+    `tn dedupe`
+        Exact duplicates.
+    `tn dedupe -n -t 0.6`
+        Also notes sharing most of their text.
+    """
+    from ..vault import duplicate_groups
+
+    app: App = ctx.obj
+    with app.open_index() as vault:
+        vault.update()
+        groups = duplicate_groups(vault, near, threshold)
+
+    if not groups:
+        app.echo("No duplicates found.", level=0, fg="green")
+    for group in groups:
+        label = "Same body" if group.exact else f"Similar, {group.similarity:.0%}"
+        app.echo(f"{label}:", level=0, fg="yellow")
+        for path in group.paths:
+            click.echo(f"\t{path}")
+
+
+@cli.command("rollup", short_help="Write a note summarising notes from a period.")
+@click.pass_context
+@click.option("-t", "--template", "template_key", type=str, required=True, help="Template key, refer to config.")
+@click.option(
+    "-s",
+    "--since",
+    "since",
+    type=str,
+    default="7d",
+    help="Start of the period, e.g. 7d, 2w, 1m or 2026-01-31, notes are selected by creation_date.",
+)
+@click.option("-q", "--query", "query", type=str, default=None, help="Further filter notes, refer to `tn query`.")
+def rollup(ctx: click.Context, template_key: str, since: str = "7d", query: Optional[str] = None) -> None:
+    """
+    Rollup command, writes a note from a template that loops over the notes created in a period.
+
+    Notes are selected through the index and given to the template as `notes`, in order of creation
+    date. Notes are only read when the template accesses them, iterating reads ahead in parallel.
+    `since` holds the start date of the period.
+
+    \b
+    Example
+    ----------
+    `tn -t "Week 42" rollup -t weekly --since 7d`
+        Weekly note, the template can loop `{% for note in notes %}{{ note.title }}{% endfor %}`.
+    `tn rollup -t monthly -s 1m -q 'tags contains work'`
+        Monthly note of work notes.
+    """
+    from ..note import LazyNotes
+    from ..vault import QueryError, query_notes
+    from ..vault.index import PARALLEL_THRESHOLD
+
+    app: App = ctx.obj
+    try:
+        start = parse_since(since)
+        app.set_template(template_key)
+    except (ValueError, FileNotFoundError) as e:
+        app.echo(f"Error: {e}", level=0, fg="red")
+        return
+
+    condition = f"creation_date >= {start.isoformat()}" + (f" and ({query})" if query else "")
+    with app.open_index() as vault:
+        vault.update()
+        try:
+            records = query_notes(vault, condition)
+        except QueryError as e:
+            app.echo(f"Invalid query: {e}", level=0, fg="red")
+            return
+        root = vault.root
+
+    records.sort(key=lambda record: (record.creation_date or "", record.path))
+    workers = None if len(records) >= PARALLEL_THRESHOLD else 1
+    app.data["notes"] = LazyNotes((root / record.path for record in records), workers=workers)
+    app.data["since"] = start
+    app.echo(f"Rolling up {len(records)} notes since {start.isoformat()}.", level=1)
+
+    app.open_editor()
+    if not app.editor:
+        app.note.content = ""
+    # Notes are read in this process while the template renders, the daemon can't be handed them.
+    write_and_close(app, use_daemon=False)
+
+
+@cli.command("show", short_help="Print a note or one of its sections.")
+@click.pass_context
+@click.argument("note", type=str)
+@click.option("-s", "--section", "section", type=str, default=None, help="Print only the section under this heading.")
+@click.option(
+    "-H",
+    "--headings",
+    "print_headings",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Print the headings of the note.",
+)
+def show(ctx: click.Context, note: str, section: Optional[str] = None, print_headings: bool = False) -> None:
+    """
+    Show command, prints a note by path or name. Sections are found by scanning the bytes of the
+    note, only the section printed is read, so large notes stay fast.
+
+    \b
+    Example
+    ----------
+    `tn show log -s "2026-01-02"`
+        Print the section of log.md under the heading 2026-01-02.
+    """
+    from ..note.sections import HeadingIndex, read_section
+
+    app: App = ctx.obj
+    try:
+        path = app.find_note(note)
+    except FileNotFoundError as e:
+        app.echo(f"Error: {e.args[0]}", level=0, fg="red")
+        return
+
+    heading_index = HeadingIndex(app.settings["APP_DIR"] / CACHE_DIR_NAME / "headings.json")
+    if print_headings:
+        for heading in heading_index.headings(path):
+            app.echo(f"{'  ' * (heading.level - 1)}- {heading.title}", level=0, fg="yellow")
+    elif section is not None:
+        try:
+            click.echo(read_section(path, section, heading_index), nl=False)
+        except KeyError as e:
+            app.echo(f"Error: {e.args[0]}", level=0, fg="red")
+    else:
+        click.echo(path.read_text(), nl=False)
+    heading_index.save()
+
+
+@cli.command("links", short_help="Query links between notes.")
+@click.pass_context
+@click.option("--to", "to_note", type=str, default=None, help="Print notes linking to this note, by name or path.")
+@click.option("--from", "from_note", type=str, default=None, help="Print links of this note, by name or path.")
+@click.option(
+    "--orphans",
+    "print_orphans",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Print notes no other note links to.",
+)
+@click.option(
+    "-u",
+    "--update",
+    "update",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Update the index before querying.",
+)
+def links(
+    ctx: click.Context,
+    to_note: Optional[str] = None,
+    from_note: Optional[str] = None,
+    print_orphans: bool = False,
+    update: bool = False,
+) -> None:
+    """
+    Links command, answers from the link graph kept in the index, wikilinks and markdown links
+    between notes are included. Links resolve by note name, ignoring folders and case.
+
+    \b
+    Example
+    ----------
+    `tn links --to "Project plan"`
+        Notes linking to Project plan.
+    `tn links --from "Project plan"`
+        Notes linked from Project plan, unresolved links are marked.
+    `tn links --orphans`
+        Notes without backlinks.
+    """
+    from ..vault import backlinks, orphans, outgoing_links
+
+    app: App = ctx.obj
+    if to_note is None and from_note is None and not print_orphans:
+        app.echo("Error: Use --to, --from or --orphans!", level=0, fg="red")
+        return
+
+    with app.open_index() as vault:
+        if update or not vault.complete:
+            vault.update()
+
+        if to_note is not None:
+            linking = backlinks(vault.db, to_note, vault.extension)
+            app.echo(f"Notes linking to {to_note}: {len(linking)}", level=0, fg="green")
+            for path in linking:
+                app.echo(f"\t- {path}", level=0, fg="yellow")
+
+        if from_note is not None:
+            outgoing = outgoing_links(vault.db, from_note, vault.extension)
+            app.echo(f"Links from {from_note}: {len(outgoing)}", level=0, fg="green")
+            for link in outgoing:
+                if link.path is None:
+                    app.echo(f"\t- {link.target} (no note)", level=0, fg="red")
+                else:
+                    app.echo(f"\t- {link.target} : {link.path}", level=0, fg="yellow")
+
+        if print_orphans:
+            orphaned = orphans(vault.db)
+            app.echo(f"Orphaned notes: {len(orphaned)}", level=0, fg="green")
+            for path in orphaned:
+                app.echo(f"\t- {path}", level=0, fg="yellow")
+
+
+@cli.command("watch", short_help="Keep the index up to date as notes change.")
+@click.pass_context
+@click.option(
+    "--poll",
+    "poll",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Scan for changes every second instead of using inotify, e.g. for network drives.",
+)
+def watch(ctx: click.Context, poll: bool = False) -> None:
+    """
+    Watch command, updates the index, search and links of notes under SAVE_PATH_NOTES as soon as
+    they change. Runs until interrupted.
+
+    Linux inotify is used where available, else the vault is scanned every second. Bursts of events,
+    e.g. an editor saving by writing a temporary file and renaming it, are indexed once.
+    """
+    from ..vault import open_watcher, watch_vault
+
+    app: App = ctx.obj
+    with app.open_index() as vault:
+        stats = vault.update()
+        watcher, polling = open_watcher(vault, poll)
+        app.echo(
+            f"Watching {stats.scanned} notes in {vault.root}{' by polling' if polling else ''}, press Ctrl+C to stop.",
+            level=0,
+            fg="green",
+        )
+
+        def updated(stats, seconds: float) -> None:
+            app.echo(
+                f"Indexed {stats.updated} updated, {stats.removed} removed in {seconds * 1000:.0f} ms.",
+                level=1,
+            )
+
+        try:
+            watch_vault(vault, watcher, on_update=updated)
+        except KeyboardInterrupt:
+            app.echo("Stopped watching.", level=0)
+        finally:
+            watcher.close()
+
+
+@cli.group("export", short_help="Export notes to other formats.")
+def export() -> None:
+    """Export command, renders the notes under SAVE_PATH_NOTES to other formats."""
+
+
+@export.command("html", short_help="Export notes to a static HTML site.")
+@click.pass_context
+@click.argument("out", type=click.Path(file_okay=False, path_type=Path))
+@click.option("-j", "--jobs", "jobs", type=int, default=None, help="Number of worker processes, defaults to CPUs.")
+@click.option(
+    "-f",
+    "--full",
+    "full",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Render every note, ignoring the previous export.",
+)
+def export_html(ctx: click.Context, out: Path, jobs: Optional[int] = None, full: bool = False) -> None:
+    """
+    Export HTML command, writes a page per note to OUT, with links between notes pointing to their
+    pages and a list of backlinks.
+
+    Exporting again to the same directory only renders notes that changed, and notes whose links or
+    backlinks changed. Pages of deleted notes are removed.
+
+    \b
+    Example
+    ----------
+    `tn export html site/`
+        Export the vault to site/, run again to bring it up to date.
+    """
+    from ..vault import HtmlExport
+
+    app: App = ctx.obj
+    # Links of notes are read from the index rather than from every changed note.
+    with app.open_index() as vault:
+        vault.update()
+        stats = HtmlExport(app.save_dir, out, app.settings["EXTENSION"], jobs, index=vault).run(full)
+    app.echo(
+        f"Exported {stats.rendered} of {stats.notes} notes to {out} in {stats.seconds:.2f}s, "
+        f"{stats.removed} removed.",
+        level=0,
+        fg="green",
+    )
+    if stats.failed:
+        app.echo(f"{stats.failed} notes failed to export, refer to log.", level=0, fg="red")
+
+
+@cli.group("daemon", short_help="Long running process that writes notes.")
+def daemon() -> None:
+    """
+    Daemon command, keeps settings, compiled templates and the index loaded between notes.
+
+    While it runs, `tn` opens the editor and hands the note to the daemon over a local socket to
+    render and write. Config files are watched and reloaded when they change.
+    """
+
+
+@daemon.command("start", short_help="Start the daemon.")
+@click.pass_context
+@click.option(
+    "-b",
+    "--background",
+    "background",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Run the daemon in a background process.",
+)
+def daemon_start(ctx: click.Context, background: bool = False) -> None:
+    """Start the daemon, runs in the foreground unless --background is set."""
+    from . import daemon as tn_daemon
+
+    app: App = ctx.obj
+    if tn_daemon.status() is not None:
+        app.echo("Daemon is already running.", level=0, fg="red")
+        return
+
+    if background:
+        import subprocess
+
+        subprocess.Popen(
+            tn_daemon.start_command(),
+            start_new_session=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        app.echo("Daemon started.", level=0, fg="green")
+        return
+
+    app.echo(f"Daemon listening on {DAEMON_SOCKET}", level=0, fg="green")
+    tn_daemon.serve()
+
+
+@daemon.command("stop", short_help="Stop the daemon.")
+@click.pass_context
+def daemon_stop(ctx: click.Context) -> None:
+    """Stop the daemon."""
+    from . import daemon as tn_daemon
+
+    app: App = ctx.obj
+    if tn_daemon.stop():
+        app.echo("Daemon stopped.", level=0, fg="green")
+    else:
+        app.echo("Daemon is not running.", level=0, fg="red")
+
+
+@daemon.command("status", short_help="Check if the daemon is running.")
+@click.pass_context
+def daemon_status(ctx: click.Context) -> None:
+    """Print the status of the daemon."""
+    from . import daemon as tn_daemon
+
+    app: App = ctx.obj
+    response = tn_daemon.status()
+    if response is None:
+        app.echo("Daemon is not running.", level=0)
+    else:
+        app.echo(f"Daemon running, pid {response['pid']}.", level=0, fg="green")
@@ -1,22 +1,111 @@
 import os
+import pickle
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-from dynaconf import Dynaconf, Validator
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from .__version__ import __version__
+from .trace import TRACE_ENV
+
+if TYPE_CHECKING:
+    from dynaconf import Dynaconf
 
 CONFIG_FILE_NAME: str = "takenote-config.toml"
 APP_DIR_NAME: str = ".tn"
+CACHE_DIR_NAME: str = "cache"
+SETTINGS_CACHE_NAME: str = "settings.pickle"
+# Bump when validators change, cached settings from an older schema are compiled again.
+SETTINGS_SCHEMA: int = 5
 
 TN_ENV: Optional[str] = os.environ.get("TN_ENV")
 
 GLOBAL_DIR: Path = Path(TN_ENV) if TN_ENV is not None else Path.home() / APP_DIR_NAME  # type: ignore
 GLOBAL_CONFIG: Path = GLOBAL_DIR / CONFIG_FILE_NAME
+# Socket of `tn daemon`.
+DAEMON_SOCKET: Path = GLOBAL_DIR / "daemon.sock"
 
 # Config template location.
 DEFAULT_TEMPLATES_FOLDER: Path = Path(__file__).parent / "resources/default-templates"
 CONFIG_TEMPLATE: Path = Path(__file__).parent / "resources/default-config.toml"
 
 
-def fetch_settings(global_config: Path, local_config: Path) -> Dict[str, Any]:
+class Settings(dict):
+    """
+    Plain dict of compiled settings, keys are looked up case insensitively like Dynaconf.
+    Nested tables are converted to `Settings` as well.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Parameters
+        ----------
+        data: Optional[Dict[str, Any]]
+            Settings, e.g. `Dynaconf.as_dict()`.
+        """
+        super().__init__()
+        for key, value in (data or {}).items():
+            super().__setitem__(key, Settings(value) if isinstance(value, dict) else value)
+
+    def _key(self, key: Any) -> Any:
+        """Return the stored key matching `key`, ignoring case."""
+        if not isinstance(key, str) or super().__contains__(key):
+            return key
+        lower = key.lower()
+        for existing in self.keys():
+            if isinstance(existing, str) and existing.lower() == lower:
+                return existing
+        return key
+
+    def __getitem__(self, key: Any) -> Any:
+        """Get a setting, ignoring case."""
+        return super().__getitem__(self._key(key))
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        """Set a setting, replacing a key that differs only in case."""
+        super().__setitem__(self._key(key), value)
+
+    def __delitem__(self, key: Any) -> None:
+        """Delete a setting, ignoring case."""
+        super().__delitem__(self._key(key))
+
+    def __contains__(self, key: Any) -> bool:
+        """Check for a setting, ignoring case."""
+        return super().__contains__(self._key(key))
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Get a setting ignoring case, default if missing."""
+        return super().get(self._key(key), default)
+
+
+def config_stamp(filepaths: Iterable[Path]) -> Tuple[Any, ...]:
+    """
+    Stamp identifying the inputs of a settings load: app version and settings schema, mtime and size of each
+    config file, and the `TN_*` environment variables read by Dynaconf.
+
+    Parameters
+    ----------
+    filepaths: Iterable[Path]
+        Config file paths.
+
+    Returns
+    ----------
+    Tuple[Any, ...]
+        Hashable stamp, compare with a previous stamp to detect changes.
+    """
+    files: List[Tuple[str, Optional[int], Optional[int]]] = []
+    for path in filepaths:
+        try:
+            stat = path.stat()
+            files.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            files.append((str(path), None, None))
+    # Tracing doesn't change settings.
+    env = sorted((key, value) for key, value in os.environ.items() if key.startswith("TN_") and key != TRACE_ENV)
+    return (__version__, SETTINGS_SCHEMA, tuple(files), tuple(env))
+
+
+def fetch_settings(
+    global_config: Path, local_config: Path, cache_dir: Optional[Path] = None, rebuild: bool = False
+) -> Dict[str, Any]:
     """
     Fetch settings. local config is checked to exist, else uses global.
 
@@ -26,19 +115,63 @@ def fetch_settings(global_config: Path, local_config: Path) -> Dict[str, Any]:
         Global config file path, loaded before local.
     local_config: Path
         File path to local config file.
+    cache_dir: Optional[Path]
+        Directory to keep compiled settings in, if None settings are always loaded with Dynaconf.
+    rebuild: bool
+        Ignore any cached settings and compile them again.
 
     Returns
     ----------
     Dict[str, Any]
-        Settings dict, from Dynaconf
+        Settings dict, from Dynaconf or the settings cache.
+    """
+    filepaths = [global_config, local_config] if local_config.exists() else [global_config]
+    if cache_dir is None:
+        return config_file(filepaths)
+    return cached_settings(filepaths, cache_dir / SETTINGS_CACHE_NAME, rebuild)
+
+
+def cached_settings(filepaths: List[Path], cache_file: Path, rebuild: bool = False) -> Settings:
+    """
+    Load compiled settings from the cache file, Dynaconf is only used when the config
+    files or environment have changed since the cache was written.
+
+    Parameters
+    ----------
+    filepaths: List[Path]
+        List of config file paths, as passed to `config_file`.
+    cache_file: Path
+        Pickled settings cache.
+    rebuild: bool
+        Ignore the cache and compile settings again.
+
+    Returns
+    ----------
+    Settings
+        Validated settings.
     """
-    if local_config.exists():
-        return config_file([global_config, local_config])
-    else:
-        return config_file([global_config])
+    stamp = config_stamp(filepaths)
+    if not rebuild and cache_file.exists():
+        try:
+            with cache_file.open("rb") as file:
+                cached_stamp, data = pickle.load(file)
+            if cached_stamp == stamp:
+                return Settings(data)
+        except Exception:
+            # Unreadable or stale cache, compile settings again.
+            pass
+
+    data = config_file(filepaths).as_dict()
 
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    with tmp_file.open("wb") as file:
+        pickle.dump((stamp, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+    return Settings(data)
 
-def config_file(filepaths: List[Path]) -> Dynaconf:
+
+def config_file(filepaths: List[Path]) -> "Dynaconf":
     """
     Return an existing config file. Requires a list of files for input.
     Files are overwritten based on order in list.
@@ -53,12 +186,18 @@ def config_file(filepaths: List[Path]) -> Dynaconf:
     Dict[str, Any]
         Settings object from Dynaconf.
     """
+    # Dynaconf is slow to import, only pay for it when settings are loaded.
+    from dynaconf import Dynaconf, Validator
+
     log_defaults = {
         "log_file": "~/.take-note.log",
         "level": "INFO",
         "write_to_stderr": True,
         "write_to_stdout": False,
         "debug": False,
+        "enqueue": False,
+        "rotation": None,
+        "retention": None,
     }
 
     validators = [
@@ -71,6 +210,9 @@ def config_file(filepaths: List[Path]) -> Dynaconf:
         Validator("DEBUG", must_exist=True, default=False),
         Validator("DEFAULT_TEMPLATE", must_exist=True, default=None),
         Validator("LOGGING", must_exist=True, default=log_defaults),
+        Validator("FSYNC", must_exist=True, default="always", is_in=["always", "batch", "never"]),
+        Validator("QUERY_KEYS", must_exist=True, default=[], is_type_of=list),
+        Validator("DEDUPE", must_exist=True, default="off", is_in=["off", "warn", "skip"]),
     ]
 
     settings = Dynaconf(
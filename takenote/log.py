@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+class LazyLogger:
+    """
+    Stand in for `loguru.logger`.
+
+    Importing loguru costs more than the rest of a quick capture, so the real logger is only imported,
+    and the sinks registered with `add_sink` attached, the first time something is logged.
+    """
+
+    def __init__(self) -> None:
+        """Logger is not imported until first used."""
+        self._logger: Any = None
+        self._sinks: List[Tuple[Any, Dict[str, Any]]] = []
+
+    @property
+    def loaded(self) -> bool:
+        """True once loguru has been imported."""
+        return self._logger is not None
+
+    def add_sink(self, sink: Any, **kwargs) -> None:
+        """
+        Register a sink, it is added to loguru when the logger is first used.
+
+        Parameters
+        ----------
+        sink: Any
+            Any sink accepted by `loguru.logger.add`.
+        **kwargs
+            Arguments passed to `loguru.logger.add`.
+        """
+        if self._logger is None:
+            self._sinks.append((sink, kwargs))
+        else:
+            self._logger.add(sink, **kwargs)
+
+    def _load(self) -> Any:
+        from loguru import logger
+
+        self._logger = logger
+        for sink, kwargs in self._sinks:
+            logger.add(sink, **kwargs)
+        self._sinks.clear()
+        return logger
+
+    def __getattr__(self, name: str) -> Any:
+        """Attribute of loguru's logger, imported on first access."""
+        logger = self._logger if self._logger is not None else self._load()
+        return getattr(logger, name)
+
+
+logger = LazyLogger()
+
+
+def initialise_logging(
+    log_file: Union[str, Path],
+    level: str = "INFO",
+    write_to_stderr: bool = True,
+    write_to_stdout: bool = False,
+    debug: bool = False,
+    enqueue: bool = False,
+    rotation: Optional[Union[str, int]] = None,
+    retention: Optional[Union[str, int]] = None,
+):
+    """
+    Initialise loguru logger with file and stderr and stdout as per their respective flags.
+    Sinks are attached when the first message is logged, the log file is only opened once a record reaches it.
+
+    Parameters
+    ----------
+    log_file: Union[str, Path]
+        Path of the log file.
+    level: str
+        Minimum level logged to stderr and stdout.
+    write_to_stderr: bool
+        Log to stderr.
+    write_to_stdout: bool
+        Log to stdout.
+    debug: bool
+        Log tracebacks with variable values.
+    enqueue: bool
+        Write the log file from a background thread, so logging never waits on the disk.
+    rotation: Optional[Union[str, int]]
+        Start a new log file once it reaches a size or age, e.g. "1 MB" or "1 week", refer to loguru.
+        The log file is appended to instead of truncated each run.
+    retention: Optional[Union[str, int]]
+        Rotated log files to keep, a count or an age, e.g. 3 or "1 month".
+    """
+    settings = {
+        "colorize": True,
+        "level": level,
+    }
+    if debug:
+        settings["backtrace"] = True
+        settings["diagnose"] = True
+
+    if write_to_stderr:
+        logger.add_sink(sys.stderr, **settings)
+    if write_to_stdout:
+        logger.add_sink(sys.stdout, **settings)
+
+    file_settings: Dict[str, Any] = {"delay": True, "enqueue": enqueue}
+    if rotation is not None:
+        file_settings.update(mode="a", rotation=rotation, retention=retention)
+    else:
+        # write because no point keeping old file, personal preferance.
+        file_settings["mode"] = "w"
+    # String from config
+    logger.add_sink(Path(log_file).expanduser(), **file_settings)
@@ -1,3 +1,13 @@
-from .io import write_note, read_markdown
-from .note import Note
+from .io import (
+    write_note,
+    write_note_with_template,
+    stream_note_with_template,
+    read_markdown,
+    read_markdown_lazy,
+    read_markdown_many,
+    append_to_note,
+    NoteWriter,
+)
+from .note import LazyNotes, Note, NoteBatch
 from .template import apply_template, fetch_template, DEFAULT_TEMPLATE_STRING
+from .sections import Heading, HeadingIndex, read_section, scan_headings
@@ -0,0 +1,439 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from ..log import logger
+from .io import NoteWriter
+from .note import Note
+from .template import FilenameGenerator, fetch_template
+
+# Supported source formats, keyed by file suffix.
+SOURCE_FORMATS: Dict[str, str] = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+# Records between checkpoints.
+CHECKPOINT_INTERVAL: int = 256
+# Record fields used for the note, every other field is passed to the template as data.
+TITLE_FIELD: str = "title"
+CONTENT_FIELD: str = "content"
+
+
+class ImportStats(NamedTuple):
+    """Result of an import, records counts those read from the source in this run."""
+
+    records: int
+    written: int
+    skipped: int
+    failed: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        """Notes written per second."""
+        return self.written / self.seconds if self.seconds > 0 else 0.0
+
+
+def detect_source_format(source: Path) -> str:
+    """
+    Format of an import source, from its suffix.
+
+    Parameters
+    ----------
+    source: Path
+        CSV file, JSONL file or directory.
+
+    Returns
+    ----------
+    str
+        One of "csv", "jsonl" or "dir".
+    """
+    if source.is_dir():
+        return "dir"
+    try:
+        return SOURCE_FORMATS[source.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown source format: {source}, expected {', '.join(SOURCE_FORMATS)} or a directory")
+
+
+def read_records(source: Path, source_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a source, only one record is held in memory at a time.
+
+    CSV rows are keyed by the header row, JSONL lines must be objects. Files of a directory are read
+    in sorted order, as records with the file stem as title, the text as content and `source`, the
+    path relative to the directory. Hidden files and directories are skipped.
+
+    Parameters
+    ----------
+    source: Path
+        CSV file, JSONL file or directory.
+    source_format: Optional[str]
+        Source format, refer to `detect_source_format`, found from the suffix if None.
+    """
+    source_format = source_format or detect_source_format(source)
+    if source_format == "csv":
+        with source.open(newline="", encoding="utf-8-sig") as file:
+            yield from csv.DictReader(file)
+    elif source_format == "jsonl":
+        with source.open(encoding="utf-8") as file:
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"{source}:{line_number}: expected a JSON object")
+                yield record
+    elif source_format == "dir":
+        for root, dirs, files in os.walk(source):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if name.startswith("."):
+                    continue
+                path = Path(root) / name
+                yield {
+                    TITLE_FIELD: path.stem,
+                    CONTENT_FIELD: path.read_text(encoding="utf-8", errors="replace"),
+                    "source": path.relative_to(source).as_posix(),
+                }
+    else:
+        raise ValueError(f"Unknown source format: {source_format}")
+
+
+def checkpoint_path(cache_dir: Path, source: Path, template_path: Optional[Path], directory: Path) -> Path:
+    """
+    Checkpoint file of an import, unique to the source, template and save directory.
+
+    Parameters
+    ----------
+    cache_dir: Path
+        App cache directory.
+    source: Path
+        Import source.
+    template_path: Optional[Path]
+        Template notes are rendered with.
+    directory: Path
+        Directory notes are written to.
+    """
+    key = "\0".join(str(path.resolve()) if path is not None else "" for path in (source, template_path, directory))
+    return cache_dir / "imports" / f"import-{hashlib.sha1(key.encode()).hexdigest()[:12]}.json"
+
+
+def _log_line(record_position: int, path: Path) -> str:
+    """Line of the write log, the note is named relative to the import directory."""
+    return json.dumps({"position": record_position, "name": path.name}) + "\n"
+
+
+def _replace_text(path: Path, text: str) -> None:
+    """Write a file atomically, a crash leaves either the old or the new text."""
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(text, encoding="utf-8")
+    os.replace(tmp_file, path)
+
+
+class Importer:
+    """
+    Renders many records through one template and writes them as notes.
+
+    The template is compiled once and every note of a run is rendered with the same time, refer to
+    `FilenameGenerator`. Records are rendered in order and written by a pool of threads,
+    with a bounded number of writes in flight. Progress is checkpointed as the number of leading
+    records written, an interrupted import resumes after them. Notes are logged before they are
+    written, so those written after the last checkpoint, e.g. before a crash, aren't written twice.
+    """
+
+    def __init__(
+        self,
+        template_path: Optional[Path],
+        filename_formats: Dict[str, str],
+        directory: Path,
+        extension: str = "md",
+        data: Optional[Dict[str, Any]] = None,
+        writer: Optional[NoteWriter] = None,
+        workers: int = 4,
+        checkpoint_file: Optional[Path] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        template_path: Optional[Path]
+            Template file, if None the default template is used.
+        filename_formats: Dict[str, str]
+            Filename formats, "long" for records with a title else "short", refer to `FORMAT.filename`.
+        directory: Path
+            Directory notes are written to.
+        extension: str
+            Extension of written notes.
+        data: Optional[Dict[str, Any]]
+            Data passed to the template for every record, fields of the record are passed as `record`.
+        writer: Optional[NoteWriter]
+            Writer to use, defaults to batched directory syncs. Pending syncs are flushed at each checkpoint.
+        workers: int
+            Number of writer threads.
+        checkpoint_file: Optional[Path]
+            File progress is saved to, None disables resuming.
+        """
+        self.template = fetch_template(template_path)
+        self.filename_formats = filename_formats
+        self.directory = directory
+        self.extension = extension
+        self.data = data or {}
+        self.writer = writer or NoteWriter("batch")
+        self.workers = max(1, workers)
+        self.checkpoint_file = checkpoint_file
+        self._log: Optional[TextIO] = None
+
+    @property
+    def log_file(self) -> Optional[Path]:
+        """Log of the notes written since the last checkpoint, None if resuming is disabled."""
+        return self.checkpoint_file.with_suffix(".log") if self.checkpoint_file is not None else None
+
+    def resume_position(self) -> int:
+        """Return the number of leading records written by a previous interrupted run."""
+        if self.checkpoint_file is None or not self.checkpoint_file.exists():
+            return 0
+        try:
+            return int(json.loads(self.checkpoint_file.read_text())["position"])
+        except (ValueError, KeyError, TypeError):
+            return 0
+
+    def resumed_records(self, position: int) -> Dict[int, Path]:
+        """
+        Return the records after the checkpoint that a previous interrupted run wrote notes for.
+
+        Parameters
+        ----------
+        position: int
+            Checkpoint position, refer to `resume_position`.
+
+        Returns
+        ----------
+        Dict[int, Path]
+            Path of the written note, by record position.
+        """
+        if self.log_file is None or not self.log_file.exists():
+            return {}
+        resumed = {}
+        with self.log_file.open(encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                    record_position, path = int(entry["position"]), self.directory / entry["name"]
+                except (ValueError, KeyError, TypeError):
+                    # Last line may have been cut short by a crash.
+                    continue
+                # Notes are written atomically, a logged note that doesn't exist was never written.
+                if record_position >= position and path.exists():
+                    resumed[record_position] = path
+        return resumed
+
+    def log_write(self, record_position: int, path: Path) -> None:
+        """Log a note before it is written, refer to `resumed_records`."""
+        if self.log_file is None:
+            return
+        if self._log is None:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            self._log = self.log_file.open("a", encoding="utf-8")
+        self._log.write(_log_line(record_position, path))
+        self._log.flush()
+
+    def save_checkpoint(self, position: int, in_flight: Iterable[Tuple[int, Path]] = ()) -> None:
+        """
+        Save progress, notes written so far are synced first.
+
+        Parameters
+        ----------
+        position: int
+            Number of leading records handled.
+        in_flight: Iterable[Tuple[int, Path]]
+            Record position and note path of writes after `position`, kept in the write log.
+        """
+        self.writer.flush()
+        if self.checkpoint_file is None or self.log_file is None:
+            return
+        self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+        _replace_text(self.checkpoint_file, json.dumps({"position": position}))
+        # Notes before the checkpoint are no longer needed to resume.
+        self._close_log()
+        _replace_text(self.log_file, "".join(_log_line(record_position, path) for record_position, path in in_flight))
+
+    def clear_checkpoint(self) -> None:
+        """Remove the checkpoint, the next import starts from the first record."""
+        self._close_log()
+        if self.checkpoint_file is not None and self.log_file is not None:
+            self.checkpoint_file.unlink(missing_ok=True)
+            self.log_file.unlink(missing_ok=True)
+
+    def _close_log(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def render(self, record: Dict[str, Any], filenames: FilenameGenerator) -> Tuple[Path, str]:
+        """
+        Render a record, returns the path to write it to and the note text.
+
+        Fields are passed to the template as `record`, e.g. `{{ record.url }}`, so no field can
+        replace `note`, `datetime` or the app data.
+        """
+        title = record.get(TITLE_FIELD) or None
+        note = Note(title=title, content=record.get(CONTENT_FIELD))
+        text = self.template.render({**self.data, "note": note, "datetime": filenames.datetime, "record": record})
+        return self.directory / f"{filenames.filename(title)}.{self.extension}", text
+
+    def run(
+        self,
+        records: Iterator[Dict[str, Any]],
+        resume: bool = True,
+        on_checkpoint: Optional[Callable[[ImportStats], None]] = None,
+    ) -> Tuple[ImportStats, List[Path]]:
+        """
+        Import records as notes.
+
+        Parameters
+        ----------
+        records: Iterator[Dict[str, Any]]
+            Records in a stable order, refer to `read_records`.
+        resume: bool
+            Skip records written by a previous interrupted run.
+        on_checkpoint: Optional[Callable[[ImportStats], None]]
+            Called with progress at each checkpoint.
+
+        Returns
+        ----------
+        Tuple[ImportStats, List[Path]]
+            Counts of this run and paths of written notes.
+        """
+        if not resume:
+            self.clear_checkpoint()
+        start_position = self.resume_position()
+        progress = _ImportRun(self, start_position, self.resumed_records(start_position), on_checkpoint)
+        finished = False
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # One timestamp and directory listing for the run, colliding filenames get a counter suffix.
+        filenames = FilenameGenerator(self.filename_formats, self.directory, self.extension)
+        try:
+            with ThreadPoolExecutor(self.workers) as pool:
+                try:
+                    for record_position, record in enumerate(records):
+                        if record_position >= start_position:
+                            progress.submit(pool, record_position, record, filenames)
+                    progress.drain()
+                    finished = True
+                finally:
+                    # Interrupted, let writes already submitted finish so the checkpoint is accurate.
+                    progress.drain()
+        finally:
+            if finished:
+                self.writer.flush()
+                self.clear_checkpoint()
+            else:
+                self.save_checkpoint(progress.position)
+        return progress.stats(), progress.written
+
+
+class _ImportRun:
+    """
+    Progress of one `Importer.run`.
+
+    Writes in flight are completed oldest first, so completed records are always a prefix and
+    `position` is the number of leading records handled.
+    """
+
+    def __init__(
+        self,
+        importer: Importer,
+        start_position: int,
+        resumed: Dict[int, Path],
+        on_checkpoint: Optional[Callable[[ImportStats], None]],
+    ) -> None:
+        """
+        Parameters
+        ----------
+        importer: Importer
+            Importer records are rendered and written by.
+        start_position: int
+            Records before this position are skipped, refer to `Importer.resume_position`.
+        resumed: Dict[int, Path]
+            Records after the start position already written, refer to `Importer.resumed_records`.
+        on_checkpoint: Optional[Callable[[ImportStats], None]]
+            Called with progress at each checkpoint.
+        """
+        self.importer = importer
+        self.resumed = resumed
+        self.on_checkpoint = on_checkpoint
+        self.start = time.perf_counter()
+        self.written: List[Path] = []
+        self.records = 0
+        self.skipped = 0
+        self.failed = 0
+        # Writes in flight, the future is None for records written by the previous run.
+        self.pending: Deque[Tuple[int, Path, Optional[Future]]] = deque()
+        self.position = start_position
+        self.saved = start_position
+
+    def stats(self) -> ImportStats:
+        """Return the counts of the run so far."""
+        return ImportStats(self.records, len(self.written), self.skipped, self.failed, time.perf_counter() - self.start)
+
+    def submit(
+        self, pool: ThreadPoolExecutor, record_position: int, record: Dict[str, Any], filenames: FilenameGenerator
+    ) -> None:
+        """Render a record and submit its write, waiting for the oldest writes while too many are in flight."""
+        self.records += 1
+        future: Optional[Future] = None
+        path = self.resumed.get(record_position)
+        if path is None:
+            try:
+                path, text = self.importer.render(record, filenames)
+            except Exception as e:
+                logger.warning(f"Import failed to render record {record_position}: {e}")
+                self.failed += 1
+                if not self.pending:
+                    self.position = record_position + 1
+                return
+            self.importer.log_write(record_position, path)
+            future = pool.submit(self.importer.writer.write, path, text, True)
+        self.pending.append((record_position, path, future))
+        while len(self.pending) >= self.importer.workers * 4:
+            self.complete_oldest()
+
+    def complete_oldest(self) -> None:
+        """Wait for the oldest write in flight, saving a checkpoint every `CHECKPOINT_INTERVAL` records."""
+        record_position, path, future = self.pending.popleft()
+        if future is None:
+            logger.debug(f"Import skipped record {record_position}, written by the interrupted import: {path}")
+            self.skipped += 1
+        else:
+            try:
+                future.result()
+                self.written.append(path)
+            except FileExistsError:
+                logger.debug(f"Import skipped record {record_position}, file exists: {path}")
+                self.skipped += 1
+            except Exception as e:
+                logger.warning(f"Import failed to write record {record_position} to {path}: {e}")
+                self.failed += 1
+        self.position = record_position + 1
+        if self.position - self.saved >= CHECKPOINT_INTERVAL:
+            self.importer.save_checkpoint(self.position, self.in_flight())
+            self.saved = self.position
+            if self.on_checkpoint is not None:
+                self.on_checkpoint(self.stats())
+
+    def in_flight(self) -> List[Tuple[int, Path]]:
+        """Return the notes after the position being written, or written by the interrupted import."""
+        notes = {
+            record_position: path for record_position, path in self.resumed.items() if record_position >= self.position
+        }
+        notes.update((record_position, path) for record_position, path, _ in self.pending)
+        return sorted(notes.items())
+
+    def drain(self) -> None:
+        """Wait for every write in flight."""
+        while self.pending:
+            self.complete_oldest()
@@ -1,22 +1,168 @@
-from loguru import logger
-import yaml
+import errno
+import itertools
+import os
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional
-from markdown_it import MarkdownIt
-from mdit_py_plugins.front_matter import front_matter_plugin
-from mdit_py_plugins.footnote import footnote_plugin
-from jinja2.exceptions import UndefinedError
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
+from ..log import logger
 from .template import apply_template
 from .note import Note
+from .links import extract_links
+from .sections import HeadingIndex, iter_headings, mapped, scan_headings, section_bounds
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from markdown_it import MarkdownIt
 
 
 class TemplateError(Exception):
     """Jinja Template Error"""
 
 
+# fsync policies of `NoteWriter`.
+FSYNC_POLICIES = ("always", "batch", "never")
+
+
+class NoteWriter:
+    """
+    Atomic note writer, notes are written to a temporary file in the same directory then renamed into
+    place so a crash never leaves a truncated note.
+
+    Durability is set by the fsync policy:
+        always: sync every note and its directory.
+        batch: sync every note, directory syncs are grouped until `flush` or the end of `batch()`.
+        never: leave syncing to the OS.
+    """
+
+    def __init__(self, fsync: str = "always") -> None:
+        """
+        Parameters
+        ----------
+        fsync: str
+            fsync policy, one of `FSYNC_POLICIES`.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}, expected one of {', '.join(FSYNC_POLICIES)}")
+        self.fsync = fsync
+        self._directories: Set[Path] = set()
+        self._lock = threading.Lock()
+
+    def write(self, path: Path, text: str, exclusive: bool = False) -> None:
+        """
+        Write text to a file atomically.
+
+        Parameters
+        ----------
+        path: Path
+            Path to write to.
+        text: str
+            Text to write.
+        exclusive: bool
+            Raise FileExistsError rather than replace an existing file.
+        """
+        self.write_chunks(path, [text], exclusive)
+
+    def write_chunks(self, path: Path, chunks: Iterable[Union[str, bytes]], exclusive: bool = False) -> None:
+        """
+        Write text chunks to a file atomically, chunks are encoded and written one at a time.
+
+        Parameters
+        ----------
+        path: Path
+            Path to write to.
+        chunks: Iterable[Union[str, bytes]]
+            Text to write, may be a generator. Bytes are written as is.
+        exclusive: bool
+            Raise FileExistsError rather than replace an existing file.
+        """
+        if exclusive and path.exists():
+            raise FileExistsError(errno.EEXIST, "File exists", str(path))
+
+        # Hidden and without the note extension, so it is never picked up as a note.
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            try:
+                for chunk in chunks:
+                    data = chunk.encode() if isinstance(chunk, str) else chunk
+                    while data:
+                        data = data[os.write(fd, data) :]
+                if self.fsync != "never":
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._rename(tmp_path, path, exclusive)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        if self.fsync == "always":
+            _fsync_directory(path.parent)
+        elif self.fsync == "batch":
+            with self._lock:
+                self._directories.add(path.parent)
+
+    @staticmethod
+    def _rename(tmp_path: Path, path: Path, exclusive: bool) -> None:
+        if not exclusive:
+            os.replace(tmp_path, path)
+            return
+        try:
+            # Linking fails if the path exists, unlike rename which replaces it.
+            os.link(tmp_path, path)
+        except FileExistsError:
+            raise FileExistsError(errno.EEXIST, "File exists", str(path)) from None
+        except OSError:
+            # File system without hard links, check then rename.
+            if path.exists():
+                raise FileExistsError(errno.EEXIST, "File exists", str(path)) from None
+            os.replace(tmp_path, path)
+            return
+        tmp_path.unlink()
+
+    def flush(self) -> None:
+        """Sync directories of notes written since the last flush."""
+        with self._lock:
+            directories, self._directories = self._directories, set()
+        for directory in directories:
+            _fsync_directory(directory)
+
+    @contextmanager
+    def batch(self) -> Iterator["NoteWriter"]:
+        """Context manager, directory syncs are flushed on exit."""
+        try:
+            yield self
+        finally:
+            self.flush()
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Sync a directory so renames within it are durable, not supported on every platform."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
 def write_note_with_template(
-    path: Path, note: Note, template_path: Optional[Path] = None, addtional_data: Optional[Dict[str, str]] = None
+    path: Path,
+    note: Note,
+    template_path: Optional[Path] = None,
+    addtional_data: Optional[Dict[str, str]] = None,
+    exclusive: bool = False,
+    writer: Optional[NoteWriter] = None,
 ) -> None:
     """
     Write a note using the template provided, else uses default.
@@ -31,9 +177,39 @@ def write_note_with_template(
         Absolute path to template file, if left as None the default template is used.
     addtional_data: Optional[Dict[str, str]]
         Any addtional data to be passed to a `data` object for acess in jinja templates.
+    exclusive: bool
+        Raise FileExistsError if a file already exists at path.
+    writer: Optional[NoteWriter]
+        Writer to use, defaults to syncing every note.
+    """
+    text = render_note_with_template(note, template_path, addtional_data)
+    (writer or NoteWriter()).write(path, text, exclusive)
+
+
+def render_note_with_template(
+    note: Note, template_path: Optional[Path] = None, addtional_data: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Render a note with the template provided, else uses default.
+
+    Parameters
+    ----------
+    note: Note
+        Note to render.
+    template_path: Optional[Path]
+        Absolute path to template file, if left as None the default template is used.
+    addtional_data: Optional[Dict[str, str]]
+        Any addtional data to be passed to a `data` object for acess in jinja templates.
+
+    Returns
+    ----------
+    str
+        Text of the note.
     """
+    from jinja2.exceptions import UndefinedError
+
     try:
-        path.write_text(apply_template(template_path, note, addtional_data))
+        return apply_template(template_path, note, addtional_data)
     except UndefinedError as e:
         errmsg = f"Please check template {template_path} for errors, refer to log for debug information."
         logger.error(errmsg)
@@ -41,7 +217,80 @@ def write_note_with_template(
         raise TemplateError(errmsg)
 
 
-def write_note(path: Path, note: Note) -> None:
+# Rendered in place of a streamed payload, refer to `stream_note_with_template`. Without letters, so
+# case filters leave it as is, a NUL left after splitting is a placeholder some other filter changed.
+PAYLOAD_PLACEHOLDER = "\x00\x1a\x00"
+# Characters read or written at a time when streaming a payload.
+STREAM_CHUNK_SIZE = 1 << 20
+
+
+def chunk_text(text: str, size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """Slices of text, so a large string is encoded and written a chunk at a time."""
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+def stream_note_with_template(
+    path: Path,
+    note: Note,
+    payload: Iterable[str],
+    template_path: Optional[Path] = None,
+    addtional_data: Optional[Dict[str, str]] = None,
+    data_keys: Iterable[str] = (),
+    exclusive: bool = False,
+    writer: Optional[NoteWriter] = None,
+    pipe: Optional[Callable[[Iterable[str]], Iterable[str]]] = None,
+) -> None:
+    """
+    Write a note whose content is streamed, the payload is never held in memory as a whole.
+
+    The template is rendered once with a placeholder as the note content and the values of `data_keys`,
+    the text around each placeholder is written with the payload in between. If a template transforms
+    the content, e.g. `{{ note.content | upper }}`, or places it more than once, the payload is read into
+    memory and the note is rendered as usual.
+
+    Parameters
+    ----------
+    path: Path
+        Path to save note under.
+    note: Note
+        Note to save, its content is the payload.
+    payload: Iterable[str]
+        Content of the note in chunks, may be a generator.
+    template_path: Optional[Path]
+        Absolute path to template file, if left as None the default template is used.
+    addtional_data: Optional[Dict[str, str]]
+        Any addtional data to be passed to a `data` object for acess in jinja templates.
+    data_keys: Iterable[str]
+        Keys of `addtional_data` that are also the payload, e.g. "clipboard".
+    exclusive: bool
+        Raise FileExistsError if a file already exists at path.
+    writer: Optional[NoteWriter]
+        Writer to use, defaults to syncing every note.
+    pipe: Optional[Callable[[Iterable[str]], Iterable[str]]]
+        Given the text of the note in chunks, returns the chunks written, e.g. to hash the note.
+        Raising once the last chunk is read aborts the write.
+    """
+    data = dict(addtional_data or {})
+    data.update((key, PAYLOAD_PLACEHOLDER) for key in data_keys)
+    note.content = PAYLOAD_PLACEHOLDER
+    try:
+        parts = render_note_with_template(note, template_path, data).split(PAYLOAD_PLACEHOLDER)
+    finally:
+        note.content = None
+
+    if len(parts) == 2 and "\x00" not in parts[0] and "\x00" not in parts[1]:
+        chunks: Iterable[str] = itertools.chain([parts[0]], payload, [parts[1]])
+    else:
+        logger.info(f"Template {template_path or 'default'} doesn't place the content once, reading it into memory.")
+        text = "".join(payload)
+        note.content = text
+        data.update((key, text) for key in data_keys)
+        chunks = chunk_text(render_note_with_template(note, template_path, data))
+    (writer or NoteWriter()).write_chunks(path, pipe(chunks) if pipe is not None else chunks, exclusive)
+
+
+def write_note(path: Path, note: Note, writer: Optional[NoteWriter] = None) -> None:
     """
     Write Note object to file, no formating.
 
@@ -51,9 +300,11 @@ def write_note(path: Path, note: Note) -> None:
         Path to save note under.
     note: Note
         Note to save.
+    writer: Optional[NoteWriter]
+        Writer to use, defaults to syncing every note.
     """
     try:
-        path.write_text(str(note))
+        (writer or NoteWriter()).write(path, str(note))
     except Exception as e:
         errmsg = f"Error writing note to file: {path}!"
         logger.error(errmsg)
@@ -61,41 +312,364 @@ def write_note(path: Path, note: Note) -> None:
         raise TemplateError(errmsg)
 
 
-def read_markdown(path: Path, ignore_title: bool = False) -> Note:
+def append_to_note(
+    path: Path,
+    text: str,
+    heading: Optional[str] = None,
+    heading_index: Optional[HeadingIndex] = None,
+    writer: Optional[NoteWriter] = None,
+) -> None:
     """
-    Read markdown note, assuming my format, which uses yaml.
+    Append text to a note, the existing note is never read or rendered so cost does not grow with the note.
+    Text is written with `O_APPEND` and synced to disk.
+
+    Parameters
+    ----------
+    path: Path
+        Path of note, created if it does not exist.
+    text: str
+        Text to append.
+    heading: Optional[str]
+        Insert text at the end of the section under this heading, the note is copied in chunks with
+        the text inserted and replaced atomically. Heading offsets are looked up in `heading_index` when given.
+    heading_index: Optional[HeadingIndex]
+        Cache of heading offsets.
+    writer: Optional[NoteWriter]
+        Writer used when inserting under a heading, defaults to syncing every note.
     """
-    md = (
+    data = text if text.endswith("\n") else f"{text}\n"
+
+    if heading is not None and path.exists():
+        headings = heading_index.headings(path) if heading_index is not None else scan_headings(path)
+        size = path.stat().st_size
+        _, end = section_bounds(headings, heading, size)
+        if end < size:
+            _insert_bytes(path, end, f"{data}\n".encode(), writer)
+            if heading_index is not None:
+                heading_index.shift(path, end, len(f"{data}\n".encode()))
+            return
+
+    fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        if os.fstat(fd).st_size:
+            # Only the last byte is read, to keep the appended text on its own line.
+            os.lseek(fd, -1, os.SEEK_END)
+            if os.read(fd, 1) != b"\n":
+                data = f"\n{data}"
+        os.write(fd, data.encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _insert_bytes(path: Path, offset: int, data: bytes, writer: Optional[NoteWriter] = None) -> None:
+    """Insert bytes at an offset, the file is copied in chunks to a new file that replaces it atomically."""
+
+    def chunks() -> Iterator[bytes]:
+        with path.open("rb") as file:
+            remaining = offset
+            while remaining:
+                chunk = file.read(min(remaining, STREAM_CHUNK_SIZE))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+            yield data
+            yield from iter(lambda: file.read(STREAM_CHUNK_SIZE), b"")
+
+    (writer or NoteWriter()).write_chunks(path, chunks())
+
+
+@lru_cache(maxsize=1)
+def markdown_parser() -> "MarkdownIt":
+    """Markdown parser used to read notes, built once per process."""
+    # Parsing dependencies are only needed here, keep them off the capture path.
+    from markdown_it import MarkdownIt
+    from mdit_py_plugins.front_matter import front_matter_plugin
+    from mdit_py_plugins.footnote import footnote_plugin
+    from .links import wikilink_plugin
+
+    return (
         MarkdownIt("commonmark", {"breaks": True, "html": False})
         .use(front_matter_plugin)
         .use(footnote_plugin)
+        .use(wikilink_plugin)
         .enable("table")
     )
 
+
+def read_markdown(path: Path, ignore_title: bool = False, mode: str = "full") -> Note:
+    """
+    Read markdown note, assuming my format, which uses yaml.
+
+    Parameters
+    ----------
+    path: Path
+        Path to markdown file.
+    ignore_title: bool
+        If False content starts at the title line, else directly after the front matter.
+    mode: str
+        "full" parses the whole note with markdown-it, links are extracted from the tokens.
+        "header" reads only the front matter and lines up to the first `# Title`, content and links are None.
+        "lazy" finds the front matter and title by scanning the bytes of the note, content is read
+        when first accessed and links are None, for large notes.
+
+    Returns
+    ----------
+    Note
+        Note read from file.
+    """
+    if mode == "header":
+        return read_markdown_header(path)
+    if mode == "lazy":
+        return read_markdown_lazy(path, ignore_title)
+    if mode != "full":
+        raise ValueError(f"Unknown read mode: {mode}")
+
+    md = markdown_parser()
+
     front_matter = None
     title = None
     content = 0
-    tokens = md.parse(path.read_text())
+    text = path.read_text()
+    tokens = md.parse(text)
     for i, token in enumerate(tokens):
         if token.type == "front_matter":
             front_matter = token.content
-            content = token.map[-1]
+            # Block tokens always carry their source lines, map is only None for inline tokens.
+            if token.map is not None:
+                content = token.map[-1]
         if token.tag == "h1" and token.nesting == 1:
-            h = tokens[i + 1].children[0]
+            h = tokens[i + 1]
             title = h.content if h.content != "" else None
             # Assumes content starts after the line h1 is on
-            if not ignore_title:
+            if not ignore_title and token.map is not None:
                 content = token.map[0]
+            break
 
-    if front_matter is not None:
-        front_matter = yaml.safe_load(front_matter)
-
-    content = "".join(path.open().readlines()[content::])
-    date = front_matter.get("creation_date") if front_matter is not None else None
-
+    # Front matter is parsed by the note when first accessed.
     return Note(
-        front_matter=front_matter,
         title=title,
-        content=content,
-        date=date,
+        content=_skip_lines(text, content),
+        raw_front_matter=front_matter,
+        links=extract_links(tokens),
     )
+
+
+# ATX level one heading, `# Title` with an optional closing sequence of #.
+ATX_H1 = re.compile(r"^ {0,3}#(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+
+def read_markdown_header(path: Path) -> Note:
+    """
+    Read only the front matter and title of a note, the file is streamed line by line and
+    reading stops at the first `# Title`. Cost depends on the size of the header, not the note.
+
+    Parameters
+    ----------
+    path: Path
+        Path to markdown file.
+
+    Returns
+    ----------
+    Note
+        Note with front matter and title, content is None.
+    """
+    front_matter = None
+    title = None
+    fence = None
+
+    with path.open() as file:
+        line = file.readline()
+        if line.rstrip("\r\n") == "---":
+            lines: List[str] = []
+            for line in file:
+                if line.rstrip("\r\n") == "---":
+                    front_matter = "".join(lines)
+                    break
+                lines.append(line)
+            line = file.readline()
+
+        while line:
+            marker = FENCE.match(line)
+            if fence is not None:
+                # Headings inside code blocks are not headings.
+                if marker is not None and marker.group(1)[0] == fence[0] and len(marker.group(1)) >= len(fence):
+                    fence = None
+            elif marker is not None:
+                fence = marker.group(1)
+            else:
+                heading = ATX_H1.match(line.rstrip("\r\n"))
+                if heading is not None:
+                    title = heading.group(1) or None
+                    break
+            line = file.readline()
+
+    return Note(title=title, raw_front_matter=front_matter)
+
+
+# Opening line of YAML front matter, the closing line needs at least as many dashes.
+FRONT_MATTER_OPEN = re.compile(rb"-{3,}")
+
+
+def read_markdown_lazy(path: Path, ignore_title: bool = False) -> Note:
+    """
+    Read a note without decoding or parsing its content. The note is memory mapped and the front
+    matter and title are found by scanning bytes, content is left as a byte range that is read when
+    the note's content is first accessed.
+
+    Parameters
+    ----------
+    path: Path
+        Path to markdown file.
+    ignore_title: bool
+        If False content starts at the title line, else directly after the front matter.
+
+    Returns
+    ----------
+    Note
+        Note with front matter and title, content is loaded on access.
+    """
+    front_matter = None
+    title = None
+    with mapped(path) as buffer:
+        size = len(buffer)
+        body = 0
+        opening = FRONT_MATTER_OPEN.match(buffer)
+        first_line = buffer.find(b"\n") + 1
+        if opening is not None and first_line:
+            closing = re.compile(rb"^ {0,3}-{%d,}[ \t]*\r?$" % len(opening.group()), re.MULTILINE)
+            end = closing.search(buffer, first_line)
+            if end is not None:
+                front_matter = buffer[first_line : max(first_line, end.start() - 1)].decode().replace("\r\n", "\n")
+                body = min(end.end() + 1, size)
+
+        start = body
+        for heading in iter_headings(buffer, body):
+            if heading.level == 1:
+                title = heading.title or None
+                if not ignore_title:
+                    start = heading.offset
+                break
+
+    return Note(title=title, raw_front_matter=front_matter, content_source=(path, start, size))
+
+
+def _skip_lines(text: str, count: int) -> str:
+    """Return text after the first `count` lines."""
+    offset = 0
+    for _ in range(count):
+        offset = text.find("\n", offset) + 1
+        if offset == 0:
+            return ""
+    return text[offset:]
+
+
+# Result of reading one file in a worker, exceptions are returned rather than raised so one bad note
+# doesn't lose the rest of its chunk.
+_ReadResult = Tuple[Path, Optional[Note], Optional[BaseException]]
+
+
+def _read_chunk(paths: List[Path], ignore_title: bool, mode: str) -> List[_ReadResult]:
+    """Read a chunk of notes, runs in a worker process."""
+    results: List[_ReadResult] = []
+    for path in paths:
+        try:
+            results.append((path, read_markdown(path, ignore_title, mode), None))
+        except Exception as e:
+            results.append((path, None, e))
+    return results
+
+
+def _chunks(paths: Iterable[Path], size: int) -> Iterator[List[Path]]:
+    chunk: List[Path] = []
+    for path in paths:
+        chunk.append(Path(path))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_markdown_many(
+    paths: Iterable[Path],
+    ignore_title: bool = False,
+    mode: str = "full",
+    workers: Optional[int] = None,
+    ordered: bool = True,
+    skip_errors: bool = False,
+    chunksize: int = 32,
+) -> Iterator[Tuple[Path, Note]]:
+    """
+    Read many notes with a pool of worker processes, each worker reuses one markdown parser.
+
+    Paths are consumed lazily and only a few chunks per worker are in flight at once, so memory
+    stays bounded however many notes are read.
+
+    Parameters
+    ----------
+    paths: Iterable[Path]
+        Paths to markdown files, may be a generator.
+    ignore_title: bool
+        Refer to `read_markdown`.
+    mode: str
+        Refer to `read_markdown`.
+    workers: Optional[int]
+        Number of worker processes, None uses the number of CPUs, 1 or less reads in this process.
+    ordered: bool
+        Yield notes in the order of `paths`, else as they are read.
+    skip_errors: bool
+        Log and skip notes that fail to read, else the first error is raised.
+    chunksize: int
+        Number of notes sent to a worker at a time.
+
+    Returns
+    ----------
+    Iterator[Tuple[Path, Note]]
+        Path and note, for every note read.
+    """
+    workers = workers if workers is not None else os.cpu_count() or 1
+    results: Iterator[_ReadResult]
+    if workers <= 1:
+        results = (result for chunk in _chunks(paths, chunksize) for result in _read_chunk(chunk, ignore_title, mode))
+    else:
+        results = _read_pool(_chunks(paths, chunksize), ignore_title, mode, workers, ordered)
+
+    for path, note, error in results:
+        if error is not None:
+            if not skip_errors:
+                raise error
+            logger.warning(f"Failed to read note {path}: {error}")
+            continue
+        yield path, note  # type: ignore
+
+
+def _read_pool(
+    chunks: Iterator[List[Path]], ignore_title: bool, mode: str, workers: int, ordered: bool
+) -> Iterator[_ReadResult]:
+    """Submit chunks to a process pool, keeping a bounded number in flight."""
+    # Imported here, concurrent.futures pulls in multiprocessing which slows every launch.
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+    limit = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if ordered:
+            queue: Deque["Future"] = deque()
+            for chunk in chunks:
+                queue.append(pool.submit(_read_chunk, chunk, ignore_title, mode))
+                if len(queue) >= limit:
+                    yield from queue.popleft().result()
+            while queue:
+                yield from queue.popleft().result()
+        else:
+            pending: Set["Future"] = set()
+            for chunk in chunks:
+                pending.add(pool.submit(_read_chunk, chunk, ignore_title, mode))
+                if len(pending) >= limit:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            for future in as_completed(pending):
+                yield from future.result()
@@ -0,0 +1,114 @@
+import re
+from typing import TYPE_CHECKING, List, Optional, Sequence
+from urllib.parse import unquote, urlsplit
+
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+    from markdown_it.rules_inline import StateInline
+    from markdown_it.token import Token
+
+# `[[target#heading|alias]]`, an optional leading `!` embeds the target.
+WIKILINK = re.compile(r"!?\[\[([^\[\]|\n]+?)(?:\|([^\[\]\n]*?))?\]\]")
+
+
+def wikilink_plugin(md: "MarkdownIt") -> None:
+    """
+    Markdown-it plugin parsing Obsidian `[[wikilinks]]` into `wikilink` tokens.
+
+    The token's `meta` holds `target`, the note linked to without heading, and `alias`, the text shown.
+    Wikilinks are rendered as links to the target.
+    """
+    md.inline.ruler.before("link", "wikilink", _wikilink_rule)
+    md.add_render_rule("wikilink", _render_wikilink)
+
+
+def _wikilink_rule(state: "StateInline", silent: bool) -> bool:
+    start = state.pos
+    if state.src[start] not in "![":
+        return False
+    match = WIKILINK.match(state.src, start)
+    if match is None:
+        return False
+    if not silent:
+        target = match.group(1).strip()
+        token = state.push("wikilink", "a", 0)
+        token.markup = match.group(0)
+        token.meta = {
+            "target": target.split("#", 1)[0].strip(),
+            "alias": (match.group(2) or target).strip(),
+            "embed": match.group(0).startswith("!"),
+        }
+    state.pos = match.end()
+    return True
+
+
+def _render_wikilink(self, tokens: Sequence["Token"], idx: int, options, env) -> str:
+    from markdown_it.common.utils import escapeHtml
+
+    meta = tokens[idx].meta
+    # `href` is set when the target has been resolved, e.g. to a page by `tn export html`.
+    href = meta.get("href", meta["target"])
+    return f'<a class="wikilink" href="{escapeHtml(href)}">{escapeHtml(meta["alias"])}</a>'
+
+
+def link_target(href: str) -> Optional[str]:
+    """
+    Note linked to by a markdown link, None for external links and links within the same note.
+
+    Parameters
+    ----------
+    href: str
+        Link destination, e.g. `sub/Other%20note.md#heading`.
+    """
+    parts = urlsplit(href)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    return unquote(parts.path)
+
+
+def note_name(target: str, extension: str = "md") -> str:
+    """
+    Name a note is linked by, notes are matched by filename ignoring folders, extension and case.
+
+    Parameters
+    ----------
+    target: str
+        Link target or path of a note, e.g. `sub/Other note.md` or `Other note`.
+    extension: str
+        Extension of notes, removed from the filename.
+    """
+    name = target.replace("\\", "/").rstrip("/").rsplit("/", 1)[-1]
+    suffix = f".{extension}".lower()
+    if name.lower().endswith(suffix):
+        name = name[: -len(suffix)]
+    return name.casefold()
+
+
+def extract_links(tokens: Sequence["Token"]) -> List[str]:
+    """
+    Targets of the wikilinks and markdown links of a parsed note, in order of the note.
+    Links in code are not tokens, so they are never included.
+
+    Parameters
+    ----------
+    tokens: Sequence[Token]
+        Block tokens from `MarkdownIt.parse`, with `wikilink_plugin` enabled.
+
+    Returns
+    ----------
+    List[str]
+        Link targets, duplicates are kept.
+    """
+    links = []
+    for token in tokens:
+        if token.type != "inline" or not token.children:
+            continue
+        for child in token.children:
+            if child.type == "wikilink":
+                if child.meta["target"]:
+                    links.append(child.meta["target"])
+            elif child.type == "link_open":
+                target = link_target(str(child.attrGet("href") or ""))
+                if target is not None:
+                    links.append(target)
+    return links
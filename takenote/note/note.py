@@ -1,19 +1,39 @@
-import yaml
-from typing import Any, Dict, Optional
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 
 
 class Note:
     """
     A note class. This object is passed to the template renderer, refer to templating for more information.
+
+    Front matter read from a file is kept as the raw YAML string and only parsed when first accessed,
+    the YAML dump used by templates is memoized. Mutating the `front_matter` dict in place is not
+    tracked, assign a new dict to refresh `yaml`.
+
+    Content can be left in the file as a byte range, it is read and decoded when first accessed.
     """
 
+    __slots__ = (
+        "_front_matter",
+        "_raw_front_matter",
+        "_yaml",
+        "_date",
+        "_content",
+        "_content_source",
+        "title",
+        "links",
+    )
+
     def __init__(
         self,
-        front_matter: Optional[Dict[str, str]] = None,
+        front_matter: Optional[Dict[str, Any]] = None,
         title: Optional[str] = None,
         content: Optional[str] = None,
         date: Optional[datetime] = None,
+        raw_front_matter: Optional[str] = None,
+        links: Optional[List[str]] = None,
+        content_source: Optional[Tuple[Path, int, int]] = None,
     ) -> None:
         """
 
@@ -26,21 +46,230 @@ class Note:
         content: Option[str]
             File can have content.
         date: datetime
-            Datetime object, can be None, if so format_datetime returns result from `datetime.now()`
+            Datetime object, can be None, if so the `creation_date` of the front matter is used.
+        raw_front_matter: Optional[str]
+            Unparsed YAML front matter, ignored if `front_matter` is given.
+        links: Optional[List[str]]
+            Targets of the wikilinks and markdown links in the note, None if the content was not parsed.
+        content_source: Optional[Tuple[Path, int, int]]
+            File, start and end byte offsets content is read from on first access, ignored if `content` is given.
 
         """
-        self.front_matter: Dict[str, Any] = front_matter
+        self._front_matter: Optional[Dict[str, Any]] = front_matter
+        self._raw_front_matter: Optional[str] = raw_front_matter if front_matter is None else None
+        self._yaml: Optional[str] = None
+        self._date: Optional[datetime] = date
         self.title: Optional[str] = title
-        self.content: Optional[str] = content
-        self.date: datetime = date
+        self._content: Optional[str] = content
+        self._content_source: Optional[Tuple[Path, int, int]] = content_source if content is None else None
+        self.links: Optional[List[str]] = links
+
+    @property
+    def front_matter(self) -> Optional[Dict[str, Any]]:
+        """Front matter, parsed on first access."""
+        if self._raw_front_matter is not None:
+            import yaml
+
+            self._front_matter = yaml.safe_load(self._raw_front_matter)
+            self._raw_front_matter = None
+        return self._front_matter
+
+    @front_matter.setter
+    def front_matter(self, front_matter: Optional[Dict[str, Any]]) -> None:
+        self._front_matter = front_matter
+        self._raw_front_matter = None
+        self._yaml = None
+
+    @property
+    def raw_front_matter(self) -> Optional[str]:
+        """Raw YAML front matter, None once it has been parsed or if the note has none."""
+        return self._raw_front_matter
+
+    @property
+    def content(self) -> Optional[str]:
+        """Content, read from the file on first access if it was left there."""
+        if self._content_source is not None:
+            path, start, end = self._content_source
+            with path.open("rb") as file:
+                file.seek(start)
+                data = file.read(end - start)
+            self._content = data.decode().replace("\r\n", "\n")
+            self._content_source = None
+        return self._content
+
+    @content.setter
+    def content(self, content: Optional[str]) -> None:
+        self._content = content
+        self._content_source = None
+
+    @property
+    def date(self) -> Optional[datetime]:
+        """Date of note, defaults to `creation_date` from the front matter."""
+        if self._date is not None or (self._front_matter is None and self._raw_front_matter is None):
+            return self._date
+        front_matter = self.front_matter
+        return front_matter.get("creation_date") if isinstance(front_matter, dict) else None
+
+    @date.setter
+    def date(self, date: Optional[datetime]) -> None:
+        self._date = date
 
     @property
     def yaml(self) -> str:
         """Returns a YAML String"""
-        if self.front_matter is None:
-            return ""
-        return yaml.dump(self.front_matter, sort_keys=True)
+        if self._yaml is None:
+            front_matter = self.front_matter
+            if front_matter is None:
+                return ""
+            import yaml
+
+            self._yaml = yaml.dump(front_matter, sort_keys=True)
+        return self._yaml
 
     def __str__(self):
         """Return String Note Component"""
         return "---\n" f"{self.yaml}\n" "---\n" f"{self.title}\n" f"{self.date}\n" f"{self.content}\n"
+
+
+class NoteBatch:
+    """
+    Column store of many notes, paths, titles, dates, front matter and content are each kept in a list.
+
+    Used when loading large numbers of notes, front matter stays as raw YAML until a note is accessed.
+    Indexing returns a `Note` built from the columns.
+    """
+
+    __slots__ = ("paths", "titles", "dates", "front_matter", "contents")
+
+    def __init__(self) -> None:
+        """Empty batch, notes are added with `append`."""
+        self.paths: List[Path] = []
+        self.titles: List[Optional[str]] = []
+        self.dates: List[Optional[datetime]] = []
+        # Raw YAML string, or parsed dict if the note's front matter had already been parsed.
+        self.front_matter: List[Union[str, Dict[str, Any], None]] = []
+        # Content, or the byte range it is read from if the note was read lazily.
+        self.contents: List[Union[str, Tuple[Path, int, int], None]] = []
+
+    @classmethod
+    def read(cls, paths: Iterable[Path], mode: str = "header", workers: Optional[int] = None) -> "NoteBatch":
+        """
+        Read notes into a batch, using worker processes.
+
+        Parameters
+        ----------
+        paths: Iterable[Path]
+            Paths to markdown files.
+        mode: str
+            Read mode, "header" skips content, refer to `read_markdown`.
+        workers: Optional[int]
+            Number of worker processes, refer to `read_markdown_many`.
+        """
+        from .io import read_markdown_many
+
+        batch = cls()
+        for path, note in read_markdown_many(paths, mode=mode, workers=workers, skip_errors=True):
+            batch.append(path, note)
+        return batch
+
+    def append(self, path: Path, note: Note) -> None:
+        """Add a note to the batch."""
+        self.paths.append(path)
+        self.titles.append(note.title)
+        self.dates.append(note._date)
+        self.front_matter.append(note._raw_front_matter if note._raw_front_matter is not None else note._front_matter)
+        self.contents.append(note._content_source if note._content_source is not None else note._content)
+
+    def __len__(self) -> int:
+        """Count notes in the batch."""
+        return len(self.paths)
+
+    def __getitem__(self, index: int) -> Note:
+        """Build the note at an index from the columns."""
+        front_matter = self.front_matter[index]
+        content = self.contents[index]
+        return Note(
+            front_matter=front_matter if isinstance(front_matter, dict) else None,
+            title=self.titles[index],
+            content=content if not isinstance(content, tuple) else None,
+            date=self.dates[index],
+            raw_front_matter=front_matter if isinstance(front_matter, str) else None,
+            content_source=content if isinstance(content, tuple) else None,
+        )
+
+    def __iter__(self) -> Iterator[Note]:
+        """Iterate the notes of the batch in order."""
+        return (self[i] for i in range(len(self)))
+
+
+class LazyNotes:
+    """
+    Sequence of notes read when first accessed, passed to templates that loop over many notes.
+
+    Length and paths are known without reading any note. Iterating reads ahead with worker processes,
+    a template that stops early only reads the notes it reached plus the chunks in flight. Indexing
+    reads a single note, slicing returns a new unread sequence. Notes are kept once read.
+    """
+
+    __slots__ = ("paths", "mode", "workers", "_notes")
+
+    def __init__(self, paths: Iterable[Path], mode: str = "full", workers: Optional[int] = None) -> None:
+        """
+        Parameters
+        ----------
+        paths: Iterable[Path]
+            Paths to markdown files, in the order notes are given.
+        mode: str
+            Read mode, refer to `read_markdown`.
+        workers: Optional[int]
+            Number of worker processes used when iterating, refer to `read_markdown_many`.
+        """
+        self.paths: List[Path] = [Path(path) for path in paths]
+        self.mode = mode
+        self.workers = workers
+        self._notes: Dict[int, Note] = {}
+
+    def __len__(self) -> int:
+        """Count notes, without reading any."""
+        return len(self.paths)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Note, "LazyNotes"]:
+        """Read the note at an index, or return an unread sequence of a slice."""
+        if isinstance(index, slice):
+            return LazyNotes(self.paths[index], self.mode, self.workers)
+        index = range(len(self.paths))[index]
+        if index not in self._notes:
+            from .io import read_markdown
+
+            self._notes[index] = read_markdown(self.paths[index], mode=self.mode)
+        return self._notes[index]
+
+    def __iter__(self) -> Iterator[Note]:
+        """Iterate the notes in order, reading ahead."""
+        return (note for _, note in self._read())
+
+    def items(self) -> Iterator[Tuple[Path, Note]]:
+        """
+        Iterate path and note pairs in order.
+
+        E.g. `{% for path, note in notes.items() %}` in a template.
+        """
+        return ((self.paths[index], note) for index, note in self._read())
+
+    def _read(self) -> Iterator[Tuple[int, Note]]:
+        """Index and note of every note in order, unread notes are read ahead by worker processes."""
+        from .io import read_markdown_many
+
+        unread = [index for index in range(len(self.paths)) if index not in self._notes]
+        pending = iter(unread)
+        position = 0
+        for path, note in read_markdown_many(
+            (self.paths[index] for index in unread), mode=self.mode, workers=self.workers, skip_errors=True
+        ):
+            # Notes that failed to read are logged and skipped.
+            index = next(index for index in pending if self.paths[index] == path)
+            yield from ((i, self._notes[i]) for i in range(position, index) if i in self._notes)
+            self._notes[index] = note
+            yield index, note
+            position = index + 1
+        yield from ((i, self._notes[i]) for i in range(position, len(self.paths)) if i in self._notes)
@@ -0,0 +1,216 @@
+import json
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# ATX heading, `## Title` with an optional closing sequence of #.
+ATX_HEADING = re.compile(rb"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*\r?$")
+FENCE = re.compile(rb"^ {0,3}(`{3,}|~{3,})")
+# Fence or heading line, matched across a whole buffer so only these lines reach Python.
+BLOCK_MARKER = re.compile(
+    rb"^ {0,3}(?:(?P<fence>`{3,}|~{3,})|(?P<level>#{1,6})(?:[ \t]+(?P<title>.*?))?(?:[ \t]+#+)?[ \t]*\r?$)",
+    re.MULTILINE,
+)
+
+
+class Heading(NamedTuple):
+    """A heading of a note, offset is the byte offset of the start of the heading line."""
+
+    level: int
+    title: str
+    offset: int
+
+
+@contextmanager
+def mapped(path: Path) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Memory map a file for reading, pages are loaded by the OS as they are touched.
+
+    Parameters
+    ----------
+    path: Path
+        File to map, an empty file gives empty bytes as it can't be mapped.
+    """
+    with path.open("rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def iter_headings(buffer: Union[mmap.mmap, bytes], start: int = 0) -> Iterator[Heading]:
+    """
+    ATX headings of a buffer in order, headings in fenced code blocks are skipped.
+
+    Parameters
+    ----------
+    buffer: Union[mmap.mmap, bytes]
+        Note contents.
+    start: int
+        Byte offset to start at, must be the start of a line outside a fenced code block.
+    """
+    fence: Optional[bytes] = None
+    for match in BLOCK_MARKER.finditer(buffer, start):
+        marker = match.group("fence")
+        if fence is not None:
+            if marker is not None and marker[:1] == fence[:1] and len(marker) >= len(fence):
+                fence = None
+        elif marker is not None:
+            fence = marker
+        elif match.group("level") is not None:
+            title = (match.group("title") or b"").decode("utf-8", errors="replace")
+            yield Heading(len(match.group("level")), title, match.start())
+
+
+def scan_headings(path: Path) -> List[Heading]:
+    """
+    Find every ATX heading of a note by scanning its bytes, headings in fenced code blocks are skipped.
+    The note is memory mapped and only heading titles are decoded.
+
+    Parameters
+    ----------
+    path: Path
+        Path to markdown file.
+
+    Returns
+    ----------
+    List[Heading]
+        Headings in order of the file.
+    """
+    with mapped(path) as buffer:
+        return list(iter_headings(buffer))
+
+
+def section_bounds(headings: List[Heading], title: str, size: int) -> Tuple[Heading, int]:
+    """
+    Find a section by heading title, ignoring case.
+
+    Parameters
+    ----------
+    headings: List[Heading]
+        Headings of the note, refer to `scan_headings`.
+    title: str
+        Title of heading.
+    size: int
+        Size of the note in bytes.
+
+    Returns
+    ----------
+    Tuple[Heading, int]
+        Heading of the section and the byte offset the section ends at, the start of the next heading
+        of the same or a higher level, or the end of the file.
+    """
+    lowered = title.strip().lower()
+    for i, heading in enumerate(headings):
+        if heading.title.strip().lower() != lowered:
+            continue
+        for following in headings[i + 1 :]:
+            if following.level <= heading.level:
+                return heading, following.offset
+        return heading, size
+    raise KeyError(f"Heading not found: {title}")
+
+
+def read_section(path: Path, title: str, heading_index: Optional["HeadingIndex"] = None) -> str:
+    """
+    Read one section of a note, from its heading to the next heading of the same or a higher level.
+    Only the bytes of the section are decoded.
+
+    Parameters
+    ----------
+    path: Path
+        Path to markdown file.
+    title: str
+        Title of heading, ignoring case.
+    heading_index: Optional[HeadingIndex]
+        Cache of heading offsets, the note is scanned if None.
+
+    Raises
+    ----------
+    KeyError
+        If the note has no heading with the title.
+    """
+    headings = heading_index.headings(path) if heading_index is not None else scan_headings(path)
+    with mapped(path) as buffer:
+        heading, end = section_bounds(headings, title, len(buffer))
+        return buffer[heading.offset : end].decode("utf-8", errors="replace").replace("\r\n", "\n")
+
+
+class HeadingIndex:
+    """
+    Cache of heading byte offsets per note, stored as JSON and keyed on each note's mtime and size.
+
+    A note is only scanned again when it was changed by something other than `shift`, the cache is
+    only written when an entry changed.
+    """
+
+    def __init__(self, cache_file: Path) -> None:
+        """
+        Parameters
+        ----------
+        cache_file: Path
+            JSON file the offsets are stored in.
+        """
+        self.cache_file = cache_file
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+        if cache_file.exists():
+            try:
+                self._entries = json.loads(cache_file.read_text())
+            except ValueError:
+                self._entries = {}
+
+    @staticmethod
+    def _stamp(path: Path) -> Tuple[int, int]:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def headings(self, path: Path) -> List[Heading]:
+        """Headings of a note, scanned only if the note changed since it was cached."""
+        key = str(path.resolve())
+        stamp = self._stamp(path)
+        entry = self._entries.get(key)
+        if entry is not None and tuple(entry["stamp"]) == stamp:
+            return [Heading(*heading) for heading in entry["headings"]]
+
+        headings = scan_headings(path)
+        self._entries[key] = {"stamp": list(stamp), "headings": [list(heading) for heading in headings]}
+        self._dirty = True
+        return headings
+
+    def shift(self, path: Path, offset: int, delta: int) -> None:
+        """
+        Record that `delta` bytes were inserted at `offset`, without scanning the note again.
+
+        Parameters
+        ----------
+        path: Path
+            Path of note, the cached mtime and size are updated from the file.
+        offset: int
+            Byte offset the bytes were inserted at.
+        delta: int
+            Number of bytes inserted.
+        """
+        key = str(path.resolve())
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        for heading in entry["headings"]:
+            if heading[2] >= offset:
+                heading[2] += delta
+        entry["stamp"] = list(self._stamp(path))
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache to file, if it changed since it was read."""
+        if not self._dirty:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps(self._entries))
+        os.replace(tmp_file, self.cache_file)
+        self._dirty = False
@@ -1 +1,11 @@
-from .functions import fetch_template, filename_from_format, apply_template, DEFAULT_TEMPLATE_STRING
+from .functions import (
+    fetch_template,
+    filename_from_format,
+    frozen_datetime,
+    FilenameGenerator,
+    apply_template,
+    compile_string,
+    set_bytecode_cache,
+    template_environment,
+    DEFAULT_TEMPLATE_STRING,
+)
@@ -0,0 +1,205 @@
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from ..note import Note
+from .functions import compile_string, fetch_template
+
+# File in the cache directory templates that passed their check are recorded in.
+CHECKED_TEMPLATES_NAME: str = "checked-templates.json"
+# Data passed to templates by commands, e.g. `tn -cb` sets clipboard, stubbed when checking templates.
+STUB_DATA: Dict[str, Any] = {"clipboard": "Clipboard", "link": "Link", "since": date(2026, 1, 1)}
+
+
+class StubNotes(list):
+    """Stands in for the `notes` of a rollup, refer to `LazyNotes`."""
+
+    def items(self) -> List[Tuple[Path, Note]]:
+        """Path and note pairs, refer to `LazyNotes.items`."""
+        return [(Path(f"{note.title}.md"), note) for note in self]
+
+
+class TemplateCheck(NamedTuple):
+    """Result of checking a template, error is None if it rendered."""
+
+    name: str
+    source: str
+    error: Optional[str]
+
+
+def stub_note() -> Note:
+    """Note with every field set, templates are rendered against it when checked."""
+    return Note(
+        front_matter={"tags": ["tag"], "creation_date": datetime(2026, 1, 1, 12, 0)},
+        title="Title",
+        content="Content",
+        date=datetime(2026, 1, 1, 12, 0),
+        links=["Other note"],
+    )
+
+
+def check_source(source: str, context: Dict[str, Any], name: str = "template") -> Optional[str]:
+    """
+    Compile and render a template in a sandbox, any use of an undefined name is an error.
+
+    Parameters
+    ----------
+    source: str
+        Jinja template string.
+    context: Dict[str, Any]
+        Names the template is rendered with.
+    name: str
+        Name used in error messages.
+
+    Returns
+    ----------
+    Optional[str]
+        Error message, None if the template rendered.
+    """
+    from jinja2 import StrictUndefined, TemplateError
+    from jinja2.sandbox import ImmutableSandboxedEnvironment
+
+    environment = ImmutableSandboxedEnvironment(undefined=StrictUndefined)
+    try:
+        environment.from_string(source).render(**context)
+    except TemplateError as e:
+        return f"{name}{_line(e)}: {e}"
+    except Exception as e:
+        return f"{name}{_line(e)}: {type(e).__name__}: {e}"
+    return None
+
+
+def _line(error: Exception) -> str:
+    """Line of the template an error was raised on, syntax errors carry it, render errors are in the traceback."""
+    import traceback
+
+    line = getattr(error, "lineno", None)
+    if line is None:
+        frames = [frame for frame in traceback.extract_tb(error.__traceback__) if frame.filename == "<template>"]
+        line = frames[-1].lineno if frames else None
+    return f", line {line}" if line else ""
+
+
+def note_context(data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Names a note template is rendered with, against stub values, refer to `apply_template`."""
+    note = stub_note()
+    return {"note": note, "datetime": datetime, "notes": StubNotes([note]), **STUB_DATA, **(data or {})}
+
+
+def format_context(title: Optional[str]) -> Dict[str, Any]:
+    """Names a filename format is rendered with, refer to `filename_from_format`."""
+    return {"datetime": datetime, "title": title}
+
+
+class CheckedTemplates:
+    """
+    Templates that passed `check_template`, stored with the mtime and size of the file they were
+    checked at, so a note template is only checked again after it changes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """
+        Parameters
+        ----------
+        path: Path
+            JSON file the checked templates are stored in.
+        """
+        self.path = path
+        try:
+            self._checked: Dict[str, List[int]] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self._checked = {}
+
+    @staticmethod
+    def _stamp(template_path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = template_path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def is_checked(self, template_path: Path) -> bool:
+        """Check if the template passed its check and hasn't changed since."""
+        stamp = self._stamp(template_path)
+        return stamp is not None and tuple(self._checked.get(str(template_path), ())) == stamp
+
+    def mark(self, template_path: Path) -> None:
+        """Record a template that passed its check."""
+        stamp = self._stamp(template_path)
+        if stamp is not None:
+            self._checked[str(template_path)] = list(stamp)
+
+    def save(self) -> None:
+        """Write the checked templates."""
+        from ..io import NoteWriter
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        NoteWriter("never").write(self.path, json.dumps(self._checked))
+
+
+def check_template(template_path: Optional[Path], data: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Check a note template renders against a stub note, then compile it into the bytecode cache used
+    when notes are written.
+
+    Parameters
+    ----------
+    template_path: Optional[Path]
+        Template file, None checks the default template.
+    data: Optional[Dict[str, Any]]
+        Data the template is rendered with, in addition to `STUB_DATA`.
+
+    Returns
+    ----------
+    Optional[str]
+        Error message, None if the template is valid.
+    """
+    from .functions import DEFAULT_TEMPLATE_STRING
+
+    name = str(template_path) if template_path is not None else "default template"
+    try:
+        source = template_path.read_text() if template_path is not None else DEFAULT_TEMPLATE_STRING
+    except OSError as e:
+        return f"{name}: {e}"
+    error = check_source(source, note_context(data), name)
+    if error is None:
+        # Compiled once more by the environment notes are written with, which caches the bytecode.
+        fetch_template(template_path)
+    return error
+
+
+def check_templates(
+    templates: Dict[str, Optional[Path]], formats: Dict[str, str], checked: Optional[CheckedTemplates] = None
+) -> List[TemplateCheck]:
+    """
+    Check note templates and filename formats, refer to `check_template`.
+
+    Parameters
+    ----------
+    templates: Dict[str, Optional[Path]]
+        Note templates by key, a None path is the default template.
+    formats: Dict[str, str]
+        Filename formats by key, refer to `FORMAT.filename`.
+    checked: Optional[CheckedTemplates]
+        Templates that pass are recorded here.
+
+    Returns
+    ----------
+    List[TemplateCheck]
+        Result of every template then every format.
+    """
+    results = []
+    for key, template_path in templates.items():
+        error = check_template(template_path)
+        if error is None and checked is not None and template_path is not None:
+            checked.mark(template_path)
+        results.append(TemplateCheck(key, str(template_path or "default"), error))
+
+    for key, source in formats.items():
+        title = "Title" if key == "long" else None
+        error = check_source(source, format_context(title), f"FORMAT.filename.{key}")
+        if error is None:
+            compile_string(source)
+        results.append(TemplateCheck(f"FORMAT.filename.{key}", source, error))
+    return results
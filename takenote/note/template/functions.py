@@ -1,8 +1,17 @@
-from datetime import datetime
+import hashlib
+import os
+from datetime import datetime, tzinfo
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional
-from jinja2 import Template
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Type
 from ..note import Note
+from ...trace import span
+
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
+
+# Directory compiled templates are cached in, refer to `set_bytecode_cache`.
+_BYTECODE_CACHE_DIR: Optional[Path] = None
 
 DEFAULT_TEMPLATE_STRING = """
 ---
@@ -20,7 +29,70 @@ DEFAULT_TEMPLATE_STRING = """
 """
 
 
-def filename_from_format(format: Dict[str, str], title: Optional[str]) -> str:
+def set_bytecode_cache(directory: Optional[Path]) -> None:
+    """
+    Set the directory compiled templates are stored in, so templates are only compiled once across runs.
+
+    Parameters
+    ----------
+    directory: Optional[Path]
+        Cache directory, None disables the on disk cache.
+    """
+    global _BYTECODE_CACHE_DIR
+    if directory == _BYTECODE_CACHE_DIR:
+        return
+    _BYTECODE_CACHE_DIR = directory
+    template_environment.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def template_environment(searchpath: Optional[str] = None) -> "Environment":
+    """
+    Shared Jinja environment for a template directory, created once per process.
+
+    Templates are reloaded when their mtime changes, compiled bytecode is kept on disk when a
+    cache directory is set.
+
+    Parameters
+    ----------
+    searchpath: Optional[str]
+        Template directory, None returns the environment of template strings, refer to `compile_string`.
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, FunctionLoader
+
+    bytecode_cache = None
+    if _BYTECODE_CACHE_DIR is not None:
+        _BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(_BYTECODE_CACHE_DIR))
+
+    return Environment(
+        loader=FileSystemLoader(searchpath) if searchpath is not None else FunctionLoader(_STRING_SOURCES.get),
+        bytecode_cache=bytecode_cache,
+        auto_reload=True,
+    )
+
+
+# Template strings by name, loaded by name so their bytecode is cached on disk like template files.
+_STRING_SOURCES: Dict[str, str] = {}
+
+
+@lru_cache(maxsize=None)
+def compile_string(source: str) -> "Template":
+    """
+    Compile a template string once per process, used for filename formats and the default template.
+    Compiled bytecode is kept on disk when a cache directory is set, refer to `set_bytecode_cache`.
+
+    Parameters
+    ----------
+    source: str
+        Jinja template string.
+    """
+    name = f"string-{hashlib.sha1(source.encode()).hexdigest()}"
+    _STRING_SOURCES[name] = source
+    return template_environment().get_template(name)
+
+
+def filename_from_format(format: str, title: Optional[str]) -> str:
     """
     Generate filename string from defined format.
 
@@ -29,7 +101,7 @@ def filename_from_format(format: Dict[str, str], title: Optional[str]) -> str:
 
     Parameters
     ----------
-    format:
+    format: str
         Jinja string representting format as described.
     title: Optional[str]
         Title string.
@@ -39,15 +111,107 @@ def filename_from_format(format: Dict[str, str], title: Optional[str]) -> str:
     str
         Processed template string.
     """
-
-    template = Template(format)
+    template = compile_string(format)
     try:
         return template.render(datetime=datetime, title=title)
     except TypeError:
         raise Exception(f"Error with template for file title: {title} format: {format}")
 
 
-def fetch_template(template_path: Optional[Path]) -> Template:
+def frozen_datetime(timestamp: datetime) -> Type[datetime]:
+    """
+    `datetime` class whose `now` always returns the timestamp, passed to templates so every note of a
+    batch is rendered with the same time.
+
+    Parameters
+    ----------
+    timestamp: datetime
+        Time returned by `now`.
+    """
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz: Optional[tzinfo] = None) -> "FrozenDatetime":
+            frozen = timestamp if tz is None else timestamp.astimezone(tz)
+            return cls.combine(frozen.date(), frozen.timetz())
+
+    return FrozenDatetime
+
+
+class FilenameGenerator:
+    """
+    Generates filenames for a batch of notes from the filename formats.
+
+    Each format is compiled once and rendered with one captured timestamp, titles already rendered are
+    reused. The directory is listed once, filenames that collide with an existing note, or an earlier
+    note of the batch, get a counter suffix `-1`, `-2`, ... in the order they are generated. Names are
+    compared ignoring case, so batches stay safe on case insensitive file systems.
+    """
+
+    def __init__(
+        self,
+        formats: Dict[str, str],
+        directory: Path,
+        extension: str = "md",
+        timestamp: Optional[datetime] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        formats: Dict[str, str]
+            Filename formats, "long" for notes with a title else "short", refer to `FORMAT.filename`.
+        directory: Path
+            Directory notes are written to, a missing directory is treated as empty.
+        extension: str
+            Extension of notes.
+        timestamp: Optional[datetime]
+            Time of the batch, defaults to now.
+        """
+        self.timestamp = timestamp or datetime.now()
+        self.extension = extension
+        # Frozen `datetime` class, also pass it to the note template so notes match their filenames.
+        self.datetime = frozen_datetime(self.timestamp)
+        self._templates = {key: compile_string(filename_format) for key, filename_format in formats.items()}
+        self._rendered: Dict[Optional[str], str] = {}
+        self._taken: Set[str] = set()
+        try:
+            with os.scandir(directory) as entries:
+                self._taken = {entry.name.casefold() for entry in entries}
+        except FileNotFoundError:
+            pass
+
+    def render(self, title: Optional[str]) -> str:
+        """Render the filename of a title from the format, before collisions are resolved."""
+        rendered = self._rendered.get(title)
+        if rendered is None:
+            template = self._templates["long" if title else "short"]
+            rendered = self._rendered[title] = template.render(datetime=self.datetime, title=title)
+        return rendered
+
+    def filename(self, title: Optional[str]) -> str:
+        """
+        Return a unique filename for a note, without extension.
+
+        Parameters
+        ----------
+        title: Optional[str]
+            Title of note, None or empty uses the short format.
+        """
+        stem = self.render(title)
+        name = stem
+        counter = 0
+        while f"{name}.{self.extension}".casefold() in self._taken:
+            counter += 1
+            name = f"{stem}-{counter}"
+        self._taken.add(f"{name}.{self.extension}".casefold())
+        return name
+
+    def filenames(self, titles: Iterable[Optional[str]]) -> List[str]:
+        """Return unique filenames for titles, in order, refer to `filename`."""
+        return [self.filename(title) for title in titles]
+
+
+def fetch_template(template_path: Optional[Path]) -> "Template":
     """
     Fetch template to process.
 
@@ -56,7 +220,15 @@ def fetch_template(template_path: Optional[Path]) -> Template:
     template_path: Optional[Path]
         Template file path, if left as None, will use default [DEFAULT_TEMPLATE_STRING].
     """
-    return Template(template_path.read_text() if template_path is not None else DEFAULT_TEMPLATE_STRING)
+    if template_path is None:
+        return compile_string(DEFAULT_TEMPLATE_STRING)
+
+    from jinja2 import TemplateNotFound
+
+    try:
+        return template_environment(str(template_path.parent)).get_template(template_path.name)
+    except TemplateNotFound as e:
+        raise FileNotFoundError(f"Template file not found: {template_path}") from e
 
 
 def apply_template(template_path: Optional[Path], note: Note, addtional_data: Optional[Dict[str, str]]) -> str:
@@ -83,8 +255,10 @@ def apply_template(template_path: Optional[Path], note: Note, addtional_data: Op
     str
         Processed template string.
     """
-    template = fetch_template(template_path)
-    try:
-        return template.render(note=note, datetime=datetime, **addtional_data)
-    except TypeError:
-        raise Exception(f"Error with template applying template, path: {template_path}")
+    with span("apply_template", template=template_path or "default"):
+        with span("fetch_template"):
+            template = fetch_template(template_path)
+        try:
+            return template.render(note=note, datetime=datetime, **(addtional_data or {}))
+        except TypeError:
+            raise Exception(f"Error with template applying template, path: {template_path}")
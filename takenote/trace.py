@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .log import logger
+
+# Environment variable enabling tracing, "1" logs spans, any other value is a Chrome trace file path.
+TRACE_ENV: str = "TN_TRACE"
+
+
+class Span:
+    """A timed, named phase of a run, nested spans record their parent."""
+
+    __slots__ = ("tracer", "name", "args", "start", "parent")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict[str, Any]) -> None:
+        """
+        Parameters
+        ----------
+        tracer: Tracer
+            Tracer the span is recorded by.
+        name: str
+            Name of the phase.
+        args: Dict[str, Any]
+            Details recorded with the span.
+        """
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0
+        self.parent: Optional[str] = None
+
+    def __enter__(self) -> "Span":
+        """Start timing, the innermost open span of the thread is the parent."""
+        stack = self.tracer.stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Stop timing and record the span, exceptions are not suppressed."""
+        end = time.perf_counter_ns()
+        self.tracer.stack().pop()
+        self.tracer.record(self, end)
+
+
+class _NullSpan:
+    """Span used while tracing is disabled, shared so disabled spans allocate nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects finished spans in memory, they are written out once by `finish`."""
+
+    def __init__(self, trace_file: Optional[Path] = None) -> None:
+        """
+        Parameters
+        ----------
+        trace_file: Optional[Path]
+            Chrome trace event file to write, if None spans are logged as JSON.
+        """
+        self.trace_file = trace_file
+        self.origin = time.perf_counter_ns()
+        self.events: List[Dict[str, Any]] = []
+        self._local = threading.local()
+        self.root = Span(self, "tn", {})
+
+    def stack(self) -> List[Span]:
+        """Open spans of the current thread."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, span: Span, end: int) -> None:
+        """Store a finished span."""
+        self.events.append(
+            {
+                "name": span.name,
+                "parent": span.parent,
+                "start_us": (span.start - self.origin) / 1000,
+                "duration_us": (end - span.start) / 1000,
+                "thread": threading.get_ident(),
+                "args": {key: str(value) for key, value in span.args.items()},
+            }
+        )
+
+    def finish(self) -> None:
+        """Write the spans, as a Chrome trace event file or as JSON log records."""
+        if self.trace_file is None:
+            for event in self.events:
+                logger.info(f"trace {json.dumps(event)}")
+            return
+
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [
+                {
+                    "name": event["name"],
+                    "ph": "X",
+                    "ts": event["start_us"],
+                    "dur": event["duration_us"],
+                    "pid": pid,
+                    "tid": event["thread"],
+                    "args": event["args"],
+                }
+                for event in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+        self.trace_file.parent.mkdir(parents=True, exist_ok=True)
+        self.trace_file.write_text(json.dumps(trace))
+        logger.info(f"Trace written to {self.trace_file}")
+
+
+_tracer: Optional[Tracer] = None
+
+
+def span(name: str, **args: Any):
+    """
+    Context manager timing a phase, a no-op unless tracing is enabled.
+
+    Parameters
+    ----------
+    name: str
+        Name of the phase.
+    **args
+        Details recorded with the span, converted to strings only when tracing.
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, args)
+
+
+def enabled() -> bool:
+    """Check if spans are being recorded."""
+    return _tracer is not None
+
+
+def start_tracing(trace_file: Optional[Path] = None) -> Tracer:
+    """
+    Start recording spans, a root span `tn` covers everything until `stop_tracing`.
+
+    Parameters
+    ----------
+    trace_file: Optional[Path]
+        Chrome trace event file written by `stop_tracing`, spans are logged as JSON if None.
+    """
+    global _tracer
+    _tracer = Tracer(trace_file)
+    _tracer.root.__enter__()
+    return _tracer
+
+
+def stop_tracing() -> None:
+    """Stop recording and write the spans recorded."""
+    global _tracer
+    tracer = _tracer
+    if tracer is not None:
+        tracer.root.__exit__(None, None, None)
+        _tracer = None
+        tracer.finish()
+
+
+def trace_settings(flag: bool = False, trace_file: Optional[Path] = None) -> Tuple[bool, Optional[Path]]:
+    """
+    Resolve tracing options from the command line and `TN_TRACE`, command line options take precedence.
+
+    Parameters
+    ----------
+    flag: bool
+        `--trace` was given.
+    trace_file: Optional[Path]
+        `--trace-file` path.
+
+    Returns
+    ----------
+    Tuple[bool, Optional[Path]]
+        True if tracing, and the Chrome trace file, None to log spans.
+    """
+    if trace_file is not None:
+        return True, trace_file
+    value = os.environ.get(TRACE_ENV, "")
+    if value not in ("", "0", "1"):
+        return True, Path(value).expanduser()
+    return flag or value == "1", None
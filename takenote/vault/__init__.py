@@ -0,0 +1,7 @@
+from .index import VaultIndex, IndexExtension, IndexStats, NoteRecord, OutdatedIndexError, index_path, scan_vault
+from .search import SearchIndex, SearchResult, search_notes
+from .links import Link, LinkIndex, backlinks, outgoing_links, orphans, resolve
+from .watch import InotifyWatcher, PollingWatcher, open_watcher, watch_vault
+from .export import ExportStats, HtmlExport
+from .query import QueryError, QueryIndex, compile_query, query_notes, record_fields
+from .dedupe import BodyHash, DedupeIndex, DuplicateGroup, body_hash, duplicate_groups, find_duplicate
@@ -0,0 +1,285 @@
+import hashlib
+import heapq
+import re
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..note.note import Note
+from .index import IndexExtension, VaultIndex
+
+# Lines holding only a date or time, e.g. the `datetime.now()` line of the default template.
+DATE_LINE = re.compile(
+    r"^[*_]*(?:[A-Za-z]+,? )?(?:\d{1,2} [A-Za-z]+,? \d{4}|[A-Za-z]+ \d{1,2},? \d{4}|\d{4}-\d{2}-\d{2})"
+    r"(?:(?:,? |T)\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?)?[*_]*$"
+)
+# ATX level one heading, the title of a note.
+TITLE_LINE = re.compile(r"^ {0,3}#(?:[ \t]|$)")
+# Words per shingle of near duplicate detection.
+SHINGLE_SIZE: int = 5
+# Shingle hashes kept per MinHash signature.
+SIGNATURE_SIZE: int = 64
+# Smallest hashes of a signature notes are bucketed by, notes sharing a bucket are compared.
+BUCKET_KEYS: int = 8
+# Hash of an empty body, empty notes are not duplicates of each other.
+EMPTY_HASH: str = hashlib.sha1().hexdigest()
+
+
+class BodyHash:
+    """
+    Incremental hash of the body of a note, fed its text in chunks of any size.
+
+    The body excludes the front matter, the title line, lines holding only a date or time and blank
+    lines, trailing whitespace is ignored. Notes captured at different times from the same text hash
+    the same, whether the text is read from a file or streamed while it is written.
+    """
+
+    def __init__(self, front_matter: bool = True, keep_lines: bool = False) -> None:
+        """
+        Parameters
+        ----------
+        front_matter: bool
+            Text starts with the front matter, if any.
+        keep_lines: bool
+            Keep the lines of the body in `lines`, for `minhash`.
+        """
+        self._sha = hashlib.sha1()
+        self._partial = ""
+        self._state = "start" if front_matter else "body"
+        self._title = False
+        self.lines: Optional[List[str]] = [] if keep_lines else None
+
+    def update(self, chunk: str) -> None:
+        """Add text to the hash."""
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line)
+
+    def _line(self, line: str) -> None:
+        line = line.rstrip()
+        if self._state == "start":
+            if not line:
+                # Templates may start with a blank line.
+                return
+            self._state = "body"
+            if line == "---":
+                self._state = "front_matter"
+                return
+        elif self._state == "front_matter":
+            if line == "---":
+                self._state = "body"
+            return
+
+        if not line or DATE_LINE.match(line):
+            return
+        if not self._title and TITLE_LINE.match(line):
+            self._title = True
+            return
+        self._sha.update(line.encode())
+        self._sha.update(b"\n")
+        if self.lines is not None:
+            self.lines.append(line)
+
+    def hexdigest(self) -> str:
+        """Hash of the body, once all text is added."""
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+        return self._sha.hexdigest()
+
+
+def body_hash(text: str, front_matter: bool = True) -> str:
+    """Hash of the body of a note, refer to `BodyHash`."""
+    hasher = BodyHash(front_matter)
+    hasher.update(text)
+    return hasher.hexdigest()
+
+
+def minhash(lines: Iterable[str], size: int = SIGNATURE_SIZE, shingle: int = SHINGLE_SIZE) -> array:
+    """
+    Bottom-k MinHash signature of text, the smallest hashes of its shingles of words, ignoring case.
+
+    Each shingle is hashed once. Texts with fewer shingles than `size` keep every hash, so short
+    notes compare exactly.
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        Text, as lines.
+    size: int
+        Hashes kept.
+    shingle: int
+        Words per shingle.
+
+    Returns
+    ----------
+    array
+        Signature, sorted unsigned 32 bit integers.
+    """
+    words = " ".join(lines).lower().split()
+    shingles = {" ".join(gram) for gram in zip(*(words[i:] for i in range(min(shingle, len(words)))))}
+    hashes = (int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=4).digest(), "little") for gram in shingles)
+    return array("I", heapq.nsmallest(size, set(hashes)))
+
+
+def similarity(a: Sequence[int], b: Sequence[int], size: int = SIGNATURE_SIZE) -> float:
+    """
+    Estimated Jaccard similarity of two signatures, refer to `minhash`.
+
+    The smallest hashes of both texts are a sample of their shingles, the share of the sample found
+    in both signatures estimates the share of shingles they have in common.
+    """
+    both = set(a).intersection(b)
+    sample = heapq.nsmallest(size, set(a).union(b))
+    return sum(value in both for value in sample) / len(sample) if sample else 0.0
+
+
+class DedupeIndex(IndexExtension):
+    """
+    Body hash and MinHash signature of every note, for `duplicate_groups` and `find_duplicate`.
+
+    Bodies are hashed from the content the index has already read, which starts at the title, so they
+    match hashes taken of notes as they are written unless a note has text before its title.
+    """
+
+    name = "dedupe"
+    version = 2
+    needs_content = True
+
+    def create(self, db: sqlite3.Connection) -> None:
+        """Create the hash table, indexed by body hash."""
+        db.execute("CREATE TABLE note_hashes (path TEXT PRIMARY KEY, hash TEXT NOT NULL, signature BLOB NOT NULL)")
+        db.execute("CREATE INDEX note_hashes_hash ON note_hashes (hash)")
+
+    def add(self, db: sqlite3.Connection, path: str, note: Note, file: Path) -> None:
+        """Hash the body of a note and compute its signature, from the note content."""
+        hasher = BodyHash(front_matter=False, keep_lines=True)
+        hasher.update(note.content or "")
+        digest = hasher.hexdigest()
+        signature = minhash(hasher.lines or ())
+        db.execute(
+            "INSERT INTO note_hashes (path, hash, signature) VALUES (?, ?, ?)", (path, digest, signature.tobytes())
+        )
+
+    def remove(self, db: sqlite3.Connection, path: str) -> None:
+        """Remove the hash of a note."""
+        db.execute("DELETE FROM note_hashes WHERE path = ?", (path,))
+
+
+def find_duplicate(db: sqlite3.Connection, digest: str) -> Optional[str]:
+    """
+    Path of an indexed note with a body hash, using the hash index.
+
+    Parameters
+    ----------
+    db: sqlite3.Connection
+        Index database, with the `DedupeIndex` extension.
+    digest: str
+        Body hash, refer to `BodyHash`.
+    """
+    if digest == EMPTY_HASH:
+        return None
+    row = db.execute("SELECT path FROM note_hashes WHERE hash = ? ORDER BY path LIMIT 1", (digest,)).fetchone()
+    return row[0] if row is not None else None
+
+
+class DuplicateGroup(NamedTuple):
+    """Notes with the same body, or similar bodies with the lowest estimated similarity of the group."""
+
+    paths: List[str]
+    exact: bool
+    similarity: float
+
+
+def duplicate_groups(vault: VaultIndex, near: bool = False, threshold: float = 0.8) -> List[DuplicateGroup]:
+    """
+    Group notes with the same body, and optionally notes with similar bodies.
+
+    Exact duplicates share a body hash. Near duplicates are found with locality sensitive hashing,
+    notes are bucketed by the smallest hashes of their signatures and each note is compared with the
+    first note of its buckets only, so the cost grows with the number of notes rather than pairs.
+
+    Parameters
+    ----------
+    vault: VaultIndex
+        Index, with the `DedupeIndex` extension.
+    near: bool
+        Also group notes whose estimated similarity is at least `threshold`.
+    threshold: float
+        Estimated Jaccard similarity of the word shingles of two notes, between 0 and 1.
+
+    Returns
+    ----------
+    List[DuplicateGroup]
+        Groups of two or more notes, paths ordered, exact duplicates first.
+    """
+    by_hash, signatures = _read_hashes(vault.db)
+    groups = [DuplicateGroup(paths, True, 1.0) for paths in by_hash.values() if len(paths) > 1]
+    if near:
+        # Expanded with the exact duplicates of each member.
+        same = {paths[0]: paths for paths in by_hash.values()}
+        for members, score in _near_groups(signatures, threshold):
+            groups.append(DuplicateGroup(sorted(path for member in members for path in same[member]), False, score))
+    return groups
+
+
+def _read_hashes(db: sqlite3.Connection) -> Tuple[Dict[str, List[str]], Dict[str, array]]:
+    """
+    Read the hashes of every note with a body.
+
+    Returns
+    ----------
+    Tuple[Dict[str, List[str]], Dict[str, array]]
+        Paths of the notes of each body hash, ordered, and the signature of the first note of each
+        body hash, exact duplicates are compared as one note.
+    """
+    by_hash: Dict[str, List[str]] = {}
+    signatures: Dict[str, array] = {}
+    rows = db.execute("SELECT path, hash, signature FROM note_hashes WHERE hash != ? ORDER BY path", (EMPTY_HASH,))
+    for path, digest, blob in rows:
+        paths = by_hash.setdefault(digest, [])
+        if not paths:
+            signature = array("I")
+            signature.frombytes(blob)
+            signatures[path] = signature
+        paths.append(path)
+    return by_hash, signatures
+
+
+def _near_groups(signatures: Dict[str, array], threshold: float) -> List[Tuple[List[str], float]]:
+    """
+    Group notes with similar signatures, refer to `duplicate_groups`.
+
+    Returns
+    ----------
+    List[Tuple[List[str], float]]
+        Paths of each group of two or more notes, and the lowest similarity that joined the group.
+    """
+    parent = {path: path for path in signatures}
+
+    def find(path: str) -> str:
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    scores: Dict[str, float] = {}
+    buckets: Dict[int, str] = {}
+    for path, signature in signatures.items():
+        # Similar texts very likely share some of their smallest hashes.
+        for key in signature[:BUCKET_KEYS]:
+            first = buckets.setdefault(key, path)
+            if first == path or find(first) == find(path):
+                continue
+            score = similarity(signatures[first], signature)
+            if score >= threshold:
+                a, b = find(first), find(path)
+                parent[b] = a
+                scores[a] = min(score, scores.get(a, 1.0), scores.pop(b, 1.0))
+
+    groups: Dict[str, List[str]] = {}
+    for path in signatures:
+        groups.setdefault(find(path), []).append(path)
+    return [(members, scores.get(root, 1.0)) for root, members in groups.items() if len(members) > 1]
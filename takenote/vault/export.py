@@ -0,0 +1,385 @@
+import hashlib
+import json
+import os
+import posixpath
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from html import escape
+from pathlib import Path, PurePosixPath
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import quote, urlsplit
+
+from ..log import logger
+from ..note.io import NoteWriter, markdown_parser, read_markdown_many
+from ..note.links import link_target, note_name
+from .index import PARALLEL_THRESHOLD, VaultIndex, scan_vault
+from .links import outgoing_links
+
+# Bump when pages change, every page is rendered again on mismatch.
+EXPORT_VERSION: int = 1
+# Manifest of the exported notes, kept in the output directory.
+MANIFEST_NAME: str = ".tn-export.json"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+<article>
+{body}</article>
+{backlinks}</body>
+</html>
+"""
+BACKLINKS_TEMPLATE = """<nav class="backlinks">
+<h2>Backlinks</h2>
+<ul>
+{items}</ul>
+</nav>
+"""
+
+
+class ExportStats(NamedTuple):
+    """Result of an export, rendered counts notes that changed and notes whose links or backlinks changed."""
+
+    notes: int
+    rendered: int
+    removed: int
+    failed: int
+    seconds: float
+
+
+class _Rendered(NamedTuple):
+    path: str
+    title: str
+    body: str
+
+
+# Note name to note path, set in each worker process, refer to `_init_worker`.
+_names: Dict[str, str] = {}
+
+
+def page_path(path: str) -> str:
+    """Path of the page of a note, relative to the output directory."""
+    return f"{posixpath.splitext(path)[0]}.html"
+
+
+def page_href(source: str, target: str) -> str:
+    """URL of the page of note `target`, relative to the page of note `source`."""
+    relative = posixpath.relpath(page_path(target), posixpath.dirname(source) or ".")
+    return quote(relative)
+
+
+def note_names(paths: Iterable[str], extension: str = "md") -> Dict[str, str]:
+    """Note name to note path, a name shared by several notes resolves to the first path in order."""
+    names: Dict[str, str] = {}
+    for path in sorted(paths):
+        names.setdefault(note_name(path, extension), path)
+    return names
+
+
+def render_note(root: Path, path: str, names: Dict[str, str], extension: str = "md") -> _Rendered:
+    """
+    Render a note to HTML, links to notes in the vault point to their pages.
+
+    Parameters
+    ----------
+    root: Path
+        Vault root.
+    path: str
+        Note path relative to the root.
+    names: Dict[str, str]
+        Note name to note path, refer to `note_names`.
+    extension: str
+        Extension of notes, refer to `note_name`.
+    """
+    md = markdown_parser()
+    tokens = md.parse((root / path).read_text())
+
+    title = None
+    for i, token in enumerate(tokens):
+        if token.type == "heading_open" and token.tag == "h1":
+            title = tokens[i + 1].content or None
+            break
+    for token in tokens:
+        if token.type != "inline" or not token.children:
+            continue
+        for child in token.children:
+            if child.type == "wikilink":
+                resolved = names.get(note_name(child.meta["target"], extension)) if child.meta["target"] else None
+                if resolved is not None:
+                    child.meta["href"] = page_href(path, resolved)
+            elif child.type == "link_open":
+                href = str(child.attrGet("href") or "")
+                target = link_target(href)
+                resolved = names.get(note_name(target, extension)) if target is not None else None
+                if resolved is not None:
+                    fragment = urlsplit(href).fragment
+                    child.attrSet("href", page_href(path, resolved) + (f"#{fragment}" if fragment else ""))
+
+    body = md.renderer.render(tokens, md.options, {})
+    return _Rendered(path, title or PurePosixPath(path).stem, body)
+
+
+def _init_worker(names: Dict[str, str]) -> None:
+    global _names
+    _names = names
+
+
+# Path, rendered page or the error rendering it.
+_RenderResult = Tuple[str, Optional[_Rendered], Optional[BaseException]]
+
+
+def _render_chunk(
+    root: Path, extension: str, paths: List[str], names: Optional[Dict[str, str]] = None
+) -> List[_RenderResult]:
+    """Render a chunk of notes, runs in a worker process, errors are returned rather than raised."""
+    names = names if names is not None else _names
+    results: List[_RenderResult] = []
+    for path in paths:
+        try:
+            results.append((path, render_note(root, path, names, extension), None))
+        except Exception as e:
+            results.append((path, None, e))
+    return results
+
+
+def file_hash(path: Path) -> str:
+    """SHA-1 of the contents of a file."""
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def load_manifest(out: Path, root: Path) -> Dict[str, Dict]:
+    """Load the notes of the previous export to `out`, empty if there is none or it was of another vault or version."""
+    try:
+        manifest = json.loads((out / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != EXPORT_VERSION or manifest.get("root") != str(root):
+        return {}
+    return manifest["notes"]
+
+
+class HtmlExport:
+    """
+    Incremental export of a vault to a static HTML site, one page per note with its backlinks.
+
+    A manifest in the output directory records the content hash, links and backlinks of each note.
+    Links of notes whose content changed are read first, from the vault index when it is up to date,
+    and the link graph is resolved before any page is rendered. Pages of changed notes and of notes
+    whose resolved links or backlinks changed are then rendered and written one at a time, every other
+    page is left as is. Notes are rendered by a pool of worker processes.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        out: Path,
+        extension: str = "md",
+        workers: Optional[int] = None,
+        chunksize: int = 32,
+        writer: Optional[NoteWriter] = None,
+        index: Optional[VaultIndex] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        root: Path
+            Vault root.
+        out: Path
+            Output directory, created if missing.
+        extension: str
+            Extension of notes.
+        workers: Optional[int]
+            Number of worker processes, None uses the number of CPUs.
+        chunksize: int
+            Number of notes sent to a worker at a time.
+        writer: Optional[NoteWriter]
+            Writer of pages, pages can be exported again so by default they are not synced to disk.
+        index: Optional[VaultIndex]
+            Index of the vault with the `LinkIndex` extension, links of notes it is up to date with are
+            not read from the notes.
+        """
+        self.root = root.expanduser().resolve()
+        self.out = out
+        self.extension = extension
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.writer = writer or NoteWriter("never")
+        self.index = index
+
+    def _compare(
+        self, previous: Dict[str, Dict], stamps: Dict[str, Tuple[int, int]]
+    ) -> Tuple[Dict[str, Dict], List[str]]:
+        """
+        Compare the vault with the previous export.
+
+        Returns
+        ----------
+        Tuple[Dict[str, Dict], List[str]]
+            Manifest entry of every note, unchanged notes keep their hash and links, and the notes
+            whose content changed.
+        """
+        notes: Dict[str, Dict] = {}
+        changed = []
+        for path, stamp in stamps.items():
+            entry = previous.get(path)
+            if entry is not None and tuple(entry["stamp"]) == stamp:
+                # Copied, the previous entry is compared against later.
+                notes[path] = dict(entry)
+                continue
+            digest = file_hash(self.root / path)
+            if entry is not None and entry["hash"] == digest:
+                notes[path] = dict(entry, stamp=list(stamp))
+            else:
+                notes[path] = {"stamp": list(stamp), "hash": digest, "links": []}
+                changed.append(path)
+        return notes, changed
+
+    def _read_links(self, notes: Dict[str, Dict], changed: List[str]) -> Set[str]:
+        """
+        Set the linked note names of changed notes, from the index if it is up to date with a note,
+        else read from the note by worker processes.
+
+        Returns
+        ----------
+        Set[str]
+            Notes that failed to read.
+        """
+        unread = []
+        for path in changed:
+            record = self.index.get(Path(path)) if self.index is not None else None
+            if self.index is not None and record is not None and [record.mtime_ns, record.size] == notes[path]["stamp"]:
+                links = outgoing_links(self.index.db, path, self.extension)
+                notes[path]["links"] = self._names([link.target for link in links])
+            else:
+                unread.append(path)
+
+        workers = self.workers if len(unread) >= PARALLEL_THRESHOLD else 1
+        read = set()
+        for file, note in read_markdown_many(
+            (self.root / path for path in unread), workers=workers, skip_errors=True, chunksize=self.chunksize
+        ):
+            path = file.relative_to(self.root).as_posix()
+            notes[path]["links"] = self._names(note.links or [])
+            read.add(path)
+        return set(unread) - read
+
+    def _names(self, targets: List[str]) -> List[str]:
+        """Note names of link targets, in order without duplicates."""
+        return list(dict.fromkeys(note_name(target, self.extension) for target in targets))
+
+    @staticmethod
+    def _link_graph(notes: Dict[str, Dict], names: Dict[str, str]) -> None:
+        """Resolve the links of every note to note paths, and set the backlinks of every note."""
+        backlinks: Dict[str, List[str]] = {path: [] for path in notes}
+        for source, entry in notes.items():
+            entry["resolved"] = [names.get(name) for name in entry["links"]]
+            for target in entry["resolved"]:
+                if target is not None and target != source:
+                    backlinks[target].append(source)
+        for path, entry in notes.items():
+            entry["backlinks"] = sorted(backlinks[path])
+
+    def _stale(self, path: str, entry: Dict, old: Dict) -> bool:
+        """Check if the page of an unchanged note is stale, its links or backlinks changed or it is missing."""
+        return (
+            entry["resolved"] != old.get("resolved")
+            or entry["backlinks"] != old.get("backlinks")
+            or not os.path.exists(os.path.join(self.out, page_path(path)))
+        )
+
+    def _render(self, paths: List[str], names: Dict[str, str]) -> Iterator[_Rendered]:
+        """Render notes in order, in worker processes unless there are only a few."""
+        chunks = (paths[i : i + self.chunksize] for i in range(0, len(paths), self.chunksize))
+        results: Iterator[_RenderResult]
+        if self.workers <= 1 or len(paths) < PARALLEL_THRESHOLD:
+            results = (result for chunk in chunks for result in _render_chunk(self.root, self.extension, chunk, names))
+        else:
+            results = self._render_pool(chunks, names)
+
+        for path, rendered, error in results:
+            if error is not None:
+                logger.warning(f"Failed to export note {path}: {error}")
+                continue
+            yield rendered  # type: ignore
+
+    def _render_pool(self, chunks: Iterator[List[str]], names: Dict[str, str]) -> Iterator[_RenderResult]:
+        """Render chunks in a process pool, keeping a bounded number in flight so pages are never all held at once."""
+        limit = self.workers * 2
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(names,)) as pool:
+            queue: Deque[Future] = deque()
+            for chunk in chunks:
+                queue.append(pool.submit(_render_chunk, self.root, self.extension, chunk))
+                if len(queue) >= limit:
+                    yield from queue.popleft().result()
+            while queue:
+                yield from queue.popleft().result()
+
+    def _write_page(self, rendered: _Rendered, backlinks: List[str]) -> None:
+        items = "".join(
+            f'<li><a href="{escape(page_href(rendered.path, source))}">{escape(PurePosixPath(source).stem)}</a></li>\n'
+            for source in backlinks
+        )
+        page = PAGE_TEMPLATE.format(
+            title=escape(rendered.title),
+            body=rendered.body,
+            backlinks=BACKLINKS_TEMPLATE.format(items=items) if backlinks else "",
+        )
+        path = self.out / page_path(rendered.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.writer.write(path, page)
+
+    def _remove_pages(self, paths: Iterable[str]) -> int:
+        """Remove the pages of deleted notes, returns the number removed."""
+        removed = 0
+        for path in paths:
+            try:
+                (self.out / page_path(path)).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def run(self, full: bool = False) -> ExportStats:
+        """
+        Export the vault, rendering only the pages that changed since the last export.
+
+        Parameters
+        ----------
+        full: bool
+            Ignore the manifest and render every note.
+        """
+        start = time.perf_counter()
+        self.out.mkdir(parents=True, exist_ok=True)
+        previous = {} if full else load_manifest(self.out, self.root)
+        stamps = scan_vault(self.root, self.extension)
+        names = note_names(stamps, self.extension)
+
+        notes, changed = self._compare(previous, stamps)
+        failed = self._read_links(notes, changed)
+        self._link_graph(notes, names)
+
+        updated = set(changed)
+        pages = [
+            path
+            for path, entry in notes.items()
+            if path not in failed and (path in updated or self._stale(path, entry, previous.get(path, {})))
+        ]
+        # Each page is written as soon as it is rendered.
+        written = set()
+        for rendered in self._render(pages, names):
+            self._write_page(rendered, notes[rendered.path]["backlinks"])
+            written.add(rendered.path)
+        failed.update(path for path in pages if path not in written)
+
+        # Failed notes are left out of the manifest, so they are rendered again by the next export.
+        for path in failed:
+            del notes[path]
+        removed = self._remove_pages(previous.keys() - stamps.keys())
+
+        manifest = {"version": EXPORT_VERSION, "root": str(self.root), "notes": notes}
+        self.writer.write(self.out / MANIFEST_NAME, json.dumps(manifest))
+        return ExportStats(len(stamps), len(written), removed, len(failed), time.perf_counter() - start)
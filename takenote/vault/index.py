@@ -0,0 +1,470 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..log import logger
+from ..note.io import read_markdown_many
+from ..note.note import Note
+
+# Bump when the notes tables change, the index is rebuilt on mismatch.
+SCHEMA_VERSION: int = 1
+
+# Below this many changed notes, reading in this process is faster than starting workers.
+PARALLEL_THRESHOLD: int = 256
+
+# Directories skipped when scanning the vault, e.g. `.obsidian`, `.git` and `.tn`.
+HIDDEN_PREFIX: str = "."
+
+# Tables of the note index, extensions add their own.
+NOTES_SCHEMA: str = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE notes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT,
+    creation_date TEXT,
+    front_matter TEXT
+);
+CREATE TABLE front_matter (path TEXT NOT NULL, key TEXT NOT NULL, value TEXT);
+CREATE INDEX front_matter_key_value ON front_matter (key, value);
+CREATE INDEX front_matter_path ON front_matter (path);
+"""
+
+
+def _datetime(text: Optional[str]) -> Optional[datetime]:
+    """Parse an indexed ISO date or datetime, None if it isn't one."""
+    if text is None:
+        return None
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+class NoteRecord(NamedTuple):
+    """Indexed metadata of a note, paths are relative to the vault root."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    title: Optional[str]
+    creation_date: Optional[str]
+    front_matter: Optional[Dict[str, Any]]
+
+    @property
+    def note(self) -> Note:
+        """Note built from the indexed metadata, content is not indexed."""
+        return Note(front_matter=self.front_matter, title=self.title, date=_datetime(self.creation_date))
+
+
+class IndexStats(NamedTuple):
+    """Result of an index update."""
+
+    scanned: int
+    updated: int
+    removed: int
+    failed: int
+
+
+class IndexExtension:
+    """
+    Base class for tables maintained alongside the note index, e.g. full text search.
+
+    Extensions are given every note that is added to the index and every path that is removed,
+    within the same transaction as the notes table.
+    """
+
+    #: Unique name, stored with the schema so adding an extension rebuilds the index.
+    name: str = ""
+    #: Bump when the extension tables change.
+    version: int = 1
+    #: Set if `add` uses note content, otherwise notes are indexed from their header only.
+    needs_content: bool = False
+
+    def create(self, db: sqlite3.Connection) -> None:
+        """Create extension tables."""
+
+    def add(self, db: sqlite3.Connection, path: str, note: Note, file: Path) -> None:
+        """
+        Index a note.
+
+        Parameters
+        ----------
+        db: sqlite3.Connection
+            Index database.
+        path: str
+            Path of the note relative to the vault root.
+        note: Note
+            Parsed note.
+        file: Path
+            Absolute path to the note.
+        """
+
+    def remove(self, db: sqlite3.Connection, path: str) -> None:
+        """Remove a note from the extension tables."""
+
+
+def index_path(cache_dir: Path, root: Path) -> Path:
+    """
+    Path of the index database for a vault, one database is kept per vault root.
+
+    Parameters
+    ----------
+    cache_dir: Path
+        App cache directory.
+    root: Path
+        Vault root directory.
+    """
+    digest = hashlib.sha1(str(root.expanduser().resolve()).encode()).hexdigest()[:12]
+    return cache_dir / f"index-{digest}.sqlite"
+
+
+def scan_vault(root: Path, extension: str = "md") -> Dict[str, Tuple[int, int]]:
+    """
+    Walk a vault, skipping hidden directories.
+
+    Parameters
+    ----------
+    root: Path
+        Vault root directory.
+    extension: str
+        Extension of notes.
+
+    Returns
+    ----------
+    Dict[str, Tuple[int, int]]
+        Relative note path to (mtime_ns, size).
+    """
+    suffix = f".{extension}"
+    top = os.path.normpath(root)
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(top):
+        dirnames[:] = [name for name in dirnames if not name.startswith(HIDDEN_PREFIX)]
+        # Relative paths by slicing, pathlib is the slowest part of a scan of a large vault.
+        directory = dirpath[len(top) + 1 :].replace(os.sep, "/")
+        for filename in filenames:
+            if not filename.endswith(suffix):
+                continue
+            try:
+                stat = os.stat(os.path.join(dirpath, filename))
+            except FileNotFoundError:
+                continue
+            found[f"{directory}/{filename}" if directory else filename] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+
+def _text(value: Any) -> Optional[str]:
+    """Front matter value as comparable text."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (int, float)):
+        return str(value)
+    return json.dumps(value, default=str, sort_keys=True)
+
+
+class OutdatedIndexError(Exception):
+    """Index is missing or its schema doesn't match, it is only rebuilt when opened with `create`."""
+
+
+class VaultIndex:
+    """
+    Persistent metadata index of every note under a vault root, stored in SQLite.
+
+    Updates are incremental, only notes whose mtime or size changed are read again. An index that
+    has not been brought up to date with the whole vault is not `complete`, e.g. once rebuilt.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        database: Path,
+        extension: str = "md",
+        extensions: Sequence[IndexExtension] = (),
+        workers: Optional[int] = None,
+        create: bool = True,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        root: Path
+            Vault root, notes are searched for recursively.
+        database: Path
+            Path to the SQLite database, created if it does not exist.
+        extension: str
+            File extension of notes.
+        extensions: Sequence[IndexExtension]
+            Additional tables to maintain.
+        workers: Optional[int]
+            Processes used to read notes when many changed, None uses the number of CPUs.
+        create: bool
+            Create the database if missing, or rebuild it empty if its schema is outdated. Without,
+            e.g. when updating the index as a note is written, `OutdatedIndexError` is raised instead.
+
+        Raises
+        ----------
+        OutdatedIndexError
+            If the index is missing or outdated and `create` is False.
+        """
+        self.root = root.expanduser().resolve()
+        self.database = database
+        self.extension = extension
+        self.extensions = list(extensions)
+        self.workers = workers
+        self.db = self._connect(create)
+
+    @property
+    def schema(self) -> str:
+        """Schema identifier of the notes tables and extensions."""
+        parts = [f"notes:{SCHEMA_VERSION}"] + [f"{ext.name}:{ext.version}" for ext in self.extensions]
+        return ",".join(parts)
+
+    def _connect(self, create: bool = True) -> sqlite3.Connection:
+        if not create and not self.database.exists():
+            raise OutdatedIndexError(f"No index at {self.database}")
+        self.database.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.database)
+        try:
+            row = db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        except sqlite3.DatabaseError:
+            row = None
+
+        if row is None or row[0] != self.schema:
+            db.close()
+            if not create:
+                raise OutdatedIndexError(f"Index is outdated, run `tn index`: {self.database}")
+            # New or outdated index, start from scratch.
+            self.database.unlink(missing_ok=True)
+            db = sqlite3.connect(self.database)
+            self._create(db)
+
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        return db
+
+    def _create(self, db: sqlite3.Connection) -> None:
+        with db:
+            db.executescript(NOTES_SCHEMA)
+            for ext in self.extensions:
+                ext.create(db)
+            db.execute("INSERT INTO meta (key, value) VALUES ('schema', ?)", (self.schema,))
+
+    def close(self) -> None:
+        """Close the database."""
+        self.db.close()
+
+    def reset(self) -> None:
+        """Discard the database, the next update reads every note again."""
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{self.database}{suffix}").unlink(missing_ok=True)
+        self.db = self._connect()
+
+    def __enter__(self) -> "VaultIndex":
+        """Open index, closed on exit."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close the database."""
+        self.close()
+
+    @property
+    def complete(self) -> bool:
+        """True once `update` has indexed the whole vault, commands update an incomplete index first."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'complete'").fetchone()
+        return row is not None
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Walk the vault.
+
+        Returns
+        ----------
+        Dict[str, Tuple[int, int]]
+            Relative note path to (mtime_ns, size).
+        """
+        return scan_vault(self.root, self.extension)
+
+    def update(self) -> IndexStats:
+        """
+        Bring the index up to date with the vault, reading only notes that changed.
+
+        Returns
+        ----------
+        IndexStats
+            Counts of notes scanned, updated, removed and failed to parse.
+        """
+        on_disk = self.scan()
+        indexed = {
+            path: (mtime_ns, size) for path, mtime_ns, size in self.db.execute("SELECT path, mtime_ns, size FROM notes")
+        }
+
+        changed = [path for path, stamp in on_disk.items() if indexed.get(path) != stamp]
+        removed = [path for path in indexed if path not in on_disk]
+
+        with self.db:
+            for path in removed:
+                self._remove(path)
+            failed = self._add_many((path, on_disk[path]) for path in changed)
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', '1')")
+
+        return IndexStats(len(on_disk), len(changed) - failed, len(removed), failed)
+
+    def update_paths(self, paths: Iterable[Path]) -> IndexStats:
+        """
+        Update specific notes, paths that no longer exist are removed from the index.
+
+        Parameters
+        ----------
+        paths: Iterable[Path]
+            Absolute paths or paths relative to the vault root, paths outside the vault are ignored.
+        """
+        suffix = f".{self.extension}"
+        existing = []
+        removed = []
+        for path in paths:
+            relative = self.relative(path)
+            if relative is None or not relative.endswith(suffix):
+                continue
+            try:
+                stat = (self.root / relative).stat()
+                existing.append((relative, (stat.st_mtime_ns, stat.st_size)))
+            except FileNotFoundError:
+                removed.append(relative)
+
+        with self.db:
+            for relative in removed:
+                self._remove(relative)
+            failed = self._add_many(existing)
+
+        return IndexStats(len(existing) + len(removed), len(existing) - failed, len(removed), failed)
+
+    def relative(self, path: Path) -> Optional[str]:
+        """Path relative to the vault root as stored in the index, None if outside the vault."""
+        path = Path(path)
+        if not path.is_absolute():
+            return path.as_posix()
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            try:
+                return path.resolve().relative_to(self.root).as_posix()
+            except ValueError:
+                return None
+
+    @property
+    def read_mode(self) -> str:
+        """Mode notes are read with, refer to `read_markdown`."""
+        return "full" if any(ext.needs_content for ext in self.extensions) else "header"
+
+    def _add_many(self, entries: Iterable[Tuple[str, Tuple[int, int]]]) -> int:
+        stamps = dict(entries)
+        files = {self.root / path: path for path in stamps}
+        for path in stamps:
+            self._remove(path)
+
+        workers = self.workers if len(files) >= PARALLEL_THRESHOLD else 1
+        added = 0
+        for file, note in read_markdown_many(
+            files, mode=self.read_mode, workers=workers, ordered=False, skip_errors=True
+        ):
+            path = files[file]
+            try:
+                # Front matter is parsed here, when first accessed.
+                self._add(path, stamps[path], note, file)
+            except Exception as e:
+                logger.warning(f"Failed to index note {file}: {e}")
+                self._remove(path)
+                continue
+            added += 1
+        return len(files) - added
+
+    def _add(self, path: str, stamp: Tuple[int, int], note: Note, file: Path) -> None:
+        front_matter = note.front_matter if isinstance(note.front_matter, dict) else None
+        self.db.execute(
+            "INSERT INTO notes (path, mtime_ns, size, title, creation_date, front_matter) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                stamp[0],
+                stamp[1],
+                note.title,
+                _text(note.date),
+                json.dumps(front_matter, default=str) if front_matter is not None else None,
+            ),
+        )
+        if front_matter is not None:
+            rows = []
+            for key, value in front_matter.items():
+                for item in value if isinstance(value, list) else [value]:
+                    rows.append((path, str(key), _text(item)))
+            self.db.executemany("INSERT INTO front_matter (path, key, value) VALUES (?, ?, ?)", rows)
+
+        for ext in self.extensions:
+            ext.add(self.db, path, note, file)
+
+    def _remove(self, path: str) -> None:
+        self.db.execute("DELETE FROM notes WHERE path = ?", (path,))
+        self.db.execute("DELETE FROM front_matter WHERE path = ?", (path,))
+        for ext in self.extensions:
+            ext.remove(self.db, path)
+
+    def _records(self, query: str, parameters: Sequence[Any] = ()) -> List[NoteRecord]:
+        return [
+            NoteRecord(path, mtime_ns, size, title, creation_date, json.loads(fm) if fm is not None else None)
+            for path, mtime_ns, size, title, creation_date, fm in self.db.execute(query, parameters)
+        ]
+
+    def __len__(self) -> int:
+        """Count indexed notes."""
+        return self.db.execute("SELECT count(*) FROM notes").fetchone()[0]
+
+    def __contains__(self, path: object) -> bool:
+        """Check if a note is indexed, by absolute path or path relative to the vault root."""
+        relative = self.relative(Path(path))  # type: ignore
+        return self.db.execute("SELECT 1 FROM notes WHERE path = ?", (relative,)).fetchone() is not None
+
+    def get(self, path: Path) -> Optional[NoteRecord]:
+        """
+        Fetch a single note record.
+
+        Parameters
+        ----------
+        path: Path
+            Absolute path or path relative to the vault root.
+        """
+        records = self._records("SELECT * FROM notes WHERE path = ?", (self.relative(path),))
+        return records[0] if records else None
+
+    def records(self) -> Iterator[NoteRecord]:
+        """Iterate over every indexed note, ordered by path."""
+        return iter(self._records("SELECT * FROM notes ORDER BY path"))
+
+    def find(self, key: str, value: Any = None) -> List[NoteRecord]:
+        """
+        Find notes by front matter, list values match any of their items.
+
+        Parameters
+        ----------
+        key: str
+            Front matter key.
+        value: Any
+            Value to match, if None every note that has the key is returned.
+        """
+        if value is None:
+            query = "SELECT DISTINCT n.* FROM notes n JOIN front_matter f ON f.path = n.path WHERE f.key = ?"
+            parameters: Tuple[Any, ...] = (key,)
+        else:
+            query = (
+                "SELECT DISTINCT n.* FROM notes n JOIN front_matter f ON f.path = n.path"
+                " WHERE f.key = ? AND f.value = ?"
+            )
+            parameters = (key, _text(value))
+        return self._records(query + " ORDER BY n.path", parameters)
@@ -0,0 +1,135 @@
+import sqlite3
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from ..note.links import note_name
+from ..note.note import Note
+from .index import IndexExtension
+
+
+class Link(NamedTuple):
+    """An outgoing link, path is the note the target resolves to, None if no note has that name."""
+
+    target: str
+    path: Optional[str]
+
+
+class LinkIndex(IndexExtension):
+    """
+    Link graph of the vault, the wikilinks and markdown links of every note are kept as an adjacency
+    table indexed by both ends, so backlinks of a note are found without reading any file.
+
+    Links resolve by note name, the filename without folders or extension, ignoring case.
+    """
+
+    name = "links"
+    version = 2
+    needs_content = True
+
+    def __init__(self, extension: str = "md") -> None:
+        """
+        Parameters
+        ----------
+        extension: str
+            Extension of notes, refer to `note_name`.
+        """
+        self.extension = extension
+
+    def create(self, db: sqlite3.Connection) -> None:
+        """Create the note name and link tables, links are indexed by source and by target name."""
+        db.execute("CREATE TABLE link_names (path TEXT PRIMARY KEY, name TEXT NOT NULL)")
+        db.execute("CREATE INDEX link_names_name ON link_names (name)")
+        db.execute("CREATE TABLE links (source TEXT NOT NULL, target TEXT NOT NULL, name TEXT NOT NULL)")
+        db.execute("CREATE INDEX links_source ON links (source)")
+        db.execute("CREATE INDEX links_name ON links (name)")
+
+    def add(self, db: sqlite3.Connection, path: str, note: Note, file: Path) -> None:
+        """Index the name of a note and the names its links target."""
+        db.execute("INSERT INTO link_names (path, name) VALUES (?, ?)", (path, note_name(path, self.extension)))
+        targets = dict.fromkeys(note.links or [])
+        db.executemany(
+            "INSERT INTO links (source, target, name) VALUES (?, ?, ?)",
+            [(path, target, note_name(target, self.extension)) for target in targets],
+        )
+
+    def remove(self, db: sqlite3.Connection, path: str) -> None:
+        """Remove the name and the outgoing links of a note."""
+        db.execute("DELETE FROM link_names WHERE path = ?", (path,))
+        db.execute("DELETE FROM links WHERE source = ?", (path,))
+
+
+def resolve(db: sqlite3.Connection, note: str, extension: str = "md") -> List[str]:
+    """
+    Find the paths of the notes a name or path refers to, a name can match notes in several folders.
+
+    Parameters
+    ----------
+    db: sqlite3.Connection
+        Index database, with the `LinkIndex` extension.
+    note: str
+        Note path relative to the vault root, or note name.
+    extension: str
+        Extension of notes, refer to `note_name`.
+    """
+    if db.execute("SELECT 1 FROM link_names WHERE path = ?", (note,)).fetchone() is not None:
+        return [note]
+    rows = db.execute("SELECT path FROM link_names WHERE name = ? ORDER BY path", (note_name(note, extension),))
+    return [path for (path,) in rows]
+
+
+def backlinks(db: sqlite3.Connection, note: str, extension: str = "md") -> List[str]:
+    """
+    Find the notes linking to a note.
+
+    Parameters
+    ----------
+    db: sqlite3.Connection
+        Index database, with the `LinkIndex` extension.
+    note: str
+        Note path or name, refer to `note_name`.
+    extension: str
+        Extension of notes, refer to `note_name`.
+
+    Returns
+    ----------
+    List[str]
+        Paths of linking notes, sorted.
+    """
+    name = note_name(note, extension)
+    rows = db.execute("SELECT DISTINCT source FROM links WHERE name = ? ORDER BY source", (name,))
+    return [source for (source,) in rows]
+
+
+def outgoing_links(db: sqlite3.Connection, note: str, extension: str = "md") -> List[Link]:
+    """
+    List the links of a note, in order of the note.
+
+    Parameters
+    ----------
+    db: sqlite3.Connection
+        Index database, with the `LinkIndex` extension.
+    note: str
+        Note path or name, every note of that name is included.
+    extension: str
+        Extension of notes, refer to `note_name`.
+    """
+    links: List[Link] = []
+    for path in resolve(db, note, extension):
+        links.extend(
+            Link(target, resolved)
+            for target, resolved in db.execute(
+                "SELECT links.target, link_names.path FROM links LEFT JOIN link_names ON link_names.name = links.name "
+                "WHERE links.source = ? ORDER BY links.rowid",
+                (path,),
+            )
+        )
+    return links
+
+
+def orphans(db: sqlite3.Connection) -> List[str]:
+    """Find the notes no other note links to, sorted by path."""
+    rows = db.execute(
+        "SELECT path FROM link_names WHERE NOT EXISTS "
+        "(SELECT 1 FROM links WHERE links.name = link_names.name AND links.source != link_names.path) ORDER BY path"
+    )
+    return [path for (path,) in rows]
@@ -0,0 +1,336 @@
+import re
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..note.note import Note
+from .index import IndexExtension, NoteRecord, VaultIndex, _text
+
+# Front matter keys always given typed indexes.
+DEFAULT_KEYS: Tuple[str, ...] = ("tags",)
+# Fields of the notes table, compared directly rather than through front matter.
+NOTE_FIELDS = {"path": "n.path", "title": "n.title"}
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<symbol><=|>=|!=|=|<|>|\(|\))
+        |(?P<word>[^\s()<>=!"']+)
+    )""",
+    re.VERBOSE,
+)
+COMPARISONS = {"=", "!=", "<", "<=", ">", ">=", "contains"}
+KEYWORDS = {"and", "or", "not", "contains", "exists"}
+
+
+class QueryError(ValueError):
+    """Query is not valid, the message points at the problem."""
+
+
+def _number(value: Any) -> Optional[float]:
+    """Front matter value as a number, None if it is not one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _day(value: Any) -> Optional[str]:
+    """Front matter value as an ISO date, datetimes are truncated to their day, None if not a date."""
+    if isinstance(value, date):
+        return value.isoformat()[:10]
+    if isinstance(value, str) and ISO_DATE.match(value):
+        try:
+            return date.fromisoformat(value[:10]).isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+class QueryIndex(IndexExtension):
+    """
+    Typed secondary indexes of front matter, for `query_notes`.
+
+    Every item of a declared key is stored as text, number and date, each indexed, so comparisons
+    of numbers and dates use an index range instead of reading notes. Values of any key that are
+    dates are indexed too. Other keys are queried through the text index of the notes table.
+    """
+
+    version = 1
+
+    def __init__(self, keys: Iterable[str] = ()) -> None:
+        """
+        Parameters
+        ----------
+        keys: Iterable[str]
+            Front matter keys to index, in addition to `DEFAULT_KEYS`.
+        """
+        self.keys = tuple(dict.fromkeys([*DEFAULT_KEYS, *keys]))
+        # Keys are part of the name, so declaring a key rebuilds the index.
+        self.name = f"query({','.join(self.keys)})"
+
+    def create(self, db: sqlite3.Connection) -> None:
+        """Create the typed value table, with an index per type."""
+        db.execute(
+            "CREATE TABLE query_values (path TEXT NOT NULL, key TEXT NOT NULL, item INTEGER NOT NULL,"
+            " text TEXT, number REAL, day TEXT)"
+        )
+        db.execute("CREATE INDEX query_values_text ON query_values (key, text COLLATE NOCASE)")
+        db.execute("CREATE INDEX query_values_number ON query_values (key, number) WHERE number IS NOT NULL")
+        db.execute("CREATE INDEX query_values_day ON query_values (key, day) WHERE day IS NOT NULL")
+        db.execute("CREATE INDEX query_values_path ON query_values (path)")
+
+    def add(self, db: sqlite3.Connection, path: str, note: Note, file: Path) -> None:
+        """Index every item of the declared keys of a note, and every date value."""
+        if not isinstance(note.front_matter, dict):
+            return
+        rows = []
+        for key, value in note.front_matter.items():
+            key = str(key)
+            declared = key in self.keys
+            items = value if isinstance(value, list) else [value]
+            for item in items:
+                day = _day(item)
+                if declared or day is not None:
+                    number = _number(item) if declared else None
+                    rows.append((path, key, isinstance(value, list), _text(item), number, day))
+        db.executemany("INSERT INTO query_values (path, key, item, text, number, day) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def remove(self, db: sqlite3.Connection, path: str) -> None:
+        """Remove the values of a note."""
+        db.execute("DELETE FROM query_values WHERE path = ?", (path,))
+
+
+def _literal(kind: str, value: str) -> Tuple[str, Any]:
+    """Type of a literal of the query, "text", "number" or "date", and its value."""
+    if kind == "string":
+        return "text", re.sub(r"\\(.)", r"\1", value[1:-1])
+    if ISO_DATE.fullmatch(value):
+        try:
+            return "date", date.fromisoformat(value).isoformat()
+        except ValueError:
+            raise QueryError(f"Invalid date: {value}")
+    number = _number(value)
+    if number is not None:
+        return "number", number
+    return "text", value
+
+
+class _Parser:
+    """
+    Recursive descent parser, compiles a query to a SQL condition on the notes table `n`.
+
+    query      := or
+    or         := and ("or" and)*
+    and        := not ("and" not)*
+    not        := "not" not | "(" or ")" | comparison
+    comparison := FIELD "exists" | FIELD OP VALUE
+    """
+
+    def __init__(self, query: str, keys: Tuple[str, ...]) -> None:
+        self.keys = keys
+        self.tokens: List[Tuple[str, str]] = []
+        position = 0
+        query = query.strip()
+        while position < len(query):
+            match = TOKEN.match(query, position)
+            if match is None or match.end() == position:
+                raise QueryError(f"Unexpected character at {position}: {query[position:]!r}")
+            kind = match.lastgroup or ""
+            self.tokens.append((kind, match.group(kind)))
+            position = match.end()
+        self.position = 0
+        self.parameters: List[Any] = []
+
+    def peek(self) -> Optional[str]:
+        if self.position >= len(self.tokens):
+            return None
+        kind, value = self.tokens[self.position]
+        return value.lower() if kind == "word" and value.lower() in KEYWORDS else value
+
+    def take(self) -> Tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise QueryError("Unexpected end of query")
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def parse(self) -> str:
+        condition = self.parse_or()
+        if self.position < len(self.tokens):
+            raise QueryError(f"Unexpected {self.tokens[self.position][1]!r}")
+        return condition
+
+    def parse_or(self) -> str:
+        parts = [self.parse_and()]
+        while self.peek() == "or":
+            self.take()
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+
+    def parse_and(self) -> str:
+        parts = [self.parse_not()]
+        while self.peek() == "and":
+            self.take()
+            parts.append(self.parse_not())
+        return parts[0] if len(parts) == 1 else "(" + " AND ".join(parts) + ")"
+
+    def parse_not(self) -> str:
+        token = self.peek()
+        if token == "not":
+            self.take()
+            return f"NOT {self.parse_not()}"
+        if token == "(":
+            self.take()
+            condition = self.parse_or()
+            if self.peek() != ")":
+                raise QueryError("Missing closing bracket")
+            self.take()
+            return condition
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> str:
+        kind, field = self.take()
+        if kind != "word" or field.lower() in KEYWORDS:
+            raise QueryError(f"Expected a field, found {field!r}")
+        operator = self.peek()
+        if operator == "exists":
+            self.take()
+            if field in NOTE_FIELDS:
+                return f"{NOTE_FIELDS[field]} IS NOT NULL"
+            self.parameters.append(field)
+            return "n.path IN (SELECT path FROM front_matter WHERE key = ?)"
+        if operator not in COMPARISONS:
+            raise QueryError(f"Expected a comparison after {field!r}, found {operator!r}")
+        self.take()
+        kind, value = self.take()
+        if kind == "symbol":
+            raise QueryError(f"Expected a value after {operator!r}, found {value!r}")
+        if field in NOTE_FIELDS and kind == "word":
+            # Path and title are text, whatever the value looks like.
+            literal_type, literal = "text", value
+        else:
+            literal_type, literal = _literal(kind, value)
+        if operator == "!=":
+            return f"NOT {self.compare(field, '=', literal_type, literal)}"
+        return self.compare(field, operator, literal_type, literal)
+
+    def compare(self, field: str, operator: str, literal_type: str, literal: Any) -> str:
+        """Condition matching notes with any item of `field` matching the literal."""
+        if field in NOTE_FIELDS:
+            column = NOTE_FIELDS[field]
+            if operator == "contains":
+                self.parameters.append(f"%{_escape_like(literal)}%")
+                return f"{column} LIKE ? ESCAPE '\\'"
+            self.parameters.append(literal)
+            return f"{column} {operator} ? COLLATE NOCASE"
+        if literal_type != "text" and operator == "contains":
+            operator = "="
+
+        if literal_type == "date" or field in self.keys:
+            # Typed index.
+            if literal_type == "text" and operator == "contains":
+                condition = "((item AND text = ? COLLATE NOCASE) OR (NOT item AND text LIKE ? ESCAPE '\\'))"
+                self.parameters.extend([field, literal, f"%{_escape_like(literal)}%"])
+            else:
+                column = {"text": "text", "number": "number", "date": "day"}[literal_type]
+                collate = " COLLATE NOCASE" if column == "text" else ""
+                condition = f"{column} {operator} ?{collate}"
+                self.parameters.extend([field, literal])
+            return f"n.path IN (SELECT path FROM query_values WHERE key = ? AND {condition})"
+
+        # Undeclared key, text index of the notes table.
+        if literal_type == "number":
+            condition = f"tn_number(value) {operator} ?"
+            self.parameters.extend([field, literal])
+        elif operator == "contains":
+            condition = "value LIKE ? ESCAPE '\\'"
+            self.parameters.extend([field, f"%{_escape_like(literal)}%"])
+        else:
+            condition = f"value {operator} ? COLLATE NOCASE"
+            self.parameters.extend([field, literal])
+        return f"n.path IN (SELECT path FROM front_matter WHERE key = ? AND {condition})"
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def compile_query(query: str, keys: Iterable[str] = DEFAULT_KEYS) -> Tuple[str, List[Any]]:
+    """
+    Compile a query to a SQL condition on the notes table, aliased `n`.
+
+    Parameters
+    ----------
+    query: str
+        Query, refer to `query_notes`.
+    keys: Iterable[str]
+        Keys with typed indexes, refer to `QueryIndex`.
+
+    Returns
+    ----------
+    Tuple[str, List[Any]]
+        Condition and its parameters.
+
+    Raises
+    ----------
+    QueryError
+        If the query is not valid.
+    """
+    parser = _Parser(query, tuple(keys))
+    if not parser.tokens:
+        raise QueryError("Empty query")
+    return parser.parse(), parser.parameters
+
+
+def query_notes(vault: VaultIndex, query: str, limit: Optional[int] = None) -> List[NoteRecord]:
+    """
+    Filter notes by front matter, using the indexes only, no note is read.
+
+    Comparisons are `FIELD OP VALUE`, OP one of `=`, `!=`, `<`, `<=`, `>`, `>=` and `contains`, or
+    `FIELD exists`, combined with `and`, `or`, `not` and brackets. A list field matches if any item
+    matches. Values are quoted strings, numbers, ISO dates e.g. `2026-01-31` or bare words, text
+    compares ignoring case. `contains` matches a list item, or part of text. `path` and `title`
+    compare the note path and title.
+
+    Parameters
+    ----------
+    vault: VaultIndex
+        Index, with a `QueryIndex` extension.
+    query: str
+        Query, e.g. `tags contains "work" and creation_date > 2026-01-01`.
+    limit: Optional[int]
+        Maximum number of notes.
+
+    Returns
+    ----------
+    List[NoteRecord]
+        Matching notes, ordered by path.
+
+    Raises
+    ----------
+    QueryError
+        If the query is not valid.
+    """
+    keys = next((ext.keys for ext in vault.extensions if isinstance(ext, QueryIndex)), DEFAULT_KEYS)
+    condition, parameters = compile_query(query, keys)
+    vault.db.create_function("tn_number", 1, _number, deterministic=True)
+    statement = f"SELECT n.* FROM notes n WHERE {condition} ORDER BY n.path"
+    if limit is not None:
+        statement += " LIMIT ?"
+        parameters.append(limit)
+    return vault._records(statement, parameters)
+
+
+def record_fields(record: NoteRecord) -> Dict[str, Any]:
+    """Fields of a note for a `tn query --format` template, front matter keys and `path`, `title` and `date`."""
+    fields = dict(record.front_matter or {})
+    fields.update(path=record.path, title=record.title, date=record.creation_date, front_matter=record.front_matter)
+    return fields
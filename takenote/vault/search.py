@@ -0,0 +1,92 @@
+import sqlite3
+from pathlib import Path
+from typing import List, NamedTuple
+
+from ..note.note import Note
+from .index import IndexExtension, _text
+
+
+class SearchResult(NamedTuple):
+    """A ranked full text search match."""
+
+    path: str
+    title: str
+    snippet: str
+    rank: float
+
+
+class SearchIndex(IndexExtension):
+    """
+    Full text index of note titles, front matter and content, using SQLite FTS5.
+
+    Queries support FTS5 syntax, e.g. `"exact phrase"`, `prefix*`, `AND`, `OR` and `NOT`.
+    """
+
+    name = "search"
+    version = 1
+    needs_content = True
+
+    def create(self, db: sqlite3.Connection) -> None:
+        """Create the FTS5 table, ranked by column weight, and the table mapping paths to its rows."""
+        db.execute(
+            "CREATE VIRTUAL TABLE search USING fts5("
+            "title, front_matter, content, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        db.execute("INSERT INTO search (search, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')")
+        # FTS5 rows are deleted by rowid, map note paths to them.
+        db.execute("CREATE TABLE search_rows (row INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE)")
+
+    def add(self, db: sqlite3.Connection, path: str, note: Note, file: Path) -> None:
+        """Index the title, front matter and content of a note."""
+        front_matter = ""
+        if isinstance(note.front_matter, dict):
+            front_matter = " ".join(f"{key} {_text(value)}" for key, value in note.front_matter.items())
+        cursor = db.execute(
+            "INSERT INTO search (title, front_matter, content) VALUES (?, ?, ?)",
+            (note.title or "", front_matter, note.content or ""),
+        )
+        db.execute("INSERT INTO search_rows (path, row) VALUES (?, ?)", (path, cursor.lastrowid))
+
+    def remove(self, db: sqlite3.Connection, path: str) -> None:
+        """Remove a note from the full text index."""
+        row = db.execute("SELECT row FROM search_rows WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            db.execute("DELETE FROM search WHERE rowid = ?", row)
+            db.execute("DELETE FROM search_rows WHERE path = ?", (path,))
+
+
+def _quote(query: str) -> str:
+    """Quote every term of a query, used when the query is not valid FTS5 syntax."""
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+
+def search_notes(db: sqlite3.Connection, query: str, limit: int = 20) -> List[SearchResult]:
+    """
+    Search the vault, matches in titles rank above front matter, which rank above content.
+
+    Parameters
+    ----------
+    db: sqlite3.Connection
+        Index database, with the `SearchIndex` extension.
+    query: str
+        FTS5 query, plain text that is not valid FTS5 syntax is searched for term by term.
+    limit: int
+        Maximum number of results.
+
+    Returns
+    ----------
+    List[SearchResult]
+        Matches, best first.
+    """
+    # Rank first, snippets are only built for the returned rows.
+    statement = (
+        "SELECT r.path, s.title, snippet(search, 2, '[', ']', '...', 12), s.rank"
+        " FROM search s JOIN search_rows r ON r.row = s.rowid"
+        " WHERE search MATCH ?1 AND s.rowid IN (SELECT rowid FROM search WHERE search MATCH ?1 ORDER BY rank LIMIT ?2)"
+        " ORDER BY s.rank"
+    )
+    try:
+        rows = db.execute(statement, (query, limit)).fetchall()
+    except sqlite3.OperationalError:
+        rows = db.execute(statement, (_quote(query), limit)).fetchall()
+    return [SearchResult(*row) for row in rows]
@@ -0,0 +1,307 @@
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from ..log import logger
+from .index import HIDDEN_PREFIX, IndexStats, VaultIndex
+
+# Seconds without events before a batch of changes is indexed.
+DEBOUNCE: float = 0.05
+# Longest a change waits to be indexed during a continuous stream of events.
+MAX_DELAY: float = 1.0
+# Seconds between scans of the polling watcher.
+POLL_INTERVAL: float = 1.0
+
+# inotify event flags, from <sys/inotify.h>.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+# Written files are indexed once closed, IN_CREATE covers hard links and IN_MOVED_TO editors that save by rename.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Changes(NamedTuple):
+    """Changes seen by a watcher, rescan is set when paths can't be trusted, e.g. a directory was removed."""
+
+    paths: List[str]
+    rescan: bool = False
+
+
+def _visible(root: Path, path: str) -> bool:
+    """Check a path is not hidden or in a hidden directory, which a scan of the vault skips."""
+    try:
+        parts = Path(path).relative_to(root).parts
+    except ValueError:
+        return False
+    return not any(part.startswith(HIDDEN_PREFIX) for part in parts)
+
+
+def decode_events(data: bytes) -> Iterator[Tuple[int, int, str]]:
+    """
+    Decode a buffer of inotify events.
+
+    Parameters
+    ----------
+    data: bytes
+        Events read from an inotify file descriptor, whole events only.
+
+    Returns
+    ----------
+    Iterator[Tuple[int, int, str]]
+        Watch descriptor, event mask and name of each event, the name is empty for events of the
+        watched directory itself.
+    """
+    offset = 0
+    while offset < len(data):
+        wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+        offset += length
+        yield wd, mask, name
+
+
+class InotifyWatcher:
+    """
+    Watches every directory of the vault with Linux inotify, through ctypes.
+    New directories are watched as they appear, their notes are reported as changed.
+    """
+
+    def __init__(self, root: Path, extension: str = "md") -> None:
+        """
+        Parameters
+        ----------
+        root: Path
+            Vault root.
+        extension: str
+            Extension of notes.
+
+        Raises
+        ----------
+        OSError
+            If inotify is not available or the watch limit is reached.
+        """
+        import ctypes
+        import ctypes.util
+
+        self.root = root
+        self.suffix = f".{extension}"
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: Dict[int, str] = {}
+        try:
+            self._watch_tree(str(root))
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory: str) -> None:
+        import ctypes
+
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"Failed to watch {directory}: {os.strerror(error)}")
+        self._directories[wd] = directory
+
+    def _watch_tree(self, top: str) -> List[str]:
+        """Watch a directory and its subdirectories, returns the notes found in them."""
+        notes: List[str] = []
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [name for name in dirnames if not name.startswith(HIDDEN_PREFIX)]
+            self._watch(dirpath)
+            notes.extend(os.path.join(dirpath, name) for name in filenames if name.endswith(self.suffix))
+        return notes
+
+    def read(self, timeout: float) -> Changes:
+        """
+        Wait up to timeout seconds for events.
+
+        Parameters
+        ----------
+        timeout: float
+            Seconds to wait.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return Changes([])
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return Changes([])
+
+        paths: List[str] = []
+        rescan = False
+        for wd, mask, name in decode_events(data):
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+            elif mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+            else:
+                rescan = self._event(wd, mask, name, paths) or rescan
+        return Changes(paths, rescan)
+
+    def _event(self, wd: int, mask: int, name: str, paths: List[str]) -> bool:
+        """Add the notes changed by an event to paths, returns True if the vault must be scanned again."""
+        directory = self._directories.get(wd)
+        if directory is None or not name:
+            return False
+        path = os.path.join(directory, name)
+        if not _visible(self.root, path):
+            return False
+        if not mask & IN_ISDIR:
+            if name.endswith(self.suffix):
+                paths.append(path)
+            return False
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            try:
+                paths.extend(self._watch_tree(path))
+            except OSError as e:
+                logger.warning(f"Watcher: {e}")
+                return True
+            return False
+        # Notes under a removed directory are unknown to the watcher.
+        return bool(mask & (IN_DELETE | IN_MOVED_FROM))
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Fallback watcher, scans the vault every interval and reports notes whose mtime or size changed."""
+
+    def __init__(self, vault: VaultIndex, interval: float = POLL_INTERVAL) -> None:
+        """
+        Parameters
+        ----------
+        vault: VaultIndex
+            Index of the vault, used to scan it.
+        interval: float
+            Seconds between scans.
+        """
+        self.vault = vault
+        self.interval = interval
+        self._stamps = vault.scan()
+        self._next = time.monotonic() + interval
+
+    def read(self, timeout: float) -> Changes:
+        """Wait up to timeout seconds, scanning the vault if a scan is due."""
+        wait = self._next - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return Changes([])
+        time.sleep(max(0.0, wait))
+        self._next = time.monotonic() + self.interval
+
+        stamps = self.vault.scan()
+        changed = [path for path, stamp in stamps.items() if self._stamps.get(path) != stamp]
+        changed.extend(path for path in self._stamps if path not in stamps)
+        self._stamps = stamps
+        return Changes([str(self.vault.root / path) for path in changed])
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+
+
+def open_watcher(vault: VaultIndex, poll: bool = False) -> Tuple[Watcher, bool]:
+    """
+    Watcher for a vault, inotify where available else polling.
+
+    Parameters
+    ----------
+    vault: VaultIndex
+        Index of the vault.
+    poll: bool
+        Always use the polling watcher.
+
+    Returns
+    ----------
+    Tuple[Watcher, bool]
+        Watcher, and True if it polls.
+    """
+    if not poll:
+        try:
+            return InotifyWatcher(vault.root, vault.extension), False
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify unavailable, polling instead: {e}")
+    return PollingWatcher(vault), True
+
+
+def watch_vault(
+    vault: VaultIndex,
+    watcher: Watcher,
+    stop: Optional[threading.Event] = None,
+    on_update: Optional[Callable[[IndexStats, float], None]] = None,
+    debounce: float = DEBOUNCE,
+    max_delay: float = MAX_DELAY,
+) -> None:
+    """
+    Keep the index up to date with the vault until stopped.
+
+    Events are coalesced per path and indexed once the vault has been quiet for `debounce` seconds,
+    so the bursts of writes, renames and deletes of an editor saving a note are indexed once.
+
+    Parameters
+    ----------
+    vault: VaultIndex
+        Index to update.
+    watcher: Watcher
+        Source of changes, refer to `open_watcher`.
+    stop: Optional[threading.Event]
+        Set to stop watching.
+    on_update: Optional[Callable[[IndexStats, float], None]]
+        Called after each update, with stats and seconds from the first event to the index being updated.
+    debounce: float
+        Seconds without events before changes are indexed.
+    max_delay: float
+        Longest a change waits while events keep arriving.
+    """
+    stop = stop or threading.Event()
+    pending: Dict[str, None] = {}
+    rescan = False
+    first = quiet = 0.0
+    while not stop.is_set():
+        now = time.monotonic()
+        due = min(quiet, first + max_delay) if pending or rescan else now + POLL_INTERVAL
+        changes = watcher.read(max(0.0, min(due - now, POLL_INTERVAL)))
+
+        now = time.monotonic()
+        if changes.paths or changes.rescan:
+            if not pending and not rescan:
+                first = now
+            quiet = now + debounce
+            pending.update(dict.fromkeys(changes.paths))
+            rescan = rescan or changes.rescan
+
+        if (pending or rescan) and now >= min(quiet, first + max_delay):
+            try:
+                stats = vault.update() if rescan else vault.update_paths(Path(path) for path in pending)
+            except Exception as e:
+                logger.exception(e)
+            else:
+                if on_update is not None:
+                    on_update(stats, time.monotonic() - first)
+            pending.clear()
+            rescan = False
@@ -0,0 +1,34 @@
+from pathlib import Path
+from takenote import config
+from takenote.config import Settings, fetch_settings
+
+
+def test_settings_case_insensitive():
+    """Compiled settings are looked up like Dynaconf, ignoring case."""
+    settings = Settings({"FORMAT": {"FILENAME": {"short": "note"}}})
+    assert settings["format"]["filename"]["short"] == "note"
+    assert "Format" in settings
+    assert settings.get("missing") is None
+
+
+def test_settings_cache(tmp_path: Path, monkeypatch):
+    """Settings are compiled once and loaded from the cache until the config changes."""
+    global_config = tmp_path / "takenote-config.toml"
+    global_config.write_text('EDITOR = "vi"\n')
+    cache_dir = tmp_path / "cache"
+
+    settings = fetch_settings(global_config, tmp_path / "missing.toml", cache_dir)
+    assert settings["EDITOR"] == "vi"
+    assert settings["EXTENSION"] == "md"
+
+    calls = []
+    original = config.config_file
+    monkeypatch.setattr(config, "config_file", lambda paths: calls.append(paths) or original(paths))
+
+    fetch_settings(global_config, tmp_path / "missing.toml", cache_dir)
+    assert calls == []
+
+    global_config.write_text('EDITOR = "nano"\nEXTENSION = "txt"\n')
+    settings = fetch_settings(global_config, tmp_path / "missing.toml", cache_dir)
+    assert len(calls) == 1
+    assert settings["EDITOR"] == "nano"
@@ -0,0 +1,103 @@
+import socket
+import threading
+import time
+from pathlib import Path
+import pytest
+from takenote.cli import daemon, main
+from takenote.cli.app import App
+from takenote.config import fetch_settings
+
+
+@pytest.fixture
+def config(tmp_path: Path, monkeypatch) -> Path:
+    """Global config saving notes to `notes`, used in place of the user's config."""
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    global_config = tmp_path / "takenote-config.toml"
+    global_config.write_text(f'SAVE_PATH_NOTES = "{notes}"\n')
+    monkeypatch.setattr(daemon, "GLOBAL_CONFIG", global_config)
+    monkeypatch.setattr(daemon, "GLOBAL_DIR", tmp_path)
+    return global_config
+
+
+def capture_request(cwd: Path, title: str, content: str) -> dict:
+    """Capture request as sent by `submit`."""
+    return {
+        "command": "capture",
+        "cwd": str(cwd),
+        "env": daemon.tn_environment(),
+        "debug": False,
+        "title": title,
+        "content": content,
+        "data": {},
+        "save_path": str(cwd / "notes"),
+        "template_path": None,
+    }
+
+
+def capture_app(global_config: Path, content: str) -> App:
+    """App with note content set, as left by the editor."""
+    app = App(fetch_settings(global_config, global_config.parent / "missing.toml"))
+    app.filename = "local"
+    app.note.content = content
+    return app
+
+
+def test_daemon_ping_stop():
+    """Ping reports the daemon's pid, stop is acknowledged and stops the daemon."""
+    server = daemon.Daemon()
+    assert server.handle({"command": "ping"})["status"] == "ok"
+    assert server.handle({"command": "unknown"})["status"] == "error"
+    assert not server.stopped
+    assert server.handle({"command": "stop"}) == {"status": "ok"}
+    assert server.stopped
+
+
+def test_daemon_capture(tmp_path: Path, config: Path):
+    """Captured notes are written by the daemon, requests from a different environment are refused."""
+    server = daemon.Daemon()
+    response = server.handle(capture_request(tmp_path, "daemon", "Body from the daemon.\n"))
+    assert response["status"] == "ok"
+    assert response["written"]
+    assert "Body from the daemon." in (tmp_path / "notes" / "daemon.md").read_text()
+
+    request = capture_request(tmp_path, "refused", "Not written.\n")
+    request["env"] = {"TN_EXTENSION": "txt"}
+    assert server.handle(request) == {"status": "refused"}
+    assert not (tmp_path / "notes" / "refused.md").exists()
+    server.close()
+
+
+def test_submit_fallback(tmp_path: Path, config: Path, monkeypatch):
+    """Notes are written in process when no daemon is listening, whether the socket is missing or stale."""
+    app = capture_app(config, "Missing socket.\n")
+    assert daemon.submit(app, tmp_path / "missing.sock") is None
+    monkeypatch.setattr(main, "DAEMON_SOCKET", tmp_path / "missing.sock")
+    main.write_and_close(app)
+    assert "Missing socket." in (tmp_path / "notes" / "local.md").read_text()
+
+    # Socket left by a crashed daemon, nothing is listening on it.
+    stale = tmp_path / "stale.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(str(stale))
+    assert stale.exists()
+    assert daemon.submit(capture_app(config, "Stale socket.\n"), stale) is None
+
+
+def test_serve_cleanup(tmp_path: Path):
+    """Socket is private to the user and removed once the daemon stops."""
+    path = tmp_path / "daemon.sock"
+    thread = threading.Thread(target=daemon.serve, args=(path,))
+    thread.start()
+    for _ in range(100):
+        if path.exists():
+            break
+        time.sleep(0.05)
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert daemon.send({"command": "ping"}, path)["status"] == "ok"
+
+    assert daemon.send({"command": "stop"}, path) == {"status": "ok"}
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert not path.exists()
+    assert daemon.send({"command": "ping"}, path) is None
@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+import pytest
+from takenote.note.importer import CHECKPOINT_INTERVAL, Importer, read_records
+
+FORMATS = {"long": "{{ title }}", "short": "untitled"}
+
+
+def test_import_resume(tmp_path: Path):
+    """An interrupted import resumes from its checkpoint without writing any note twice."""
+    source = tmp_path / "clips.jsonl"
+    source.write_text("".join(json.dumps({"title": f"Clip {i}", "content": f"Body {i}"}) + "\n" for i in range(600)))
+    out = tmp_path / "out"
+    importer = Importer(None, FORMATS, out, checkpoint_file=tmp_path / "checkpoint.json", workers=2)
+
+    def interrupted():
+        for i, record in enumerate(read_records(source)):
+            if i == 300:
+                raise KeyboardInterrupt
+            yield record
+
+    with pytest.raises(KeyboardInterrupt):
+        importer.run(interrupted())
+    assert importer.resume_position() == 300
+    assert len(list(out.iterdir())) == 300
+
+    stats, written = importer.run(read_records(source))
+    assert (stats.records, stats.written, stats.skipped, stats.failed) == (300, 300, 0, 0)
+    assert len(list(out.iterdir())) == 600
+    assert "Body 599" in (out / "Clip 599.md").read_text()
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_import_crash(tmp_path: Path, monkeypatch):
+    """Notes written after the last checkpoint by an import that crashed are not written again on resume."""
+    source = tmp_path / "clips.jsonl"
+    source.write_text("".join(json.dumps({"title": f"Clip {i}", "content": f"Body {i}"}) + "\n" for i in range(600)))
+    out = tmp_path / "out"
+    importer = Importer(None, FORMATS, out, checkpoint_file=tmp_path / "checkpoint.json", workers=2)
+    save_checkpoint = importer.save_checkpoint
+
+    def killed(position, in_flight=()):
+        """Process is killed before the checkpoint of the interruption is saved."""
+        if position == 300:
+            raise SystemExit
+        save_checkpoint(position, in_flight)
+
+    def interrupted():
+        for i, record in enumerate(read_records(source)):
+            if i == 300:
+                raise KeyboardInterrupt
+            yield record
+
+    monkeypatch.setattr(importer, "save_checkpoint", killed)
+    with pytest.raises(SystemExit):
+        importer.run(interrupted())
+    monkeypatch.undo()
+    assert importer.resume_position() == CHECKPOINT_INTERVAL
+    assert len(list(out.iterdir())) == 300
+
+    stats, written = importer.run(read_records(source))
+    assert (stats.written, stats.skipped, stats.failed) == (300, 300 - CHECKPOINT_INTERVAL, 0)
+    assert sorted(path.name for path in out.iterdir()) == sorted(f"Clip {i}.md" for i in range(600))
+
+
+def test_read_records(tmp_path: Path):
+    """CSV rows and directory files are read as records."""
+    (tmp_path / "clips.csv").write_text("title,content,url\nOne,Body,http://example.com\n")
+    assert list(read_records(tmp_path / "clips.csv")) == [
+        {"title": "One", "content": "Body", "url": "http://example.com"}
+    ]
+
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "two.txt").write_text("Text")
+    (tmp_path / "dir" / ".hidden").write_text("Hidden")
+    assert list(read_records(tmp_path / "dir")) == [{"title": "two", "content": "Text", "source": "two.txt"}]
+
+
+def test_import_record(tmp_path: Path):
+    """Record fields are passed to the template as `record`, fields named like template variables are kept apart."""
+    template = tmp_path / "clip.md"
+    template.write_text("# {{ note.title }}\n{{ record.url }} {{ record.note }}\n")
+    importer = Importer(template, FORMATS, tmp_path / "out")
+    stats, written = importer.run(iter([{"title": "One", "url": "http://example.com", "note": "kept"}]))
+    assert stats.written == 1
+    assert written[0].read_text() == "# One\nhttp://example.com kept"
@@ -0,0 +1,265 @@
+import threading
+import time
+from pathlib import Path
+import pytest
+from takenote.vault import (
+    BodyHash,
+    DedupeIndex,
+    HtmlExport,
+    Link,
+    LinkIndex,
+    OutdatedIndexError,
+    QueryError,
+    QueryIndex,
+    SearchIndex,
+    VaultIndex,
+    backlinks,
+    body_hash,
+    duplicate_groups,
+    find_duplicate,
+    open_watcher,
+    orphans,
+    outgoing_links,
+    query_notes,
+    search_notes,
+    watch_vault,
+)
+
+NOTE = """---
+tags: [work, ideas]
+creation_date: 2026-01-02
+---
+# {title}
+
+Body of {title}.
+"""
+
+
+def write(path: Path, title: str) -> Path:
+    """Write a note with front matter, creating its directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(NOTE.format(title=title))
+    return path
+
+
+def test_index_update(tmp_path: Path):
+    """Index is updated incrementally and answers front matter queries."""
+    vault = tmp_path / "vault"
+    write(vault / "one.md", "One")
+    write(vault / "sub" / "two.md", "Two")
+    write(vault / ".obsidian" / "hidden.md", "Hidden")
+    (vault / "broken.md").write_text("---\n: [unclosed\n---\n# Broken\n")
+
+    with VaultIndex(vault, tmp_path / "index.sqlite") as index:
+        stats = index.update()
+        assert (stats.scanned, stats.updated, stats.removed, stats.failed) == (3, 2, 0, 1)
+        assert index.get(vault / "sub" / "two.md").title == "Two"
+        assert index.get("one.md").creation_date == "2026-01-02"
+        assert [r.path for r in index.find("tags", "work")] == ["one.md", "sub/two.md"]
+        assert index.find("tags", "missing") == []
+
+    write(vault / "three.md", "Three")
+    (vault / "one.md").unlink()
+    (vault / "broken.md").unlink()
+
+    with VaultIndex(vault, tmp_path / "index.sqlite") as index:
+        stats = index.update()
+        assert (stats.scanned, stats.updated, stats.removed) == (2, 1, 1)
+        assert [r.path for r in index.records()] == ["sub/two.md", "three.md"]
+        assert "one.md" not in index
+
+
+def test_index_outdated(tmp_path: Path):
+    """Only commands rebuild an outdated index, an index is complete once the whole vault is indexed."""
+    vault = tmp_path / "vault"
+    write(vault / "one.md", "One")
+    database = tmp_path / "index.sqlite"
+    with pytest.raises(OutdatedIndexError):
+        VaultIndex(vault, database, create=False)
+
+    with VaultIndex(vault, database) as index:
+        assert not index.complete
+        index.update()
+        assert index.complete
+
+    with pytest.raises(OutdatedIndexError):
+        VaultIndex(vault, database, extensions=[SearchIndex()], create=False)
+    with VaultIndex(vault, database) as index:
+        assert index.complete and len(index) == 1
+    with VaultIndex(vault, database, extensions=[SearchIndex()]) as index:
+        assert not index.complete and len(index) == 0
+
+
+def test_search(tmp_path: Path):
+    """Full text search ranks title matches first and supports phrase and prefix queries."""
+    vault = tmp_path / "vault"
+    write(vault / "one.md", "Gardening")
+    (vault / "two.md").write_text("# Kitchen\n\nNotes on gardening tools and the garden shed.\n")
+
+    with VaultIndex(vault, tmp_path / "index.sqlite", extensions=[SearchIndex()]) as index:
+        index.update()
+        assert [r.path for r in search_notes(index.db, "gardening")] == ["one.md", "two.md"]
+        assert [r.path for r in search_notes(index.db, '"garden shed"')] == ["two.md"]
+        assert [r.path for r in search_notes(index.db, "kitch*")] == ["two.md"]
+        assert search_notes(index.db, "shed(") != []
+
+        (vault / "two.md").write_text("# Kitchen\n\nNothing here.\n")
+        index.update_paths([vault / "two.md"])
+        assert search_notes(index.db, '"garden shed"') == []
+
+
+def test_links(tmp_path: Path):
+    """Backlinks, outgoing links and orphans are answered from the index and updated per note."""
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "hub.md").write_text("# Hub\n\n[[Spoke|a spoke]], [other](sub/Other%20note.md) and [[Missing#heading]].\n")
+    (vault / "spoke.md").write_text("# Spoke\n\nBack to [[hub]], not `[[orphan]]`.\n")
+    (vault / "sub").mkdir()
+    (vault / "sub" / "Other note.md").write_text("# Other\n")
+    (vault / "orphan.md").write_text("# Orphan\n\nLinks to [[orphan]] only.\n")
+
+    with VaultIndex(vault, tmp_path / "index.sqlite", extensions=[LinkIndex()]) as index:
+        index.update()
+        assert backlinks(index.db, "Spoke") == ["hub.md"]
+        assert backlinks(index.db, "sub/Other note.md") == ["hub.md"]
+        assert outgoing_links(index.db, "hub") == [
+            Link("Spoke", "spoke.md"),
+            Link("sub/Other note.md", "sub/Other note.md"),
+            Link("Missing", None),
+        ]
+        assert orphans(index.db) == ["orphan.md"]
+
+        (vault / "spoke.md").write_text("# Spoke\n\nNo links.\n")
+        index.update_paths([vault / "spoke.md"])
+        assert orphans(index.db) == ["hub.md", "orphan.md"]
+
+    # Names are matched without the configured extension.
+    txt = tmp_path / "txt"
+    txt.mkdir()
+    (txt / "a.txt").write_text("# A\n\n[[B]] and [b](b.txt).\n")
+    (txt / "b.txt").write_text("# B\n")
+    with VaultIndex(txt, tmp_path / "txt.sqlite", "txt", [LinkIndex("txt")]) as index:
+        index.update()
+        assert backlinks(index.db, "b.txt", "txt") == ["a.txt"]
+        assert outgoing_links(index.db, "a", "txt") == [Link("B", "b.txt"), Link("b.txt", "b.txt")]
+
+
+@pytest.mark.parametrize("poll", [False, True])
+def test_watch(tmp_path: Path, poll: bool):
+    """Changes are coalesced and indexed without a full update."""
+    vault = tmp_path / "vault"
+    write(vault / "one.md", "One")
+    updates = []
+    stop = threading.Event()
+
+    def changes():
+        time.sleep(0.1)
+        for i in range(3):
+            write(vault / "sub" / "two.md", f"Two {i}")
+        (vault / ".hidden").mkdir()
+        write(vault / ".hidden" / "skipped.md", "Skipped")
+        (vault / "one.md").unlink()
+
+    with VaultIndex(vault, tmp_path / "index.sqlite") as index:
+        index.update()
+        watcher, polling = open_watcher(index, poll)
+        if poll:
+            watcher.interval = 0.2
+        assert polling == poll
+
+        def updated(stats, seconds):
+            updates.append(stats)
+            if sum(update.updated for update in updates) and sum(update.removed for update in updates):
+                stop.set()
+
+        thread = threading.Thread(target=changes)
+        thread.start()
+        threading.Timer(5, stop.set).start()
+        watch_vault(index, watcher, stop, updated)
+        watcher.close()
+        thread.join()
+
+        assert [r.path for r in index.records()] == ["sub/two.md"]
+        assert index.get("sub/two.md").title == "Two 2"
+
+
+def test_export_html(tmp_path: Path):
+    """Only changed notes and notes whose backlinks changed are rendered again."""
+    root, out = tmp_path / "vault", tmp_path / "site"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.md").write_text("# A\n\nSee [[B|bee]].\n")
+    (root / "b.md").write_text("# B\n")
+    (root / "sub" / "d.md").write_text("# D\n\n[B](../b.md) and [web](https://example.com).\n")
+
+    stats = HtmlExport(root, out, workers=1).run()
+    assert (stats.notes, stats.rendered, stats.removed, stats.failed) == (3, 3, 0, 0)
+    assert '<a class="wikilink" href="b.html">bee</a>' in (out / "a.html").read_text()
+    d = (out / "sub" / "d.html").read_text()
+    assert 'href="../b.html"' in d and 'href="https://example.com"' in d
+    assert '<a href="a.html">a</a>' in (out / "b.html").read_text()
+    assert '<a href="sub/d.html">d</a>' in (out / "b.html").read_text()
+    assert HtmlExport(root, out, workers=1).run().rendered == 0
+
+    (root / "a.md").write_text("# A\n\nNo links.\n")
+    stats = HtmlExport(root, out, workers=1).run()
+    assert stats.rendered == 2
+    assert "a.html" not in (out / "b.html").read_text()
+
+    (root / "sub" / "d.md").unlink()
+    stats = HtmlExport(root, out, workers=1).run()
+    assert (stats.notes, stats.rendered, stats.removed) == (2, 1, 1)
+    assert not (out / "sub" / "d.html").exists()
+    assert "backlinks" not in (out / "b.html").read_text()
+
+    (root / "c.md").write_text("# C\n\nSee [[b]].\n")
+    with VaultIndex(root, tmp_path / "index.sqlite", extensions=[LinkIndex()]) as index:
+        index.update()
+        stats = HtmlExport(root, out, workers=1, index=index).run()
+    assert (stats.notes, stats.rendered) == (3, 2)
+    assert '<a href="c.html">c</a>' in (out / "b.html").read_text()
+
+
+def test_query(tmp_path: Path):
+    """Front matter is queried by type through the indexes, list fields match any item."""
+    (tmp_path / "one.md").write_text("---\ntags: [work, ideas]\ncreation_date: 2026-02-03\npriority: 2\n---\n# One\n")
+    (tmp_path / "two.md").write_text("---\ntags: [workshop]\ncreation_date: 2025-12-30\npriority: 10\n---\n# Two\n")
+    (tmp_path / "three.md").write_text("---\ntags: work\nstatus: in progress\n---\n# Three\n")
+    with VaultIndex(tmp_path, tmp_path / "index.sqlite", extensions=[QueryIndex(["priority"])]) as vault:
+        vault.update()
+
+        def paths(query):
+            return [record.path for record in query_notes(vault, query)]
+
+        assert paths('tags contains "work" and creation_date > 2026-01-01') == ["one.md"]
+        assert paths("tags contains WORK") == ["one.md", "three.md"]
+        assert paths("priority > 9") == ["two.md"]
+        assert paths("status contains progress or priority < 3") == ["one.md", "three.md"]
+        assert paths("not (status exists) and title != one") == ["two.md"]
+        with pytest.raises(QueryError):
+            query_notes(vault, "priority >")
+
+
+def test_dedupe(tmp_path: Path):
+    """Bodies hash the same ignoring front matter, title and date lines, similar bodies are grouped."""
+    text = "a quick brown fox jumps over the lazy dog by the river"
+    (tmp_path / "a.md").write_text(f"---\ntags: []\n---\n# None\n\nSunday 18 October 2026 01:56:41\n\n{text}\n")
+    (tmp_path / "b.md").write_text(f"# Other\n2026-10-17 10:00\n{text}  \n\n")
+    (tmp_path / "c.md").write_text(f"# Near\n{text} today\n")
+    (tmp_path / "d.md").write_text("# Different\nnothing in common with the other notes at all\n")
+
+    streamed = BodyHash()
+    for i in range(0, len(text), 7):
+        streamed.update(text[i : i + 7])
+    assert streamed.hexdigest() == body_hash(text) == body_hash((tmp_path / "a.md").read_text())
+
+    with VaultIndex(tmp_path, tmp_path / "index.sqlite", extensions=[DedupeIndex()]) as vault:
+        vault.update()
+        assert find_duplicate(vault.db, body_hash(text)) == "a.md"
+        assert find_duplicate(vault.db, body_hash("new text")) is None
+        assert [(group.paths, group.exact) for group in duplicate_groups(vault)] == [(["a.md", "b.md"], True)]
+        near = duplicate_groups(vault, near=True, threshold=0.8)
+        assert [(group.paths, group.exact) for group in near] == [
+            (["a.md", "b.md"], True),
+            (["a.md", "b.md", "c.md"], False),
+        ]
+        assert near[1].similarity == pytest.approx(8 / 9)
@@ -1,5 +1,19 @@
 from pathlib import Path
-from takenote.note import read_markdown, write_note
+import pytest
+from takenote.note import (
+    HeadingIndex,
+    LazyNotes,
+    Note,
+    NoteWriter,
+    append_to_note,
+    read_markdown,
+    read_markdown_many,
+    read_section,
+    stream_note_with_template,
+    write_note,
+    write_note_with_template,
+)
+from takenote.note.io import chunk_text
 from loguru import logger
 
 TEST_NOTE_STR = """
@@ -26,6 +40,131 @@ def test_reading():
     logger.info(note.title)
 
 
+def test_reading_header():
+    """Header mode reads the same front matter and title as a full parse, without content."""
+    note = read_markdown(test_note_path)
+    header = read_markdown(test_note_path, mode="header")
+    assert header.title == note.title == "Test note"
+    assert header.front_matter == note.front_matter
+    assert header.date == note.date
+    assert header.content is None
+    assert note.content.startswith("# Test note")
+    assert read_markdown(test_note_path, ignore_title=True).content.startswith("# Test note")
+
+
+def test_reading_lazy(tmp_path: Path):
+    """Lazy mode matches a full parse, content is only read when accessed."""
+    note = read_markdown(test_note_path)
+    lazy = read_markdown(test_note_path, mode="lazy")
+    assert (lazy.title, lazy.front_matter) == (note.title, note.front_matter)
+    assert lazy._content is None
+    assert lazy.content == note.content
+
+    path = tmp_path / "log.md"
+    path.write_text("# Log\n\n## Monday\n\nWork.\n\n```\n## Not a heading\n```\n\n### Detail\n\n## Tuesday\n\nRest.\n")
+    assert read_section(path, "monday") == "## Monday\n\nWork.\n\n```\n## Not a heading\n```\n\n### Detail\n\n"
+    assert read_section(path, "Tuesday") == "## Tuesday\n\nRest.\n"
+    with pytest.raises(KeyError):
+        read_section(path, "Not a heading")
+
+
+def test_reading_many(tmp_path: Path):
+    """Notes are read by worker processes in order, broken notes can be skipped."""
+    paths = []
+    for i in range(10):
+        paths.append(tmp_path / f"{i}.md")
+        paths[-1].write_text(f"# Note {i}\n")
+    broken = tmp_path / "missing.md"
+
+    notes = list(read_markdown_many(paths + [broken], workers=2, chunksize=3, skip_errors=True))
+    assert [path for path, _ in notes] == paths
+    assert [note.title for _, note in notes] == [f"Note {i}" for i in range(10)]
+
+    with pytest.raises(Exception):
+        list(read_markdown_many([broken], workers=1))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_lazy_notes(tmp_path: Path, workers: int):
+    """Notes are read when accessed, in order, unreadable notes are skipped when iterating."""
+    paths = []
+    for i in range(6):
+        paths.append(tmp_path / f"{i}.md")
+        paths[-1].write_text(f"# Note {i}\n")
+    notes = LazyNotes(paths[:3] + [tmp_path / "missing.md"] + paths[3:], workers=workers)
+    assert len(notes) == 7 and not notes._notes
+
+    assert notes[-1].title == "Note 5"
+    assert list(notes._notes) == [6]
+    assert [note.title for note in notes[1:3]] == ["Note 1", "Note 2"]
+    assert [note.title for note in notes] == [f"Note {i}" for i in range(6)]
+    assert [path.name for path, _ in notes.items()] == [path.name for path in paths]
+
+
+def test_append(tmp_path: Path):
+    """Text is appended to the end of a note, or the end of a section using cached heading offsets."""
+    path = tmp_path / "log.md"
+    path.write_text("# Log\n\n## Tasks\n\n- one\n\n## Notes\n\nend")
+    index = HeadingIndex(tmp_path / "headings.json")
+
+    append_to_note(path, "appended")
+    inode = path.stat().st_ino
+    append_to_note(path, "- two", heading="tasks", heading_index=index)
+    # Inserting replaces the note atomically.
+    assert path.stat().st_ino != inode
+    assert [child.name for child in tmp_path.iterdir()] == ["log.md"]
+    append_to_note(path, "- three", heading="Tasks", heading_index=index)
+    assert path.read_text() == "# Log\n\n## Tasks\n\n- one\n\n- two\n\n- three\n\n## Notes\n\nend\nappended\n"
+    assert [h.offset for h in index.headings(path)] == [h.offset for h in HeadingIndex(tmp_path / "x").headings(path)]
+
+    # Saved only when an entry changed.
+    index.save()
+    cached = HeadingIndex(tmp_path / "headings.json")
+    (tmp_path / "headings.json").unlink()
+    assert cached.headings(path) == index.headings(path)
+    cached.save()
+    assert not (tmp_path / "headings.json").exists()
+
+    with pytest.raises(KeyError):
+        append_to_note(path, "text", heading="Missing")
+
+
+@pytest.mark.parametrize("fsync", ["always", "batch", "never"])
+def test_atomic_write(tmp_path: Path, fsync: str):
+    """Notes are renamed into place, exclusive writes never replace an existing note."""
+    writer = NoteWriter(fsync)
+    path = tmp_path / "note.md"
+    with writer.batch():
+        write_note_with_template(path, Note(title="First"), exclusive=True, writer=writer)
+        with pytest.raises(FileExistsError, match="note.md"):
+            write_note_with_template(path, Note(title="Second"), exclusive=True, writer=writer)
+    assert "# First" in path.read_text()
+    assert [p.name for p in tmp_path.iterdir()] == ["note.md"]
+
+    writer.write(path, "replaced")
+    assert path.read_text() == "replaced"
+
+
+@pytest.mark.parametrize(
+    "template", ["# {{ note.title }}\n{{ note.content }}\nend", "{{ clipboard }}\n{{ note.content | upper }}"]
+)
+def test_stream_note(tmp_path: Path, template: str):
+    """Streamed notes match notes rendered in memory, templates not placing the content once fall back to it."""
+    template_path = tmp_path / "template.md"
+    template_path.write_text(template)
+    payload = "line é\n" * 1000
+    writer = NoteWriter("never")
+
+    write_note_with_template(
+        tmp_path / "rendered.md", Note(title="T", content=payload), template_path, {"clipboard": payload}, writer=writer
+    )
+    note = Note(title="T")
+    stream_note_with_template(
+        tmp_path / "streamed.md", note, chunk_text(payload, 7), template_path, {}, ["clipboard"], writer=writer
+    )
+    assert (tmp_path / "streamed.md").read_text() == (tmp_path / "rendered.md").read_text()
+
+
 if __name__ == "__main__":
     test_reading()
     test_writing()
@@ -0,0 +1,18 @@
+from pathlib import Path
+from takenote.log import initialise_logging, logger
+
+
+def test_log_file_deferred(tmp_path: Path):
+    """The log file is created by the first record, with rotation it is capped in size and appended to."""
+    path = tmp_path / "tn.log"
+    initialise_logging(path, write_to_stderr=False, enqueue=True, rotation="1 KB", retention=2)
+    try:
+        assert not path.exists()
+        for i in range(20):
+            logger.info(f"Record {i} " + "x" * 200)
+        logger.complete()
+        assert path.exists()
+        assert path.stat().st_size <= 1024
+        assert len(list(tmp_path.iterdir())) == 3
+    finally:
+        logger.remove()
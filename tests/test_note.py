@@ -0,0 +1,28 @@
+from takenote.note import Note, NoteBatch
+
+
+def test_lazy_front_matter():
+    """Raw front matter is parsed on first access and the YAML dump is memoized."""
+    note = Note(title="Lazy", raw_front_matter="creation_date: 2026-01-02\ntags: [a]\n")
+    assert note.raw_front_matter is not None
+    assert note.date.isoformat() == "2026-01-02"
+    assert note.raw_front_matter is None
+    assert note.yaml is note.yaml
+
+    note.front_matter = {"tags": ["b"]}
+    assert note.yaml == "tags:\n- b\n"
+    assert note.date is None
+    assert not hasattr(note, "__dict__")
+
+
+def test_note_batch():
+    """Notes stored in columns are rebuilt on access."""
+    batch = NoteBatch()
+    batch.append("one.md", Note(title="One", raw_front_matter="tags: [a]\n"))
+    batch.append("two.md", Note(title="Two", front_matter={"tags": ["b"]}, content="Body"))
+
+    assert len(batch) == 2
+    assert batch.titles == ["One", "Two"]
+    assert batch.front_matter[0] == "tags: [a]\n"
+    assert [note.front_matter for note in batch] == [{"tags": ["a"]}, {"tags": ["b"]}]
+    assert batch[1].content == "Body"
@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+from takenote.note import Note
+from datetime import datetime
+from takenote.note.template import (
+    FilenameGenerator,
+    apply_template,
+    fetch_template,
+    filename_from_format,
+    set_bytecode_cache,
+)
+from takenote.note.template.check import CheckedTemplates, check_source, check_templates, note_context
+
+
+def test_template_cache(tmp_path: Path):
+    """Templates are compiled once, stored on disk and reloaded when the file changes."""
+    set_bytecode_cache(tmp_path / "cache")
+    template_path = tmp_path / "templates" / "new.md"
+    template_path.parent.mkdir()
+    template_path.write_text("# {{ note.title }}")
+
+    assert fetch_template(template_path) is fetch_template(template_path)
+    assert apply_template(template_path, Note(title="Cached"), {}) == "# Cached"
+    assert list((tmp_path / "cache").iterdir())
+
+    template_path.write_text("## {{ note.title }}")
+    stat = template_path.stat()
+    os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert apply_template(template_path, Note(title="Changed"), {}) == "## Changed"
+    set_bytecode_cache(None)
+
+
+def test_filename_from_format():
+    """Filename formats render the title."""
+    assert filename_from_format("{{ title }}", "A title") == "A title"
+
+
+def test_filename_generator(tmp_path: Path):
+    """Batch filenames share one timestamp and collisions get a counter suffix."""
+    (tmp_path / "2601_021504.md").touch()
+    formats = {"long": "{{ title }}", "short": "{{ datetime.now().strftime('%y%m_%d%H%M') }}"}
+    generator = FilenameGenerator(formats, tmp_path, "md", datetime(2026, 1, 2, 15, 4))
+    assert generator.filenames([None, None, "Title", "title", "Title-1"]) == [
+        "2601_021504-1",
+        "2601_021504-2",
+        "Title",
+        "title-1",
+        "Title-1-1",
+    ]
+
+
+def test_check_templates(tmp_path: Path):
+    """Undefined names are reported with their line, templates that pass are recorded until they change."""
+    assert check_source("{{ note.title }}\n{{ note.missing }}", note_context(), "t") == (
+        "t, line 2: 'takenote.note.note.Note object' has no attribute 'missing'"
+    )
+    assert check_source("{% for path, note in notes.items() %}{{ note.title }}{% endfor %}", note_context()) is None
+
+    good, bad = tmp_path / "good.md", tmp_path / "bad.md"
+    good.write_text("# {{ note.title }}\n{{ clipboard }}")
+    bad.write_text("{{ nope }}")
+    checked = CheckedTemplates(tmp_path / "checked.json")
+    results = check_templates({"good": good, "bad": bad, "default": None}, {"short": "{{ title }}"}, checked)
+    assert [result.error is None for result in results] == [True, False, True, True]
+
+    checked.save()
+    checked = CheckedTemplates(tmp_path / "checked.json")
+    assert checked.is_checked(good) and not checked.is_checked(bad)
+    good.write_text("# {{ note.title }}!")
+    assert not checked.is_checked(good)
@@ -0,0 +1,36 @@
+import json
+from pathlib import Path
+from takenote import trace
+from takenote.trace import span, start_tracing, stop_tracing, trace_settings
+
+
+def test_trace_file(tmp_path: Path):
+    """Spans are written as Chrome trace events, nested spans inside the root span."""
+    path = tmp_path / "trace.json"
+    start_tracing(path)
+    with span("outer", key=1):
+        with span("inner"):
+            pass
+    stop_tracing()
+
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["inner", "outer", "tn"]
+    inner, outer, root = events
+    assert outer["args"] == {"key": "1"}
+    assert root["ts"] <= outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"] <= root["ts"] + root["dur"]
+
+
+def test_trace_disabled(monkeypatch):
+    """Disabled spans share one no-op object, TN_TRACE is read when no option is given."""
+    assert not trace.enabled()
+    assert span("a") is span("b", key=1)
+
+    monkeypatch.delenv(trace.TRACE_ENV, raising=False)
+    assert trace_settings() == (False, None)
+    assert trace_settings(flag=True) == (True, None)
+    monkeypatch.setenv(trace.TRACE_ENV, "1")
+    assert trace_settings() == (True, None)
+    monkeypatch.setenv(trace.TRACE_ENV, "trace.json")
+    assert trace_settings() == (True, Path("trace.json"))
+    assert trace_settings(trace_file=Path("other.json")) == (True, Path("other.json"))